@@ -6,9 +6,14 @@ CREATE TABLE IF NOT EXISTS videos (
     id SERIAL PRIMARY KEY,
     filename VARCHAR(255) NOT NULL,
     duration FLOAT NOT NULL,
+    content_hash VARCHAR(64),
+    config_hash VARCHAR(64),
+    status VARCHAR(16) NOT NULL DEFAULT 'completed',
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX IF NOT EXISTS ix_videos_content_hash ON videos (content_hash);
+
 -- Create highlights table if not exists
 CREATE TABLE IF NOT EXISTS highlights (
     id SERIAL PRIMARY KEY,
@@ -20,6 +25,37 @@ CREATE TABLE IF NOT EXISTS highlights (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create table of enriched segments of unfinished extraction runs
+CREATE TABLE IF NOT EXISTS segment_checkpoints (
+    id SERIAL PRIMARY KEY,
+    video_id INTEGER NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+    segment_index INTEGER NOT NULL,
+    start_time FLOAT NOT NULL,
+    end_time FLOAT NOT NULL,
+    description TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (video_id, segment_index)
+);
+
+-- Create queue of videos for extractors running in daemon mode
+CREATE TABLE IF NOT EXISTS jobs (
+    id SERIAL PRIMARY KEY,
+    video_path VARCHAR(1024) NOT NULL UNIQUE,
+    file_size BIGINT,
+    file_mtime FLOAT,
+    status VARCHAR(16) NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id VARCHAR(255),
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    error TEXT,
+    video_id INTEGER REFERENCES videos(id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status);
+
 -- Create a text search index for efficient searching
 CREATE INDEX IF NOT EXISTS highlights_text_search_idx ON highlights USING GIN (
     to_tsvector('english', description || ' ' || summary)
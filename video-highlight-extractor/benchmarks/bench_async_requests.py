@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark many in-flight highlight descriptions: one thread per request against
+coroutines on the shared event loop
+
+Both modes send the same requests to the fake backend (LLM_BACKEND=fake) with
+the given latency and no quota, and report wall time, requests per second, the
+peak number of threads and the peak Python memory allocated while they run
+(thread stacks come on top of it).
+
+Usage (from the video-highlight-extractor directory):
+    python -m benchmarks.bench_async_requests --requests 500 --in-flight 250 --llm-latency 1.0
+"""
+import time
+import asyncio
+import argparse
+import logging
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.config import LLM_CONFIG, CACHE_CONFIG
+
+def run_threads(llm_service, highlights, in_flight):
+    """Describe the highlights with a pool of in_flight threads"""
+    with ThreadPoolExecutor(max_workers=in_flight) as executor:
+        return list(executor.map(lambda highlight: llm_service.generate_highlight_description(*highlight), highlights))
+
+def run_async(llm_service, highlights, in_flight):
+    """Describe the highlights as coroutines on the shared event loop, in_flight at a time"""
+    from src.utils.event_loop import submit
+    
+    async def describe_all():
+        slots = asyncio.Semaphore(in_flight)
+        
+        async def describe(highlight):
+            async with slots:
+                return await llm_service.generate_highlight_description_async(*highlight)
+        
+        return await asyncio.gather(*(describe(highlight) for highlight in highlights))
+    
+    return submit(describe_all()).result()
+
+def measure(name, run, llm_service, highlights, in_flight):
+    """Run one mode and print its wall time, throughput, peak threads and peak allocations"""
+    peak_threads = threading.active_count()
+    finished = threading.Event()
+    
+    def sample_threads():
+        nonlocal peak_threads
+        while not finished.wait(0.01):
+            peak_threads = max(peak_threads, threading.active_count())
+    
+    sampler = threading.Thread(target=sample_threads, daemon=True)
+    sampler.start()
+    
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = run(llm_service, highlights, in_flight)
+    elapsed = time.perf_counter() - start
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    finished.set()
+    sampler.join()
+    
+    fallbacks = sum(1 for result in results if result.get("fallback"))
+    print(f"{name:<8} {elapsed:>8.2f}s  {len(highlights) / elapsed:>8.1f} req/s  "
+          f"peak threads {peak_threads:>4}  peak allocated {peak_bytes / (1024 * 1024):>7.1f} MB  "
+          f"fallbacks {fallbacks}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Threaded vs async LLM request benchmark")
+    parser.add_argument("--requests", type=int, default=500, help="Highlights to describe")
+    parser.add_argument("--in-flight", type=int, default=250, help="Requests in flight at a time")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Seconds per fake LLM request")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    # Offline, uncached and unthrottled, so only the way requests wait differs
+    LLM_CONFIG.update({
+        'backend': 'fake',
+        'fake_latency': args.llm_latency,
+        'fake_error_rate': 0.0,
+        'fake_requests_per_minute': 0,
+        'requests_per_minute': 0,
+        'tokens_per_minute': 0,
+        'max_concurrency': args.in_flight
+    })
+    CACHE_CONFIG['enabled'] = False
+    
+    from src.llm.llm_service import LLMService
+    
+    rng = np.random.default_rng(0)
+    highlights = [
+        ([rng.integers(0, 256, (90, 160, 3), dtype=np.uint8)], f"Transcript of highlight {i}", i * 10.0, i * 10.0 + 5.0)
+        for i in range(args.requests)
+    ]
+    
+    llm_service = LLMService()
+    
+    print(f"\n{args.requests} requests, {args.in_flight} in flight, {args.llm_latency}s latency\n")
+    measure("threads", run_threads, llm_service, highlights, args.in_flight)
+    measure("async", run_async, llm_service, highlights, args.in_flight)
+    print()
+
+if __name__ == "__main__":
+    main()
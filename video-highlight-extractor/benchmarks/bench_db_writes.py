@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark bulk highlight persistence against the per-row ORM path
+
+Needs the Postgres database configured in DB_CONFIG. Every video written by the
+benchmark is deleted again (highlights cascade).
+
+Usage (from the video-highlight-extractor directory):
+    python -m benchmarks.bench_db_writes --counts 1000 10000
+"""
+import time
+import argparse
+import logging
+
+import numpy as np
+
+from src.config import LLM_CONFIG
+from src.databases.db_manager import DBManager
+
+def make_highlights(count, seed=0):
+    """
+    Generate synthetic highlights
+    
+    Args:
+        count (int): Number of highlights
+        seed (int): Random seed
+        
+    Returns:
+        list: List of (timestamp, description, summary, embedding) tuples
+    """
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((count, LLM_CONFIG['embedding_dimension'])).astype(np.float32)
+    
+    return [
+        (i * 2.5, f"Benchmark highlight {i} description " * 10, f"Benchmark highlight {i}", embeddings[i])
+        for i in range(count)
+    ]
+
+def write_per_row(db_manager, highlights):
+    """Write highlights with add_video/add_highlight, one commit per row"""
+    video = db_manager.add_video("benchmark_per_row.mp4", 0.0)
+    for timestamp, description, summary, embedding in highlights:
+        db_manager.add_highlight(video.id, timestamp, description, summary, embedding.tolist())
+    return video.id
+
+def write_bulk(db_manager, highlights):
+    """Write the video and its highlights with add_video_with_highlights"""
+    video, _ = db_manager.add_video_with_highlights("benchmark_bulk.mp4", 0.0, highlights)
+    return video.id
+
+def delete_video(db_manager, video_id):
+    """Delete a benchmark video and its highlights"""
+    from src.databases.db_models import Video
+    
+    db_manager.session.query(Video).filter(Video.id == video_id).delete()
+    db_manager.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Highlight persistence benchmark")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000],
+                        help="Numbers of highlights to write")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    db_manager = DBManager()
+    
+    print(f"\n{'highlights':>10} {'per-row (s)':>12} {'bulk (s)':>9} {'speedup':>8} {'rows/s bulk':>12}")
+    
+    try:
+        for count in args.counts:
+            highlights = make_highlights(count)
+            timings = {}
+            
+            for name, write in (("per_row", write_per_row), ("bulk", write_bulk)):
+                start = time.perf_counter()
+                video_id = write(db_manager, highlights)
+                timings[name] = time.perf_counter() - start
+                delete_video(db_manager, video_id)
+            
+            print(f"{count:>10} {timings['per_row']:>12.3f} {timings['bulk']:>9.3f} "
+                  f"{timings['per_row'] / timings['bulk']:>7.1f}x {count / timings['bulk']:>12.0f}")
+    finally:
+        db_manager.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark decode throughput of the ffmpeg pipe backend against OpenCV
+
+Usage (from the video-highlight-extractor directory):
+    python -m benchmarks.bench_decoders --video videos/adventure_time.mp4
+"""
+import os
+import time
+import argparse
+import logging
+
+import cv2
+
+from src.config import PATHS, VIDEO_CONFIG
+from src.processors.video_processor import VideoProcessor
+from src.processors.ffmpeg_frame_source import FFmpegFrameSource
+from benchmarks.bench_scene_detection import boundary_drift
+
+def time_decode(frames, repeats=3):
+    """
+    Drain a frame iterator and time it
+    
+    Args:
+        frames (callable): Returns a fresh iterator of (timestamp, frame) tuples
+        repeats (int): Number of timed runs, the best one is reported
+    
+    Returns:
+        tuple: (number of frames, best wall time in seconds)
+    """
+    best = float('inf')
+    count = 0
+    
+    for _ in range(repeats):
+        start = time.perf_counter()
+        count = sum(1 for _ in frames())
+        best = min(best, time.perf_counter() - start)
+    
+    return count, best
+
+def run_scan(video_path, backend, mode, keyframes_only=False, repeats=3):
+    """
+    Time scan_scene_changes with the given decoder backend
+    
+    Args:
+        video_path (str): Path to the video file
+        backend (str): Decoder backend ('opencv' or 'ffmpeg')
+        mode (str): Scene detection mode ('full' or 'thumbnail')
+        keyframes_only (bool): Decode keyframes only with the ffmpeg backend
+        repeats (int): Number of timed runs, the best one is reported
+    
+    Returns:
+        tuple: (list of scene change timestamps, best wall time in seconds)
+    """
+    video_processor = VideoProcessor()
+    video_processor.decoder_backend = backend
+    video_processor.scene_detection_mode = mode
+    video_processor.scene_keyframes_only = keyframes_only
+    
+    best = float('inf')
+    scene_changes = []
+    
+    for _ in range(repeats):
+        start = time.perf_counter()
+        scene_changes, _ = video_processor.scan_scene_changes(video_path)
+        best = min(best, time.perf_counter() - start)
+    
+    return scene_changes, best
+
+def main():
+    parser = argparse.ArgumentParser(description="Decoder backend benchmark")
+    parser.add_argument("--video", default=os.path.join(PATHS['videos_dir'], 'adventure_time.mp4'),
+                        help="Path to the video file to benchmark")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per configuration")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Maximum boundary drift in seconds to count as a match")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    video_processor = VideoProcessor()
+    cap, fps, _, _ = video_processor.open_video(args.video)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    
+    thumbnail_size = VIDEO_CONFIG['scene_thumbnail_size']
+    
+    def opencv_gray_thumbnails():
+        for timestamp, frame in video_processor.iter_frames(args.video):
+            yield timestamp, video_processor.to_gray(frame, thumbnail_size)
+    
+    def ffmpeg(**settings):
+        source = FFmpegFrameSource(**settings)
+        return lambda: source.iter_frames(args.video)
+    
+    decoders = [
+        ("opencv bgr", lambda: video_processor.iter_frames(args.video)),
+        ("opencv gray thumbnails", opencv_gray_thumbnails),
+        ("ffmpeg bgr", ffmpeg(pix_fmt='bgr24')),
+        ("ffmpeg gray", ffmpeg(pix_fmt='gray')),
+        ("ffmpeg gray thumbnails", ffmpeg(pix_fmt='gray', size=thumbnail_size)),
+        ("ffmpeg gray thumbnails, 6 fps", ffmpeg(pix_fmt='gray', size=thumbnail_size, fps=6)),
+        ("ffmpeg gray thumbnails, keyframes", ffmpeg(pix_fmt='gray', size=thumbnail_size, keyframes_only=True)),
+    ]
+    
+    print(f"\nVideo: {args.video} ({width}x{height} at {fps:.2f} fps)")
+    print(f"{'decoder':<36} {'frames':>7} {'time (s)':>9} {'frames/s':>9}")
+    
+    for name, frames in decoders:
+        count, elapsed = time_decode(frames, args.repeats)
+        print(f"{name:<36} {count:>7} {elapsed:>9.3f} {count / elapsed:>9.1f}")
+    
+    # Scene detection end to end, with boundaries compared against the OpenCV full-resolution scan
+    baseline, baseline_time = run_scan(args.video, 'opencv', 'full', repeats=args.repeats)
+    
+    scans = [
+        ("ffmpeg full", dict(backend='ffmpeg', mode='full')),
+        ("opencv thumbnail", dict(backend='opencv', mode='thumbnail')),
+        ("ffmpeg thumbnail", dict(backend='ffmpeg', mode='thumbnail')),
+        ("ffmpeg thumbnail, keyframes", dict(backend='ffmpeg', mode='thumbnail', keyframes_only=True)),
+    ]
+    
+    print(f"\n{'scan':<36} {'time (s)':>9} {'speedup':>8} {'cuts':>5} {'missed':>7} {'extra':>6}")
+    print(f"{'opencv full (baseline)':<36} {baseline_time:>9.3f} {1.0:>7.2f}x {len(baseline):>5}")
+    
+    for name, settings in scans:
+        scene_changes, elapsed = run_scan(args.video, repeats=args.repeats, **settings)
+        drift = boundary_drift(baseline, scene_changes, args.tolerance)
+        print(f"{name:<36} {elapsed:>9.3f} {baseline_time / elapsed:>7.2f}x {len(scene_changes):>5} "
+              f"{drift['missed']:>7} {drift['extra']:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of process_video on synthetic videos, fully offline
+
+With --pipeline all videos go through one staged pipeline, so decoding of a
+video overlaps enrichment of the previous ones, instead of one after another.
+
+The LLM and embedding calls go to the fake backend (LLM_BACKEND=fake) with the
+configured latency, error rate and quota, and highlights are stored in an in-memory
+stand-in for DBManager unless --db postgres is given.
+
+Usage (from the video-highlight-extractor directory):
+    python -m benchmarks.bench_end_to_end --durations 60 300 --llm-latency 0.5 --concurrency 4
+    python -m benchmarks.bench_end_to_end --durations 60 60 60 --pipeline
+    python -m benchmarks.bench_end_to_end --quota-rpm 60 --client-rpm 120
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+import resource
+import tempfile
+
+from src.config import LLM_CONFIG, CACHE_CONFIG
+from benchmarks.synthetic_videos import ensure_synthetic_videos
+from benchmarks.in_memory_db import InMemoryDBManager
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its waited-for children in MB"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return own / scale, children / scale
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end extractor benchmark")
+    parser.add_argument("--durations", type=float, nargs='+', default=[60.0],
+                        help="Durations in seconds of the synthetic videos")
+    parser.add_argument("--size", type=int, nargs=2, default=[640, 360], metavar=('WIDTH', 'HEIGHT'),
+                        help="Frame size of the synthetic videos")
+    parser.add_argument("--videos-dir", default=os.path.join(tempfile.gettempdir(), 'highlight_benchmark_videos'),
+                        help="Directory the synthetic videos are written to and reused from")
+    parser.add_argument("--video", action='append', default=[], help="Benchmark an existing video as well")
+    parser.add_argument("--concurrency", type=int, default=None, help="Highlights enriched concurrently")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Seconds per fake LLM request")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="Seconds per fake embedding request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of fake requests that fail")
+    parser.add_argument("--quota-rpm", type=float, default=0,
+                        help="Requests per minute the fake LLM accepts before answering 429")
+    parser.add_argument("--client-rpm", type=float, default=0,
+                        help="Description requests per minute the client's rate limiter allows, 0 for no limit")
+    parser.add_argument("--db", choices=('memory', 'postgres'), default='memory',
+                        help="Store highlights in memory or in the Postgres database from DB_CONFIG")
+    parser.add_argument("--pipeline", action='store_true',
+                        help="Process all videos in one pipeline instead of one after another")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    # Offline and uncached, so every run does the full work, and unthrottled
+    # unless asked for, so the production quota doesn't bound the timings
+    LLM_CONFIG.update({
+        'backend': 'fake',
+        'fake_latency': args.llm_latency,
+        'fake_embedding_latency': args.embedding_latency,
+        'fake_error_rate': args.error_rate,
+        'fake_requests_per_minute': args.quota_rpm,
+        'requests_per_minute': args.client_rpm,
+        'tokens_per_minute': 0
+    })
+    CACHE_CONFIG['enabled'] = False
+    
+    from src.main import process_video, process_videos_in_pipeline
+    from src.processors.video_processor import VideoProcessor
+    from src.utils import metrics
+    
+    videos = ensure_synthetic_videos(args.videos_dir, args.durations, size=tuple(args.size)) + args.video
+    
+    if args.db == 'postgres':
+        from src.databases.db_manager import DBManager
+        db_manager = DBManager()
+    else:
+        db_manager = InMemoryDBManager()
+    
+    print(f"\nLLM latency {args.llm_latency}s, embedding latency {args.embedding_latency}s, "
+          f"error rate {args.error_rate:.0%}, fake quota {args.quota_rpm or 'none'} rpm, "
+          f"client quota {args.client_rpm or 'none'} rpm, database: {args.db}")
+    print("asr and llm run in enrichment threads; their times are summed over threads\n")
+    
+    try:
+        if args.pipeline:
+            total_frames = 0
+            for video_path in videos:
+                cap, _, frames, _ = VideoProcessor().open_video(video_path)
+                cap.release()
+                total_frames += frames
+            
+            start = time.perf_counter()
+            failed = process_videos_in_pipeline(videos, db_manager, args.concurrency)
+            elapsed = time.perf_counter() - start
+            own_rss, children_rss = peak_rss_mb()
+            
+            totals = metrics.get_totals()
+            highlights = totals['counters'].get('highlights', 0)
+            
+            print(f"\n{len(videos)} videos, {total_frames} frames in one pipeline ({len(failed)} failed)")
+            for stage, histogram in totals['stages'].items():
+                print(f"  {stage:<18} {histogram['sum']:>9.3f}s  {histogram['count']:>6} calls")
+            print(f"  {'total':<18} {elapsed:>9.3f}s")
+            print(f"  throughput: {total_frames / elapsed:.1f} frames/s, {highlights / elapsed:.2f} highlights/s "
+                  f"({highlights} highlights)")
+            print(f"  peak RSS: {own_rss:.1f} MB (children {children_rss:.1f} MB)")
+            print(f"  counters: {', '.join(f'{name}={value}' for name, value in sorted(totals['counters'].items()))}\n")
+            return
+        
+        for video_path in videos:
+            cap, fps, total_frames, duration = VideoProcessor().open_video(video_path)
+            cap.release()
+            
+            start = time.perf_counter()
+            video_id, highlights = process_video(video_path, db_manager, concurrency=args.concurrency)
+            elapsed = time.perf_counter() - start
+            own_rss, children_rss = peak_rss_mb()
+            
+            report = metrics.get_last_report()
+            
+            print(f"{os.path.basename(video_path)}: {duration:.1f}s, {total_frames} frames")
+            for stage, histogram in report['stages'].items():
+                print(f"  {stage:<18} {histogram['sum']:>9.3f}s  {histogram['count']:>6} calls")
+            print(f"  {'total':<18} {elapsed:>9.3f}s")
+            print(f"  throughput: {total_frames / elapsed:.1f} frames/s, {len(highlights) / elapsed:.2f} highlights/s "
+                  f"({len(highlights)} highlights)")
+            print(f"  peak RSS: {own_rss:.1f} MB (children {children_rss:.1f} MB)")
+            print(f"  counters: {', '.join(f'{name}={value}' for name, value in sorted(report['counters'].items()))}\n")
+    finally:
+        db_manager.close()
+
+if __name__ == "__main__":
+    main()
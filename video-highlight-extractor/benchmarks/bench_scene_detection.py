@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark thumbnail scene detection against the full-resolution baseline
+
+Usage (from the video-highlight-extractor directory):
+    python -m benchmarks.bench_scene_detection --video videos/adventure_time.mp4
+"""
+import os
+import time
+import argparse
+import logging
+
+import numpy as np
+
+from src.config import PATHS, VIDEO_CONFIG
+from src.processors.video_processor import VideoProcessor
+
+def run_detection(video_path, mode, thumbnail_size=None, stride=1, sample_fps=None, repeats=3):
+    """
+    Run scene detection with the given settings and time it
+    
+    Args:
+        video_path (str): Path to the video file
+        mode (str): Scene detection mode ('full' or 'thumbnail')
+        thumbnail_size (tuple, optional): (width, height) of the thumbnails
+        stride (int): Frame stride
+        sample_fps (float, optional): Target sampling FPS
+        repeats (int): Number of timed runs, the best one is reported
+        
+    Returns:
+        tuple: (list of scene change timestamps, best wall time in seconds)
+    """
+    video_processor = VideoProcessor()
+    video_processor.scene_detection_mode = mode
+    video_processor.scene_thumbnail_size = thumbnail_size or VIDEO_CONFIG['scene_thumbnail_size']
+    video_processor.scene_frame_stride = stride
+    video_processor.scene_sample_fps = sample_fps
+    
+    best = float('inf')
+    scene_changes = []
+    
+    for _ in range(repeats):
+        start = time.perf_counter()
+        scene_changes, _ = video_processor.scan_scene_changes(video_path)
+        best = min(best, time.perf_counter() - start)
+    
+    return scene_changes, best
+
+def boundary_drift(baseline, candidate, tolerance):
+    """
+    Compare detected boundaries against the baseline
+    
+    Args:
+        baseline (list): Scene change timestamps from the full-resolution run
+        candidate (list): Scene change timestamps from the run under test
+        tolerance (float): Maximum distance in seconds for a boundary to count as matched
+        
+    Returns:
+        dict: Mean/max drift of matched boundaries and missed/extra counts
+    """
+    if not baseline or not candidate:
+        return {'mean': 0.0, 'max': 0.0, 'missed': len(baseline), 'extra': len(candidate)}
+    
+    candidate_arr = np.asarray(candidate)
+    baseline_arr = np.asarray(baseline)
+    
+    # Distance from every baseline boundary to its nearest candidate and vice versa
+    to_candidate = np.abs(baseline_arr[:, None] - candidate_arr[None, :]).min(axis=1)
+    to_baseline = np.abs(candidate_arr[:, None] - baseline_arr[None, :]).min(axis=1)
+    
+    matched = to_candidate[to_candidate <= tolerance]
+    
+    return {
+        'mean': float(matched.mean()) if len(matched) else 0.0,
+        'max': float(matched.max()) if len(matched) else 0.0,
+        'missed': int((to_candidate > tolerance).sum()),
+        'extra': int((to_baseline > tolerance).sum())
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Scene detection benchmark")
+    parser.add_argument("--video", default=os.path.join(PATHS['videos_dir'], 'adventure_time.mp4'),
+                        help="Path to the video file to benchmark")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per configuration")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Maximum boundary drift in seconds to count as a match")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    baseline, baseline_time = run_detection(args.video, 'full', repeats=args.repeats)
+    
+    configurations = [
+        ("thumbnail 160x90", dict(thumbnail_size=(160, 90))),
+        ("thumbnail 64x36", dict(thumbnail_size=(64, 36))),
+        ("thumbnail 160x90, stride 2", dict(thumbnail_size=(160, 90), stride=2)),
+        ("thumbnail 160x90, 6 fps", dict(thumbnail_size=(160, 90), sample_fps=6)),
+        ("thumbnail 64x36, 4 fps", dict(thumbnail_size=(64, 36), sample_fps=4)),
+    ]
+    
+    print(f"\nVideo: {args.video}")
+    print(f"{'configuration':<30} {'time (s)':>9} {'speedup':>8} {'cuts':>5} "
+          f"{'mean drift':>11} {'max drift':>10} {'missed':>7} {'extra':>6}")
+    print(f"{'full resolution (baseline)':<30} {baseline_time:>9.3f} {1.0:>7.2f}x {len(baseline):>5}")
+    
+    for name, settings in configurations:
+        scene_changes, elapsed = run_detection(args.video, 'thumbnail', repeats=args.repeats, **settings)
+        drift = boundary_drift(baseline, scene_changes, args.tolerance)
+        print(f"{name:<30} {elapsed:>9.3f} {baseline_time / elapsed:>7.2f}x {len(scene_changes):>5} "
+              f"{drift['mean']:>10.3f}s {drift['max']:>9.3f}s {drift['missed']:>7} {drift['extra']:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark time-sharded scene scans against the sequential scan and check that
+both return the same scene changes
+
+Usage (from the video-highlight-extractor directory):
+    python -m benchmarks.bench_sharded_scene_detection --video videos/adventure_time.mp4 --shards 2 4 8
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+
+from src.config import PATHS
+from src.processors.video_processor import VideoProcessor
+
+def run_scan(video_path, mode, stride, shards, repeats):
+    """
+    Time scan_scene_changes with the given number of shards
+    
+    Args:
+        video_path (str): Path to the video file
+        mode (str): Scene detection mode ('full' or 'thumbnail')
+        stride (int): Frame stride in 'thumbnail' mode
+        shards (int): Number of time shards, 1 for the sequential scan
+        repeats (int): Number of timed runs, the best one is reported
+        
+    Returns:
+        tuple: (scene change timestamps, motion profile, best wall time in seconds)
+    """
+    video_processor = VideoProcessor()
+    video_processor.decoder_backend = 'opencv'
+    video_processor.scene_detection_mode = mode
+    video_processor.scene_frame_stride = stride
+    video_processor.scene_sample_fps = None
+    video_processor.scene_scan_shards = shards
+    # Shard even short sample videos
+    video_processor.scene_scan_min_shard_duration = 0
+    
+    best = float('inf')
+    scene_changes, motion_profile = [], []
+    
+    for _ in range(repeats):
+        motion_profile = []
+        start = time.perf_counter()
+        scene_changes, _ = video_processor.scan_scene_changes(video_path, motion_profile=motion_profile)
+        best = min(best, time.perf_counter() - start)
+    
+    return scene_changes, motion_profile, best
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded scene detection benchmark")
+    parser.add_argument("--video", default=os.path.join(PATHS['videos_dir'], 'adventure_time.mp4'),
+                        help="Path to the video file to benchmark")
+    parser.add_argument("--shards", type=int, nargs='+', default=[2, 4], help="Shard counts to compare")
+    parser.add_argument("--repeats", type=int, default=1, help="Timed runs per configuration")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING)
+    
+    ok = True
+    
+    print(f"\nVideo: {args.video} ({os.cpu_count()} CPUs)")
+    print(f"{'configuration':<28} {'shards':>6} {'time (s)':>9} {'speedup':>8} {'cuts':>5} {'match':>6}")
+    
+    for name, mode, stride in (("full resolution", 'full', 1), ("thumbnail", 'thumbnail', 1),
+                               ("thumbnail, stride 3", 'thumbnail', 3)):
+        expected, expected_profile, sequential_time = run_scan(args.video, mode, stride, 1, args.repeats)
+        print(f"{name:<28} {1:>6} {sequential_time:>9.3f} {1.0:>7.2f}x {len(expected):>5}")
+        
+        for shards in args.shards:
+            actual, profile, elapsed = run_scan(args.video, mode, stride, shards, args.repeats)
+            
+            # Every compared pair, including those across shard edges, must be present exactly once
+            match = actual == expected and profile == expected_profile
+            ok &= match
+            
+            print(f"{name:<28} {shards:>6} {elapsed:>9.3f} {sequential_time / elapsed:>7.2f}x "
+                  f"{len(actual):>5} {str(match):>6}")
+    
+    if not ok:
+        print("\nSharded scene detection does not match the sequential scan")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+In-memory stand-in for DBManager, for benchmarking without Postgres
+
+Implements the part of the DBManager interface that process_video and the demo
+use, with the same return shapes; nothing is persisted.
+"""
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+class InMemoryHighlight(SimpleNamespace):
+    """Highlight record with the attributes and to_dict of db_models.Highlight"""
+    
+    def to_dict(self):
+        """Convert highlight to dictionary"""
+        return {
+            'id': self.id,
+            'video_id': self.video_id,
+            'timestamp': self.timestamp,
+            'description': self.description,
+            'summary': self.summary,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class InMemoryDBManager:
+    def __init__(self):
+        """Initialize the empty in-memory database"""
+        self.videos = {}
+        self.highlights = {}
+        self.checkpoints = {}
+        self._next_video_id = 1
+        self._next_highlight_id = 1
+    
+    def get_video_by_content_hash(self, content_hash):
+        """Get the most recent video with the given content hash, or None"""
+        matches = [video for video in self.videos.values() if video.content_hash == content_hash]
+        return max(matches, key=lambda video: video.id) if matches else None
+    
+    def start_video(self, filename, duration, content_hash, config_hash):
+        """Get or create the video row of a resumable extraction run, see DBManager.start_video"""
+        video = self.get_video_by_content_hash(content_hash)
+        
+        if video is None:
+            video = SimpleNamespace(
+                id=self._next_video_id, filename=filename, duration=duration,
+                content_hash=content_hash, config_hash=config_hash, status='processing'
+            )
+            self.videos[video.id] = video
+            self.checkpoints[video.id] = {}
+            self._next_video_id += 1
+        elif video.status != 'processing' or video.config_hash != config_hash:
+            self.highlights.pop(video.id, None)
+            self.checkpoints[video.id] = {}
+            video.filename, video.duration = filename, duration
+            video.config_hash, video.status = config_hash, 'processing'
+        
+        return video, dict(self.checkpoints[video.id])
+    
+    def add_checkpoints(self, video_id, segments):
+        """Record enriched segments of an unfinished run"""
+        for segment_index, start_time, end_time, description, summary in segments:
+            self.checkpoints[video_id][segment_index] = SimpleNamespace(
+                segment_index=segment_index, start_time=start_time, end_time=end_time,
+                description=description, summary=summary
+            )
+    
+    def complete_video(self, video_id, highlights, page_size=1000):
+        """Store the highlights of a run and mark the video completed"""
+        now = datetime.now(timezone.utc)
+        stored = []
+        
+        for timestamp, description, summary, embedding in highlights:
+            stored.append(InMemoryHighlight(
+                id=self._next_highlight_id, video_id=video_id, timestamp=timestamp,
+                description=description, summary=summary,
+                embedding=None if embedding is None else np.asarray(embedding, dtype=np.float32),
+                created_at=now
+            ))
+            self._next_highlight_id += 1
+        
+        self.highlights[video_id] = stored
+        self.checkpoints[video_id] = {}
+        self.videos[video_id].status = 'completed'
+        return list(stored)
+    
+    def get_all_videos(self):
+        """Get all videos"""
+        return list(self.videos.values())
+    
+    def get_highlights_by_video_id(self, video_id):
+        """Get all highlights for a specific video"""
+        return list(self.highlights.get(video_id, []))
+    
+    def rollback(self):
+        """Nothing to roll back"""
+    
+    def close(self):
+        """Nothing to close"""
@@ -0,0 +1,101 @@
+"""
+Synthetic test videos for the benchmarks
+
+Videos are written with OpenCV: a sequence of scenes with a flat background,
+moving shapes and light noise, separated by hard cuts. Some scenes are cut back
+to later, so near-duplicate suppression has something to find. The videos have
+no audio track.
+"""
+import os
+import logging
+
+import cv2
+import numpy as np
+
+def write_synthetic_video(path, duration=60.0, fps=24.0, size=(640, 360), mean_scene_duration=4.0,
+                          repeat_probability=0.2, seed=0):
+    """
+    Write a synthetic video with hard cuts
+    
+    Args:
+        path (str): Output path (.mp4)
+        duration (float): Duration in seconds
+        fps (float): Frame rate
+        size (tuple): (width, height) of the frames
+        mean_scene_duration (float): Mean scene length in seconds
+        repeat_probability (float): Chance that a scene repeats an earlier one
+        seed (int): Random seed, the same arguments always produce the same video
+        
+    Returns:
+        dict: Number of frames and scenes written
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open video writer for {path}")
+    
+    total_frames = int(round(duration * fps))
+    scenes = []
+    frame_index = 0
+    
+    try:
+        while frame_index < total_frames:
+            if scenes and rng.random() < repeat_probability:
+                scene = scenes[rng.integers(len(scenes))]
+            else:
+                scene = {
+                    'background': rng.integers(0, 256, 3).tolist(),
+                    'shapes': [
+                        (rng.integers(0, 256, 3).tolist(), rng.uniform(0, 1, 2), rng.uniform(-0.01, 0.01, 2),
+                         int(rng.integers(10, max(11, height // 4))))
+                        for _ in range(int(rng.integers(1, 5)))
+                    ]
+                }
+                scenes.append(scene)
+            
+            scene_frames = max(1, int(rng.exponential(mean_scene_duration) * fps))
+            
+            for t in range(min(scene_frames, total_frames - frame_index)):
+                frame = np.empty((height, width, 3), dtype=np.uint8)
+                frame[:] = scene['background']
+                
+                for color, position, velocity, radius in scene['shapes']:
+                    x, y = (position + velocity * t) % 1.0
+                    cv2.circle(frame, (int(x * width), int(y * height)), radius, color, -1)
+                
+                noise = rng.integers(-6, 7, frame.shape, dtype=np.int16)
+                writer.write(np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8))
+                frame_index += 1
+    finally:
+        writer.release()
+    
+    logging.info(f"Wrote synthetic video {path}: {frame_index} frames, {len(scenes)} distinct scenes")
+    return {'frames': frame_index, 'scenes': len(scenes)}
+
+def ensure_synthetic_videos(output_dir, durations, **kwargs):
+    """
+    Write one synthetic video per duration unless it already exists
+    
+    Args:
+        output_dir (str): Directory the videos are written to
+        durations (list): Durations in seconds
+        **kwargs: Passed on to write_synthetic_video
+        
+    Returns:
+        list: Paths of the videos
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    
+    for i, duration in enumerate(durations):
+        width, height = kwargs.get('size', (640, 360))
+        path = os.path.join(output_dir, f"synthetic_{int(duration)}s_{width}x{height}_{i}.mp4")
+        
+        if not os.path.exists(path):
+            write_synthetic_video(path, duration=duration, seed=i, **kwargs)
+        
+        paths.append(path)
+    
+    return paths
@@ -6,9 +6,14 @@ CREATE TABLE IF NOT EXISTS videos (
     id SERIAL PRIMARY KEY,
     filename VARCHAR(255) NOT NULL,
     duration FLOAT NOT NULL,
+    content_hash VARCHAR(64),
+    config_hash VARCHAR(64),
+    status VARCHAR(16) NOT NULL DEFAULT 'completed',
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX IF NOT EXISTS ix_videos_content_hash ON videos (content_hash);
+
 -- Create highlights table with vector support
 CREATE TABLE IF NOT EXISTS highlights (
     id SERIAL PRIMARY KEY,
@@ -20,5 +25,18 @@ CREATE TABLE IF NOT EXISTS highlights (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create table of enriched segments of unfinished extraction runs
+CREATE TABLE IF NOT EXISTS segment_checkpoints (
+    id SERIAL PRIMARY KEY,
+    video_id INTEGER NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+    segment_index INTEGER NOT NULL,
+    start_time FLOAT NOT NULL,
+    end_time FLOAT NOT NULL,
+    description TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (video_id, segment_index)
+);
+
 -- Create an index for vector similarity search
 CREATE INDEX IF NOT EXISTS highlights_embedding_idx ON highlights USING ivfflat (embedding vector_l2_ops) WITH (lists = 100);
@@ -16,18 +16,99 @@ DB_CONFIG = {
 # LLM configuration
 LLM_CONFIG = {
     'api_key': os.getenv('GOOGLE_API_KEY'),
+    'backend': os.getenv('LLM_BACKEND', 'gemini'),  # 'gemini' or 'fake' (offline, deterministic answers for benchmarks)
     'model': 'models/gemini-2.0-flash-lite',
-    'embedding_dimension': 768
+    'prompt_version': 1,  # Bump when the highlight description prompt changes, invalidates cached descriptions
+    'description_batch_size': int(os.getenv('LLM_BATCH_SIZE', '1')),  # Highlights described per request, 1 disables batching
+    'embedding_model': 'models/embedding-001',
+    'embedding_dimension': 768,
+    'embedding_batch_size': 100,  # Texts per batch embedding request (API maximum is 100)
+    'embedding_max_retries': 2,  # Resubmissions of items a successful batch response had no valid vector for
+    'requests_per_minute': float(os.getenv('LLM_REQUESTS_PER_MINUTE', '30')),  # Quota of description requests per process, 0 for none
+    'tokens_per_minute': float(os.getenv('LLM_TOKENS_PER_MINUTE', '1000000')),  # Quota of estimated input tokens per process, 0 for none
+    'embedding_requests_per_minute': float(os.getenv('EMBEDDING_REQUESTS_PER_MINUTE', '1500')),  # Texts embedded per minute, 0 for no limit
+    'embedding_tokens_per_minute': float(os.getenv('EMBEDDING_TOKENS_PER_MINUTE', '0')),
+    'max_concurrency': int(os.getenv('LLM_MAX_CONCURRENCY', '16')),  # Upper bound of the adaptive limit on requests in flight per API
+    'max_retries': 5,  # Retries of requests failing with 429, 5xx or connection errors
+    'retry_base_delay': 1.0,  # Seconds of backoff before the first retry, doubled on every retry, with jitter
+    'retry_max_delay': 60.0,
+    'fake_latency': float(os.getenv('LLM_FAKE_LATENCY', '0.5')),  # Seconds per generate_content call of the 'fake' backend
+    'fake_embedding_latency': float(os.getenv('LLM_FAKE_EMBEDDING_LATENCY', '0.05')),  # Seconds per embed_content call of the 'fake' backend
+    'fake_error_rate': float(os.getenv('LLM_FAKE_ERROR_RATE', '0.0')),  # Share of 'fake' backend calls that raise
+    'fake_requests_per_minute': float(os.getenv('LLM_FAKE_REQUESTS_PER_MINUTE', '0')),  # Quota of the 'fake' backend, calls beyond it fail with 429; 0 for none
+    'fake_seed': 0  # Seed of the 'fake' backend's failure injection
 }
 
 # Video processing configuration
 VIDEO_CONFIG = {
     'highlight_min_duration': 1.0,  # Minimum duration for a highlight in seconds
     'highlight_max_duration': 10.0,  # Maximum duration for a highlight in seconds
-    'video_extensions': ['.mp4', '.mov', '.avi']
+    'video_extensions': ['.mp4', '.mov', '.avi'],
+    'scene_change_threshold': 30,  # Percentage of changed pixels that marks a scene change
+    'scene_detection_mode': os.getenv('SCENE_DETECTION_MODE', 'full'),  # 'full' or 'thumbnail'
+    'scene_thumbnail_size': (160, 90),  # (width, height) of grayscale thumbnails in 'thumbnail' mode
+    'scene_frame_stride': 1,  # Compare every Nth frame in 'thumbnail' mode
+    'scene_sample_fps': None,  # Target sampling FPS in 'thumbnail' mode, overrides scene_frame_stride when set
+    'decoder_backend': os.getenv('DECODER_BACKEND', 'opencv'),  # 'opencv' or 'ffmpeg' (pipe, needs ffmpeg >= 5.1) for scene scans
+    'scene_keyframes_only': False,  # Only compare keyframes (-skip_frame nokey) with the 'ffmpeg' backend
+    'scene_scan_shards': int(os.getenv('SCENE_SCAN_SHARDS', '1')),  # Processes scanning time ranges of one video in parallel ('opencv' backend)
+    'scene_scan_min_shard_duration': 60.0,  # Seconds of video per shard at least, shorter videos use fewer shards
+    'dedup_enabled': os.getenv('DEDUP_ENABLED', 'false').lower() == 'true',  # Skip segments whose keyframes repeat an earlier segment (changes which highlights are kept)
+    'dedup_max_distance': 5,  # Maximum mean differing dHash bits (of 64) between near-duplicate segments
+    'max_highlights_per_video': None,  # Only the top-scoring segments are enriched when set
+    'max_highlights_per_minute': None,  # Budget relative to video length, the stricter of both budgets applies
+    'saliency_weights': {'motion': 0.4, 'loudness': 0.3, 'speech': 0.3},  # Weights of the rank-normalized signals
+    'speech_rms_threshold_db': -40.0,  # 30ms audio windows louder than this (dBFS) count as voice activity
+    'segmentation_mode': os.getenv('SEGMENTATION_MODE', 'scenes'),  # 'scenes' (one segment per scene) or 'chapters'
+    'chapter_target_duration': 30.0,  # Adjacent scenes are merged until a chapter is at least this long in 'chapters' mode
+    'chapter_max_duration': 60.0,  # Chapters never grow past this; longer scenes are split evenly in 'chapters' mode
+    'max_segments_per_video': int(os.getenv('MAX_SEGMENTS_PER_VIDEO', '200'))  # Hard cap, the shortest touching neighbours are merged beyond it
+}
+
+# Audio processing configuration
+AUDIO_CONFIG = {
+    'sample_rate': 16000,  # Sample rate the audio track is decoded to for speech recognition
+    'ffmpeg_binary': os.getenv('FFMPEG_BINARY', 'ffmpeg')
+}
+
+# Pipeline configuration
+PROCESSING_CONFIG = {
+    'enrichment_concurrency': int(os.getenv('ENRICHMENT_CONCURRENCY', '4')),  # Highlights transcribed and described concurrently
+    'async_enrichment': os.getenv('ASYNC_ENRICHMENT', 'false').lower() == 'true',  # Keep enrichment_concurrency groups in flight on one event loop instead of one thread each
+    'checkpoint_interval': 10,  # Enriched segments per checkpoint commit, a restarted run resumes after the last one
+    'pipeline_workers': {  # Worker threads per pipeline stage; enrich uses enrichment_concurrency and collect always has one
+        'scan': int(os.getenv('PIPELINE_SCAN_WORKERS', '1')),  # Videos decoded and segmented concurrently
+        'frames': int(os.getenv('PIPELINE_FRAME_WORKERS', '1')),
+        'embed': int(os.getenv('PIPELINE_EMBED_WORKERS', '1')),
+        'store': 1
+    },
+    'pipeline_videos_ahead': int(os.getenv('PIPELINE_VIDEOS_AHEAD', '1')),  # Segmented videos (with their decoded audio) waiting for frame grabbing
+    'pipeline_queue_size': int(os.getenv('PIPELINE_QUEUE_SIZE', '8')),  # Items buffered between the later stages, a full queue blocks its producer
+    'metrics_port': int(os.getenv('METRICS_PORT')) if os.getenv('METRICS_PORT') else None  # Serve Prometheus metrics on this port when set
+}
+
+# Daemon mode configuration
+DAEMON_CONFIG = {
+    'worker_id': os.getenv('WORKER_ID'),  # Identifies the extractor in the jobs table, defaults to hostname and pid
+    'watch': os.getenv('DAEMON_WATCH', 'true').lower() == 'true',  # Queue new files of the videos directory; replicas can leave it to one
+    'poll_interval': float(os.getenv('DAEMON_POLL_INTERVAL', '5')),  # Seconds between directory scans, and between claims while the queue is empty
+    'heartbeat_interval': float(os.getenv('JOB_HEARTBEAT_INTERVAL', '15')),  # Seconds between heartbeats of a running job
+    'stall_timeout': float(os.getenv('JOB_STALL_TIMEOUT', '120')),  # Running jobs without a heartbeat for this long are requeued
+    'max_attempts': int(os.getenv('JOB_MAX_ATTEMPTS', '3'))  # Claims of a job before it is marked failed
 }
 
 # Path configuration
 PATHS = {
-    'videos_dir': os.path.join(os.path.dirname(os.path.dirname(__file__)), 'videos')
+    'videos_dir': os.path.join(os.path.dirname(os.path.dirname(__file__)), 'videos'),
+    'cache_dir': os.getenv('CACHE_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'cache')),
+    'reports_dir': os.getenv('REPORTS_DIR', os.path.join(os.path.dirname(os.path.dirname(__file__)), 'reports'))  # JSON run report per video, empty disables
+}
+
+# Persistent cache configuration
+CACHE_CONFIG = {
+    'enabled': os.getenv('CACHE_ENABLED', 'true').lower() == 'true',
+    'embedding_cache_path': os.path.join(PATHS['cache_dir'], 'embeddings.sqlite'),
+    'embedding_cache_max_entries': 200000,  # Least recently used embeddings are evicted beyond this
+    'description_cache_path': os.path.join(PATHS['cache_dir'], 'descriptions.sqlite'),
+    'description_cache_max_entries': 50000  # Least recently used descriptions are evicted beyond this
 }
\ No newline at end of file
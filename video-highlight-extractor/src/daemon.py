@@ -0,0 +1,228 @@
+import os
+import time
+import signal
+import socket
+import logging
+import threading
+
+from .config import PATHS, VIDEO_CONFIG, DAEMON_CONFIG
+from .utils import metrics
+
+def _interrupt(signum, frame):
+    """Stop the daemon on SIGTERM (docker stop) the same way as on Ctrl-C"""
+    raise KeyboardInterrupt()
+
+class ExtractorDaemon:
+    """
+    Long-running extractor that takes its videos from the jobs table
+    
+    Every replica scans the videos directory for new or changed files and
+    queues them; queueing is idempotent, so replicas sharing the directory can
+    all watch it. Jobs are claimed one at a time with FOR UPDATE SKIP LOCKED,
+    kept alive with heartbeats while they run, and requeued by any replica once
+    their heartbeats stop, so throughput scales with the number of replicas.
+    """
+    
+    def __init__(self, db_manager, concurrency=None, worker_id=None):
+        """
+        Initialize the daemon
+        
+        Args:
+            db_manager (DBManager): Database manager instance
+            concurrency (int, optional): Number of highlights enriched concurrently
+            worker_id (str, optional): ID of this extractor in the jobs table, defaults to
+                DAEMON_CONFIG['worker_id'] or hostname and pid
+        """
+        self.db_manager = db_manager
+        self.concurrency = concurrency
+        self.worker_id = worker_id or DAEMON_CONFIG['worker_id'] or f"{socket.gethostname()}-{os.getpid()}"
+        self.videos_dir = PATHS['videos_dir']
+        
+        self.watch = DAEMON_CONFIG['watch']
+        self.poll_interval = DAEMON_CONFIG['poll_interval']
+        self.heartbeat_interval = DAEMON_CONFIG['heartbeat_interval']
+        self.stall_timeout = DAEMON_CONFIG['stall_timeout']
+        self.max_attempts = DAEMON_CONFIG['max_attempts']
+        
+        # Size and modification time of every video at the last scan, and when it was last queued
+        self.observed = {}
+        self.queued = {}
+    
+    def run(self):
+        """
+        Watch the videos directory and process queued jobs until interrupted
+        
+        Raises:
+            KeyboardInterrupt: On Ctrl-C or SIGTERM, after the running job was put back in the queue
+        """
+        signal.signal(signal.SIGTERM, _interrupt)
+        logging.info(f"Extractor {self.worker_id} running in daemon mode on {self.videos_dir}")
+        
+        # Directory scans and stalled job checks go on while a job is processed
+        stopping = threading.Event()
+        maintenance = threading.Thread(target=self.maintain, args=(stopping,), name="daemon-maintenance", daemon=True)
+        maintenance.start()
+        
+        try:
+            while True:
+                try:
+                    job = self.db_manager.claim_job(self.worker_id)
+                except Exception as e:
+                    logging.error(f"Error claiming a job: {e}")
+                    job = None
+                
+                if job is None:
+                    time.sleep(self.poll_interval)
+                    continue
+                
+                self.process_job(job)
+        finally:
+            stopping.set()
+            maintenance.join()
+    
+    def maintain(self, stopping):
+        """
+        Scan the videos directory and requeue stalled jobs every poll interval
+        
+        Args:
+            stopping (threading.Event): Set when the daemon stops
+        """
+        while True:
+            try:
+                if self.watch:
+                    self.scan_videos_dir()
+                self.requeue_stalled_jobs()
+            except Exception as e:
+                logging.error(f"Error maintaining the job queue: {e}")
+            
+            if stopping.wait(self.poll_interval):
+                return
+    
+    def scan_videos_dir(self):
+        """
+        Queue the videos that are new or changed since they were last queued
+        
+        A file is only queued once its size and modification time are unchanged
+        between two scans, so videos still being copied in are not picked up.
+        
+        Returns:
+            int: Number of videos queued
+        """
+        if not os.path.isdir(self.videos_dir):
+            logging.warning(f"Videos directory not found: {self.videos_dir}")
+            return 0
+        
+        observed = {}
+        for root, _, filenames in os.walk(self.videos_dir):
+            for filename in filenames:
+                if not any(filename.lower().endswith(ext) for ext in VIDEO_CONFIG['video_extensions']):
+                    continue
+                
+                file_path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                
+                observed[os.path.relpath(file_path, self.videos_dir)] = (stat.st_size, stat.st_mtime)
+        
+        stable = [
+            (video_path, size, mtime)
+            for video_path, (size, mtime) in observed.items()
+            if self.observed.get(video_path) == (size, mtime) and self.queued.get(video_path) != (size, mtime)
+        ]
+        self.observed = observed
+        
+        if not stable:
+            return 0
+        
+        queued, deferred = self.db_manager.enqueue_jobs(stable)
+        
+        # Files changed while their job runs are offered again on the next scans
+        deferred = set(deferred)
+        for video_path, size, mtime in stable:
+            if video_path not in deferred:
+                self.queued[video_path] = (size, mtime)
+        
+        if queued:
+            logging.info(f"Queued {len(queued)} new or changed videos")
+            metrics.increment('jobs_queued', len(queued))
+        return len(queued)
+    
+    def requeue_stalled_jobs(self):
+        """Put jobs whose extractor stopped sending heartbeats back in the queue"""
+        for job_id, video_path, status in self.db_manager.requeue_stalled_jobs(self.stall_timeout, self.max_attempts):
+            if status == 'failed':
+                logging.error(f"Job {job_id} for {video_path} stalled on its last attempt, marked failed")
+                metrics.increment('jobs_failed')
+            else:
+                logging.warning(f"Job {job_id} for {video_path} stalled, requeued")
+                metrics.increment('jobs_requeued')
+    
+    def process_job(self, job):
+        """
+        Process the video of a claimed job while sending heartbeats
+        
+        Args:
+            job (Row): (id, video_path, attempts) of the claimed job
+        """
+        # Import here to avoid circular imports
+        from .main import process_video
+        from .pipeline import PipelineCancelled
+        
+        video_path = os.path.join(self.videos_dir, job.video_path)
+        logging.info(f"Claimed job {job.id} (attempt {job.attempts}): {video_path}")
+        metrics.increment('jobs_claimed')
+        
+        finished = threading.Event()
+        # Set when the claim is lost, stops the work so it doesn't race the new owner
+        lost = threading.Event()
+        
+        def send_heartbeats():
+            """Renew the claim until the job is finished"""
+            while not finished.wait(self.heartbeat_interval):
+                try:
+                    if not self.db_manager.heartbeat_job(job.id, self.worker_id):
+                        logging.warning(f"Job {job.id} was taken over by another extractor, stopping it")
+                        lost.set()
+                        return
+                except Exception as e:
+                    logging.error(f"Error sending heartbeat for job {job.id}: {e}")
+        
+        heartbeat = threading.Thread(target=send_heartbeats, name=f"heartbeat-{job.id}", daemon=True)
+        heartbeat.start()
+        
+        try:
+            if not os.path.isfile(video_path):
+                raise FileNotFoundError(f"Video file not found: {video_path}")
+            
+            video_id, highlights = process_video(
+                video_path, self.db_manager, concurrency=self.concurrency, cancel=lost
+            )
+        except PipelineCancelled:
+            logging.info(f"Discarded job {job.id}, it belongs to another extractor now")
+            metrics.increment('jobs_lost')
+            return
+        except KeyboardInterrupt:
+            self.db_manager.release_job(job.id, self.worker_id)
+            logging.info(f"Put job {job.id} back in the queue")
+            raise
+        except Exception as e:
+            # A failed write leaves the shared session unusable for the next jobs
+            self.db_manager.rollback()
+            status = self.db_manager.fail_job(job.id, self.worker_id, str(e), self.max_attempts)
+            logging.error(f"Error processing job {job.id} ({video_path}), {status or 'taken over'}: {e}")
+            if status is not None:
+                metrics.increment('jobs_failed' if status == 'failed' else 'jobs_retried')
+            return
+        finally:
+            finished.set()
+            heartbeat.join()
+        
+        if not self.db_manager.complete_job(job.id, self.worker_id, video_id):
+            logging.warning(f"Job {job.id} was taken over by another extractor before it completed")
+            metrics.increment('jobs_lost')
+            return
+        
+        logging.info(f"Completed job {job.id} with {len(highlights)} highlights: {video_path}")
+        metrics.increment('jobs_completed')
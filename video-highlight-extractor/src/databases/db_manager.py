@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, Text, ForeignKey, DateTime, MetaData, Table
+from sqlalchemy import create_engine, Column, Integer, String, Float, Text, ForeignKey, DateTime, MetaData, Table, text
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
 from sqlalchemy.sql import func
 from pgvector.sqlalchemy import Vector
@@ -19,12 +19,24 @@ class DBManager:
         
         # Ensure tables exist
         try:
+            # Register the models with Base.metadata before creating missing tables
+            from . import db_models
+            
             Base.metadata.create_all(self.engine)
+            self._upgrade_schema()
             logging.info("Database tables initialized successfully")
         except Exception as e:
             logging.error(f"Error initializing database tables: {e}")
             raise
     
+    def _upgrade_schema(self):
+        """Add columns introduced after the initial schema to existing tables"""
+        with self.engine.begin() as connection:
+            connection.execute(text("ALTER TABLE videos ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"))
+            connection.execute(text("ALTER TABLE videos ADD COLUMN IF NOT EXISTS config_hash VARCHAR(64)"))
+            connection.execute(text("ALTER TABLE videos ADD COLUMN IF NOT EXISTS status VARCHAR(16) NOT NULL DEFAULT 'completed'"))
+            connection.execute(text("CREATE INDEX IF NOT EXISTS ix_videos_content_hash ON videos (content_hash)"))
+    
     def add_video(self, filename, duration):
         """Add a new video to the database"""
         from .db_models import Video
@@ -49,6 +61,247 @@ class DBManager:
         self.session.commit()
         return highlight
     
+    def add_video_with_highlights(self, filename, duration, highlights, page_size=1000):
+        """
+        Add a video and all of its highlights in a single transaction
+        
+        Highlights are written with multi-row INSERT ... VALUES statements through
+        psycopg2, with embeddings sent as vector literals, instead of one ORM
+        flush and commit per row.
+        
+        Args:
+            filename (str): Video file name
+            duration (float): Video duration in seconds
+            highlights (list): List of (timestamp, description, summary, embedding) tuples;
+                embedding is a list, a numpy array or None
+            page_size (int): Rows per INSERT statement
+            
+        Returns:
+            tuple: (Video, list of Highlight) detached instances carrying the generated ids
+        """
+        from .db_models import Video
+        
+        connection = self.engine.raw_connection()
+        
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO videos (filename, duration) VALUES (%s, %s) RETURNING id",
+                    (filename, duration)
+                )
+                video_id = cursor.fetchone()[0]
+                highlight_ids = self._insert_highlights(cursor, video_id, highlights, page_size)
+            
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+        
+        video = Video(id=video_id, filename=filename, duration=duration)
+        return video, self._highlight_objects(video_id, highlight_ids, highlights)
+    
+    def _insert_highlights(self, cursor, video_id, highlights, page_size=1000):
+        """
+        Insert highlights with multi-row INSERT ... VALUES statements
+        
+        Args:
+            cursor: psycopg2 cursor of the open transaction
+            video_id (int): ID of the video
+            highlights (list): List of (timestamp, description, summary, embedding) tuples
+            page_size (int): Rows per INSERT statement
+            
+        Returns:
+            list: Generated highlight ids, in the order of highlights
+        """
+        from psycopg2.extras import execute_values
+        
+        if not highlights:
+            return []
+        
+        rows = [
+            (video_id, timestamp, description, summary, self._vector_literal(embedding))
+            for timestamp, description, summary, embedding in highlights
+        ]
+        
+        inserted = execute_values(
+            cursor,
+            "INSERT INTO highlights (video_id, timestamp, description, summary, embedding) "
+            "VALUES %s RETURNING id",
+            rows,
+            template="(%s, %s, %s, %s, %s::vector)",
+            page_size=page_size,
+            fetch=True
+        )
+        return [row[0] for row in inserted]
+    
+    def _highlight_objects(self, video_id, highlight_ids, highlights):
+        """Build detached Highlight instances for rows written with _insert_highlights"""
+        from .db_models import Highlight
+        
+        return [
+            Highlight(
+                id=highlight_id,
+                video_id=video_id,
+                timestamp=timestamp,
+                description=description,
+                summary=summary,
+                embedding=embedding
+            )
+            for highlight_id, (timestamp, description, summary, embedding) in zip(highlight_ids, highlights)
+        ]
+    
+    def get_video_by_content_hash(self, content_hash):
+        """Get the most recent video with the given content hash, or None"""
+        from .db_models import Video
+        
+        return self.session.query(Video).\
+            filter(Video.content_hash == content_hash).\
+            order_by(Video.id.desc()).first()
+    
+    def start_video(self, filename, duration, content_hash, config_hash):
+        """
+        Get or create the video row of a resumable extraction run
+        
+        A video is identified by its content hash, so re-running never adds a
+        second row for the same file. Checkpoints of an unfinished run with the
+        same configuration are returned for resuming; if the configuration
+        changed, the old highlights and checkpoints are discarded.
+        
+        Args:
+            filename (str): Video file name
+            duration (float): Video duration in seconds
+            content_hash (str): SHA-256 of the video file
+            config_hash (str): Hash of the extraction configuration
+            
+        Returns:
+            tuple: (Video, dict of SegmentCheckpoint by segment index)
+        """
+        from .db_models import Video, Highlight, SegmentCheckpoint
+        
+        try:
+            video = self.get_video_by_content_hash(content_hash)
+            
+            if video is None:
+                video = Video(
+                    filename=filename,
+                    duration=duration,
+                    content_hash=content_hash,
+                    config_hash=config_hash,
+                    status='processing'
+                )
+                self.session.add(video)
+                self.session.commit()
+                return video, {}
+            
+            if video.config_hash != config_hash or video.status != 'processing':
+                self.session.query(Highlight).filter(Highlight.video_id == video.id).delete()
+                self.session.query(SegmentCheckpoint).filter(SegmentCheckpoint.video_id == video.id).delete()
+                video.config_hash = config_hash
+                video.status = 'processing'
+            
+            video.filename = filename
+            video.duration = duration
+            self.session.commit()
+            
+            checkpoints = self.session.query(SegmentCheckpoint).\
+                filter(SegmentCheckpoint.video_id == video.id).all()
+        except Exception:
+            # The session is shared by the whole run and must stay usable
+            self.session.rollback()
+            raise
+        
+        return video, {checkpoint.segment_index: checkpoint for checkpoint in checkpoints}
+    
+    def add_checkpoints(self, video_id, segments):
+        """
+        Record enriched segments of an unfinished run in one commit
+        
+        A checkpoint that already exists for a segment index is overwritten; it
+        belongs to a segment that has since moved, e.g. after re-segmenting.
+        
+        Args:
+            video_id (int): ID of the video
+            segments (list): List of (segment_index, start_time, end_time, description, summary) tuples
+        """
+        from sqlalchemy.dialects.postgresql import insert
+        from .db_models import SegmentCheckpoint
+        
+        if not segments:
+            return
+        
+        statement = insert(SegmentCheckpoint).values([
+            {
+                'video_id': video_id,
+                'segment_index': segment_index,
+                'start_time': start_time,
+                'end_time': end_time,
+                'description': description,
+                'summary': summary
+            }
+            for segment_index, start_time, end_time, description, summary in segments
+        ])
+        statement = statement.on_conflict_do_update(
+            index_elements=['video_id', 'segment_index'],
+            set_={
+                column: statement.excluded[column]
+                for column in ('start_time', 'end_time', 'description', 'summary')
+            }
+        )
+        
+        try:
+            self.session.execute(statement)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+    
+    def complete_video(self, video_id, highlights, page_size=1000):
+        """
+        Store the highlights of a run and mark the video completed in one transaction
+        
+        Args:
+            video_id (int): ID of the video
+            highlights (list): List of (timestamp, description, summary, embedding) tuples
+            page_size (int): Rows per INSERT statement
+            
+        Returns:
+            list: Detached Highlight instances carrying the generated ids
+        """
+        connection = self.engine.raw_connection()
+        
+        try:
+            with connection.cursor() as cursor:
+                # Highlights of an earlier, interrupted attempt at completing are replaced
+                cursor.execute("DELETE FROM highlights WHERE video_id = %s", (video_id,))
+                highlight_ids = self._insert_highlights(cursor, video_id, highlights, page_size)
+                cursor.execute("DELETE FROM segment_checkpoints WHERE video_id = %s", (video_id,))
+                cursor.execute("UPDATE videos SET status = 'completed' WHERE id = %s", (video_id,))
+            
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+        
+        # The ORM session's copies of the video and its checkpoints are now stale
+        self.session.expire_all()
+        
+        return self._highlight_objects(video_id, highlight_ids, highlights)
+    
+    @staticmethod
+    def _vector_literal(embedding):
+        """Format an embedding as a pgvector text literal, or None for a missing embedding"""
+        if embedding is None:
+            return None
+        
+        if isinstance(embedding, np.ndarray):
+            embedding = embedding.tolist()
+        
+        return "[" + ",".join(map(str, embedding)) + "]"
+    
     def get_similar_highlights(self, embedding, limit=5):
         """Find similar highlights using vector similarity search"""
         from .db_models import Highlight
@@ -70,9 +323,186 @@ class DBManager:
         return self.session.query(Video).all()
     
     def get_highlights_by_video_id(self, video_id):
-        """Get all highlights for a specific video"""
+        """
+        Get all highlights for a specific video
+        
+        The highlights are detached from the session, so they stay readable
+        while other threads commit and expire it.
+        
+        Args:
+            video_id (int): ID of the video
+        
+        Returns:
+            list: Highlight objects of the video
+        """
         from .db_models import Highlight
-        return self.session.query(Highlight).filter(Highlight.video_id == video_id).all()
+        highlights = self.session.query(Highlight).filter(Highlight.video_id == video_id).all()
+        for highlight in highlights:
+            self.session.expunge(highlight)
+        return highlights
+    
+    def enqueue_jobs(self, files):
+        """
+        Queue videos for extraction in daemon mode
+        
+        A path that is already queued, running or done is left alone unless its
+        size or modification time changed, in which case it is queued again. A
+        changed path whose job is running is deferred, to be offered again once
+        the job is done. Job methods use their own connections and are safe to
+        call from any thread.
+        
+        Args:
+            files (list): List of (video_path, file_size, file_mtime) tuples, paths relative to the videos directory
+        
+        Returns:
+            tuple: (paths queued, changed paths deferred because their job is running)
+        """
+        queued = []
+        deferred = []
+        
+        with self.engine.begin() as connection:
+            for video_path, file_size, file_mtime in files:
+                params = {'video_path': video_path, 'file_size': file_size, 'file_mtime': file_mtime}
+                result = connection.execute(text(
+                    "INSERT INTO jobs (video_path, file_size, file_mtime, status) "
+                    "VALUES (:video_path, :file_size, :file_mtime, 'queued') "
+                    "ON CONFLICT (video_path) DO UPDATE SET "
+                    "file_size = EXCLUDED.file_size, file_mtime = EXCLUDED.file_mtime, status = 'queued', "
+                    "attempts = 0, worker_id = NULL, heartbeat_at = NULL, error = NULL, updated_at = now() "
+                    "WHERE jobs.status <> 'running' "
+                    "AND (jobs.file_size, jobs.file_mtime) IS DISTINCT FROM (EXCLUDED.file_size, EXCLUDED.file_mtime) "
+                    "RETURNING id"
+                ), params)
+                
+                if result.fetchall():
+                    queued.append(video_path)
+                    continue
+                
+                # Not queued: either the job already covers this version of the file, or it is running
+                stale = connection.execute(text(
+                    "SELECT 1 FROM jobs WHERE video_path = :video_path "
+                    "AND (file_size, file_mtime) IS DISTINCT FROM (:file_size, :file_mtime)"
+                ), params).fetchall()
+                if stale:
+                    deferred.append(video_path)
+        
+        return queued, deferred
+    
+    def claim_job(self, worker_id):
+        """
+        Claim the oldest queued job
+        
+        Rows locked by concurrent claims are skipped (FOR UPDATE SKIP LOCKED), so
+        any number of extractors can claim jobs without blocking each other or
+        claiming the same job twice.
+        
+        Args:
+            worker_id (str): ID of the claiming extractor
+        
+        Returns:
+            Row: (id, video_path, attempts) of the claimed job, or None if the queue is empty
+        """
+        with self.engine.begin() as connection:
+            return connection.execute(text(
+                "UPDATE jobs SET status = 'running', worker_id = :worker_id, attempts = attempts + 1, "
+                "heartbeat_at = now(), error = NULL, updated_at = now() "
+                "WHERE id = ("
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1 FOR UPDATE SKIP LOCKED"
+                ") RETURNING id, video_path, attempts"
+            ), {'worker_id': worker_id}).first()
+    
+    def heartbeat_job(self, job_id, worker_id):
+        """
+        Record that a running job is still being worked on
+        
+        Args:
+            job_id (int): ID of the job
+            worker_id (str): ID of the extractor running it
+        
+        Returns:
+            bool: False if the job no longer belongs to the extractor, e.g. it was requeued as stalled
+        """
+        with self.engine.begin() as connection:
+            result = connection.execute(text(
+                "UPDATE jobs SET heartbeat_at = now() "
+                "WHERE id = :job_id AND worker_id = :worker_id AND status = 'running'"
+            ), {'job_id': job_id, 'worker_id': worker_id})
+            return result.rowcount > 0
+    
+    def complete_job(self, job_id, worker_id, video_id):
+        """
+        Mark a running job of the extractor completed with the ID of its video
+        
+        Args:
+            job_id (int): ID of the job
+            worker_id (str): ID of the extractor running it
+            video_id (int): ID of the video row
+        
+        Returns:
+            bool: False if the job no longer belonged to the extractor
+        """
+        with self.engine.begin() as connection:
+            result = connection.execute(text(
+                "UPDATE jobs SET status = 'completed', video_id = :video_id, error = NULL, updated_at = now() "
+                "WHERE id = :job_id AND worker_id = :worker_id AND status = 'running'"
+            ), {'job_id': job_id, 'worker_id': worker_id, 'video_id': video_id})
+            return result.rowcount > 0
+    
+    def fail_job(self, job_id, worker_id, error, max_attempts):
+        """
+        Record a failed attempt at a job, queueing it again until it has been attempted max_attempts times
+        
+        Args:
+            job_id (int): ID of the job
+            worker_id (str): ID of the extractor running it
+            error (str): Error message
+            max_attempts (int): Attempts before the job is marked failed
+        
+        Returns:
+            str: New status of the job ('queued' or 'failed'), or None if it no longer belonged to the extractor
+        """
+        with self.engine.begin() as connection:
+            return connection.execute(text(
+                "UPDATE jobs SET status = CASE WHEN attempts >= :max_attempts THEN 'failed' ELSE 'queued' END, "
+                "worker_id = NULL, heartbeat_at = NULL, error = :error, updated_at = now() "
+                "WHERE id = :job_id AND worker_id = :worker_id AND status = 'running' "
+                "RETURNING status"
+            ), {'job_id': job_id, 'worker_id': worker_id, 'error': error, 'max_attempts': max_attempts}).scalar()
+    
+    def release_job(self, job_id, worker_id):
+        """Put a job the extractor stopped working on back in the queue, without counting the attempt"""
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                "UPDATE jobs SET status = 'queued', attempts = GREATEST(attempts - 1, 0), "
+                "worker_id = NULL, heartbeat_at = NULL, updated_at = now() "
+                "WHERE id = :job_id AND worker_id = :worker_id AND status = 'running'"
+            ), {'job_id': job_id, 'worker_id': worker_id})
+    
+    def requeue_stalled_jobs(self, stall_timeout, max_attempts):
+        """
+        Queue running jobs whose extractor stopped sending heartbeats again
+        
+        Jobs that already had max_attempts attempts are marked failed instead.
+        
+        Args:
+            stall_timeout (float): Seconds without a heartbeat after which a job counts as stalled
+            max_attempts (int): Attempts before a job is marked failed
+        
+        Returns:
+            list: (id, video_path, status) of the jobs requeued or failed
+        """
+        with self.engine.begin() as connection:
+            return connection.execute(text(
+                "UPDATE jobs SET status = CASE WHEN attempts >= :max_attempts THEN 'failed' ELSE 'queued' END, "
+                "error = 'No heartbeat from ' || COALESCE(worker_id, 'unknown extractor') || ' since ' || heartbeat_at, "
+                "worker_id = NULL, heartbeat_at = NULL, updated_at = now() "
+                "WHERE status = 'running' AND heartbeat_at < now() - make_interval(secs => :stall_timeout) "
+                "RETURNING id, video_path, status"
+            ), {'stall_timeout': stall_timeout, 'max_attempts': max_attempts}).fetchall()
+    
+    def rollback(self):
+        """Discard the uncommitted changes of a failed write, so the session stays usable"""
+        self.session.rollback()
     
     def close(self):
         """Close the database session"""
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Text, ForeignKey, DateTime, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
@@ -12,13 +12,19 @@ class Video(Base):
     id = Column(Integer, primary_key=True)
     filename = Column(String(255), nullable=False)
     duration = Column(Float, nullable=False)
+    content_hash = Column(String(64), index=True)  # SHA-256 of the video file
+    config_hash = Column(String(64))  # Hash of the extraction configuration used
+    status = Column(String(16), nullable=False, server_default='completed')  # 'processing' or 'completed'
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationship with highlights
     highlights = relationship("Highlight", back_populates="video", cascade="all, delete-orphan")
     
+    # Relationship with enriched segments of an unfinished run
+    checkpoints = relationship("SegmentCheckpoint", back_populates="video", cascade="all, delete-orphan")
+    
     def __repr__(self):
-        return f"<Video(id={self.id}, filename='{self.filename}', duration={self.duration})>"
+        return f"<Video(id={self.id}, filename='{self.filename}', duration={self.duration}, status='{self.status}')>"
 
 
 class Highlight(Base):
@@ -48,3 +54,43 @@ class Highlight(Base):
             'summary': self.summary,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+
+class SegmentCheckpoint(Base):
+    __tablename__ = 'segment_checkpoints'
+    __table_args__ = (UniqueConstraint('video_id', 'segment_index'),)
+    
+    id = Column(Integer, primary_key=True)
+    video_id = Column(Integer, ForeignKey('videos.id', ondelete='CASCADE'), nullable=False)
+    segment_index = Column(Integer, nullable=False)
+    start_time = Column(Float, nullable=False)
+    end_time = Column(Float, nullable=False)
+    description = Column(Text, nullable=False)
+    summary = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationship with video
+    video = relationship("Video", back_populates="checkpoints")
+    
+    def __repr__(self):
+        return f"<SegmentCheckpoint(video_id={self.video_id}, segment_index={self.segment_index}, start_time={self.start_time})>"
+
+
+class Job(Base):
+    __tablename__ = 'jobs'
+    
+    id = Column(Integer, primary_key=True)
+    video_path = Column(String(1024), nullable=False, unique=True)  # Relative to the videos directory
+    file_size = Column(BigInteger)
+    file_mtime = Column(Float)
+    status = Column(String(16), nullable=False, server_default='queued', index=True)  # 'queued', 'running', 'completed' or 'failed'
+    attempts = Column(Integer, nullable=False, server_default='0')
+    worker_id = Column(String(255))  # Extractor that claimed the job
+    heartbeat_at = Column(DateTime(timezone=True))
+    error = Column(Text)
+    video_id = Column(Integer, ForeignKey('videos.id', ondelete='SET NULL'))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<Job(id={self.id}, video_path='{self.video_path}', status='{self.status}', attempts={self.attempts})>"
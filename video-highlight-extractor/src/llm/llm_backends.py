@@ -0,0 +1,246 @@
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+import numpy as np
+from types import SimpleNamespace
+from collections import deque
+
+from ..config import LLM_CONFIG
+
+class FakeBackendError(RuntimeError):
+    """Simulated failure of the fake LLM backend, with the HTTP status code in .code like google.api_core errors"""
+    
+    def __init__(self, message, code=503):
+        super().__init__(message)
+        self.code = code
+
+def get_backend():
+    """Get the configured LLM backend ('gemini' or 'fake')"""
+    backend = LLM_CONFIG['backend']
+    
+    if backend not in ('gemini', 'fake'):
+        raise ValueError(f"Unknown LLM backend: {backend}")
+    
+    return backend
+
+def _configure_gemini():
+    """Import and configure the Google Generative AI client"""
+    if not LLM_CONFIG.get('api_key'):
+        raise ValueError("Google API key is not set. Please set the GOOGLE_API_KEY environment variable.")
+    
+    import google.generativeai as genai
+    
+    # Configure the generative AI service
+    genai.configure(api_key=LLM_CONFIG['api_key'])
+    return genai
+
+def create_generative_model(model_name):
+    """
+    Create the model highlight descriptions are generated with
+    
+    Args:
+        model_name (str): Name of the generative model
+    
+    Returns:
+        object: Model with generate_content(parts, generation_config) and its async variant
+            generate_content_async
+    """
+    if get_backend() == 'fake':
+        return FakeGenerativeModel(model_name)
+    
+    return _configure_gemini().GenerativeModel(model_name)
+
+def create_embedding_client():
+    """
+    Create the client embeddings are generated with
+    
+    Returns:
+        object: Client with embed_content(model, content, task_type) and its async variant
+            embed_content_async
+    """
+    if get_backend() == 'fake':
+        return FakeEmbeddingClient()
+    
+    return _configure_gemini()
+
+# Times of the fake calls accepted within the last minute, by call
+_quota_windows = {}
+_quota_lock = threading.Lock()
+
+class _FakeFailures:
+    """Seeded latency, failure and quota injection shared by the fake clients"""
+    
+    def __init__(self, latency, error_rate, seed, requests_per_minute=0):
+        """Initialize the failure injection"""
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests_per_minute = requests_per_minute
+        self.lock = threading.Lock()
+    
+    def _admit(self, what):
+        """
+        Check the quota and draw whether a call fails
+        
+        Returns:
+            bool: Whether the call fails after its latency
+        """
+        if self.requests_per_minute:
+            with _quota_lock:
+                # The quota is shared by all clients of the process, like a project quota
+                accepted = _quota_windows.setdefault(what, deque())
+                now = time.monotonic()
+                while accepted and accepted[0] < now - 60.0:
+                    accepted.popleft()
+                
+                if len(accepted) >= self.requests_per_minute:
+                    raise FakeBackendError(f"Simulated {what} quota exceeded", code=429)
+                accepted.append(now)
+        
+        with self.lock:
+            return self.random.random() < self.error_rate
+    
+    def call(self, what):
+        """
+        Sleep for the configured latency and raise for the configured share of calls
+        
+        Calls beyond the quota of the last minute fail right away with 429, the
+        others fail with 503 at the configured error rate.
+        """
+        fail = self._admit(what)
+        
+        if self.latency > 0:
+            time.sleep(self.latency)
+        
+        if fail:
+            raise FakeBackendError(f"Simulated {what} failure", code=503)
+    
+    async def call_async(self, what):
+        """Like call, waiting out the latency on the event loop"""
+        fail = self._admit(what)
+        
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+        
+        if fail:
+            raise FakeBackendError(f"Simulated {what} failure", code=503)
+
+def _digest(*parts):
+    """Stable digest of the given text or bytes parts"""
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+class FakeGenerativeModel:
+    """
+    Offline stand-in for genai.GenerativeModel
+    
+    Answers are JSON in the shape the prompts ask for, derived from a hash of the
+    request, so identical requests always get identical answers. Latency, error
+    rate and requests per minute come from LLM_CONFIG.
+    """
+    
+    def __init__(self, model_name):
+        """Initialize the fake model"""
+        self.model_name = model_name
+        self.failures = _FakeFailures(
+            LLM_CONFIG['fake_latency'], LLM_CONFIG['fake_error_rate'], LLM_CONFIG['fake_seed'],
+            LLM_CONFIG['fake_requests_per_minute']
+        )
+        logging.info(f"Using fake LLM backend for model: {model_name}")
+    
+    def generate_content(self, parts, generation_config=None):
+        """
+        Generate a deterministic answer for a multi-modal request
+        
+        Args:
+            parts (list): Text parts ({"text": ...}) and image parts ({"data": ...})
+            generation_config (dict, optional): Ignored
+        
+        Returns:
+            SimpleNamespace: Response with a text attribute
+        """
+        self.failures.call("generate_content")
+        return self._answer(parts)
+        
+    async def generate_content_async(self, parts, generation_config=None):
+        """Async variant of generate_content, like GenerativeModel.generate_content_async"""
+        await self.failures.call_async("generate_content")
+        return self._answer(parts)
+    
+    def _answer(self, parts):
+        """Deterministic answer to the parts of a request"""
+        text = "\n".join(part["text"] for part in parts if "text" in part)
+        digest = _digest(self.model_name, text, *(part["data"] for part in parts if "data" in part))
+        
+        segments = [int(number) for number in re.findall(r"SEGMENT (\d+)", text)]
+        if segments:
+            answer = [dict(segment=number, **self._describe(digest, number)) for number in segments]
+        else:
+            answer = self._describe(digest, 1)
+        
+        return SimpleNamespace(text=json.dumps(answer))
+    
+    def _describe(self, digest, number):
+        """Description and summary of one highlight"""
+        tag = _digest(digest, number)[:12]
+        return {
+            "description": f"Synthetic description {tag} of highlight {number}. " * 8,
+            "summary": f"Synthetic summary {tag} of highlight {number}."
+        }
+
+class FakeEmbeddingClient:
+    """
+    Offline stand-in for genai.embed_content
+    
+    Vectors are unit-length and seeded by a hash of the model, task type and
+    text, so the same text always embeds to the same vector.
+    """
+    
+    def __init__(self):
+        """Initialize the fake embedding client"""
+        self.dimension = LLM_CONFIG['embedding_dimension']
+        self.failures = _FakeFailures(
+            LLM_CONFIG['fake_embedding_latency'], LLM_CONFIG['fake_error_rate'], LLM_CONFIG['fake_seed'] + 1
+        )
+        logging.info("Using fake embedding backend")
+    
+    def embed_content(self, model, content, task_type=None):
+        """
+        Embed one text or a list of texts
+        
+        Args:
+            model (str): Name of the embedding model
+            content (str or list): Text or list of texts
+            task_type (str, optional): Embedding task type
+        
+        Returns:
+            dict: {"embedding": vector, or list of vectors for a list of texts}
+        """
+        self.failures.call("embed_content")
+        return self._embed(model, content, task_type)
+        
+    async def embed_content_async(self, model, content, task_type=None):
+        """Async variant of embed_content, like genai.embed_content_async"""
+        await self.failures.call_async("embed_content")
+        return self._embed(model, content, task_type)
+    
+    def _embed(self, model, content, task_type):
+        """Vector of one text, or list of vectors of a list of texts"""
+        if isinstance(content, list):
+            return {"embedding": [self._vector(model, task_type, text) for text in content]}
+        
+        return {"embedding": self._vector(model, task_type, content)}
+    
+    def _vector(self, model, task_type, text):
+        """Deterministic unit vector of a text"""
+        seed = int(_digest(model, task_type, text)[:16], 16)
+        vector = np.random.default_rng(seed).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).tolist()
@@ -1,25 +1,69 @@
+import asyncio
 import logging
 import numpy as np
-import google.generativeai as genai
 
-from ..config import LLM_CONFIG
+from ..config import LLM_CONFIG, CACHE_CONFIG
+from ..utils.cache import open_cache, make_cache_key
+from .llm_backends import get_backend, create_embedding_client
+from .rate_limiter import get_rate_limiter
+from ..utils import metrics
 
 class EmbeddingService:
     def __init__(self):
-        """Initialize the embedding service with Google's Generative AI"""
-        if not LLM_CONFIG.get('api_key'):
-            raise ValueError("Google API key is not set. Please set the GOOGLE_API_KEY environment variable.")
-        
-        # Configure the generative AI service
-        genai.configure(api_key=LLM_CONFIG['api_key'])
+        """Initialize the embedding service with the configured backend (Google's Generative AI by default)"""
+        self.backend = get_backend()
+        self.client = create_embedding_client()
         
         try:
             # Initialize the embedding model with the correct prefix format
-            self.model_name = "models/embedding-001"
+            self.model_name = LLM_CONFIG['embedding_model']
+            self.dimension = LLM_CONFIG['embedding_dimension']
+            self.batch_size = LLM_CONFIG['embedding_batch_size']
+            self.max_retries = LLM_CONFIG['embedding_max_retries']
+            self.task_type = "retrieval_document"
             logging.info(f"Embedding service initialized with model: {self.model_name}")
         except Exception as e:
             logging.error(f"Error initializing embedding service: {e}")
             raise
+        
+        # Requests of every EmbeddingService in this process share one quota
+        self.limiter = get_rate_limiter('embedding')
+        
+        # Persistent cache of embeddings keyed by model, task type and text
+        self.cache = None
+        if CACHE_CONFIG['enabled']:
+            try:
+                self.cache = open_cache(
+                    CACHE_CONFIG['embedding_cache_path'],
+                    CACHE_CONFIG['embedding_cache_max_entries'],
+                    name="Embedding cache"
+                )
+            except Exception as e:
+                logging.warning(f"Embedding cache disabled, could not open it: {e}")
+    
+    def _cache_key(self, text):
+        """Content-addressed cache key of an embedding"""
+        # Vectors of other backends must never be served for Gemini requests
+        model = self.model_name if self.backend == 'gemini' else f"{self.backend}:{self.model_name}"
+        return make_cache_key(model, self.task_type, text)
+    
+    def _embed_content(self, content):
+        """One embedding request for a text or a list of texts"""
+        metrics.increment('embedding_requests')
+        return self.client.embed_content(
+            model=self.model_name,
+            content=content,
+            task_type=self.task_type
+        )
+    
+    async def _embed_content_async(self, content):
+        """One embedding request for a text or a list of texts with the client's async API"""
+        metrics.increment('embedding_requests')
+        return await self.client.embed_content_async(
+            model=self.model_name,
+            content=content,
+            task_type=self.task_type
+        )
     
     def get_embedding(self, text):
         """
@@ -31,13 +75,14 @@ class EmbeddingService:
         Returns:
             numpy.ndarray: Embedding vector
         """
+        if self.cache is not None:
+            cached = self.cache.get(self._cache_key(text))
+            if cached is not None:
+                return np.frombuffer(cached, dtype=np.float32).copy()
+        
         try:
             # Create the embedding task with the correct model name format
-            embedding_task = genai.embed_content(
-                model=self.model_name,
-                content=text,
-                task_type="retrieval_document"
-            )
+            embedding_task = self.limiter.call(lambda: self._embed_content(text), tokens=len(text) // 4)
             
             # Get the embedding values
             embedding = embedding_task["embedding"]
@@ -45,10 +90,14 @@ class EmbeddingService:
             # Convert to numpy array
             embedding_array = np.array(embedding, dtype=np.float32)
             
+            if self.cache is not None:
+                self.cache.set(self._cache_key(text), embedding_array.tobytes())
+            
             return embedding_array
             
         except Exception as e:
             logging.error(f"Error generating embedding: {e}")
+            metrics.increment('embedding_failures')
             # Return a zero vector of the expected dimension in case of error
             return np.zeros(LLM_CONFIG['embedding_dimension'], dtype=np.float32)
     
@@ -65,4 +114,187 @@ class EmbeddingService:
         """
         # Combine description and summary for better embedding
         combined_text = f"{summary} {description}"
-        return self.get_embedding(combined_text)
\ No newline at end of file
+        return self.get_embedding(combined_text)
+    
+    def _cached_embeddings(self, texts):
+        """
+        Look up the embeddings of texts in the cache
+        
+        Returns:
+            tuple: (float32 matrix with NaN rows for texts not cached, indices of those texts)
+        """
+        embeddings = np.full((len(texts), self.dimension), np.nan, dtype=np.float32)
+        pending = list(range(len(texts)))
+        
+        # Only texts that are not cached are sent to the API
+        if self.cache is not None and texts:
+            keys = [self._cache_key(text) for text in texts]
+            cached = self.cache.get_many(keys)
+            
+            for i, key in enumerate(keys):
+                if key in cached:
+                    embeddings[i] = np.frombuffer(cached[key], dtype=np.float32)
+            
+            pending = [i for i, key in enumerate(keys) if key not in cached]
+        
+        return embeddings, pending
+    
+    def _count_retry(self, attempt, pending):
+        """Log and count the items resubmitted because a response had no valid vector for them"""
+        logging.warning(f"Resubmitting {len(pending)} embeddings without a valid vector (attempt {attempt}/{self.max_retries})")
+        metrics.increment('embedding_retries', len(pending))
+    
+    def _batch_request(self, texts, batch):
+        """Texts of a batch and the keyword arguments the rate limiter counts them with"""
+        content = [texts[j] for j in batch]
+        return content, {'requests': len(content), 'tokens': sum(len(text) for text in content) // 4}
+    
+    def _store_vectors(self, embeddings, batch, vectors):
+        """
+        Copy the valid vectors of a batch response into the result matrix
+        
+        Returns:
+            list: Indices of the batch without a valid vector
+        """
+        failed = []
+        for j, vector in zip(batch, vectors):
+            if vector is not None and len(vector) == self.dimension:
+                embeddings[j] = vector
+            else:
+                failed.append(j)
+        
+        # Items missing from a short response are resubmitted as well
+        failed.extend(batch[len(vectors):])
+        return failed
+    
+    def _finish_batch(self, texts, embeddings, fetched, failed):
+        """Count the embeddings that failed and cache the fetched ones"""
+        if failed:
+            logging.error(f"Failed to generate {len(failed)} of {len(texts)} embeddings")
+            metrics.increment('embedding_failures', len(failed))
+        
+        if self.cache is not None:
+            failed = set(failed)
+            self.cache.set_many({
+                self._cache_key(texts[i]): embeddings[i].tobytes()
+                for i in fetched if i not in failed
+            })
+    
+    def get_embeddings_batch(self, texts):
+        """
+        Generate embedding vectors for many texts with batched requests
+        
+        Texts are sent in fixed-size batches, one request each, which the rate
+        limiter retries on quota and server errors. Items that a successful
+        response returned no valid vector for are resubmitted, up to
+        embedding_max_retries times. Items that still fail are returned as rows
+        of NaN rather than zero vectors, so callers can tell them apart.
+        
+        Args:
+            texts (list): Texts to generate embeddings for
+            
+        Returns:
+            numpy.ndarray: float32 matrix of shape (len(texts), embedding dimension)
+        """
+        embeddings, pending = self._cached_embeddings(texts)
+        fetched = list(pending)
+        failed = []
+        
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            
+            if attempt > 0:
+                self._count_retry(attempt, pending)
+            
+            invalid = []
+            
+            for i in range(0, len(pending), self.batch_size):
+                batch = pending[i:i+self.batch_size]
+                content, quota = self._batch_request(texts, batch)
+                
+                try:
+                    embedding_task = self.limiter.call(lambda: self._embed_content(content), **quota)
+                    vectors = embedding_task["embedding"]
+                except Exception as e:
+                    # The rate limiter has already retried the request
+                    logging.error(f"Error generating batch of {len(batch)} embeddings: {e}")
+                    failed.extend(batch)
+                    continue
+                
+                invalid.extend(self._store_vectors(embeddings, batch, vectors))
+            
+            pending = invalid
+        
+        self._finish_batch(texts, embeddings, fetched, failed + pending)
+        return embeddings
+        
+    async def get_embeddings_batch_async(self, texts):
+        """
+        Generate embedding vectors for many texts with concurrent batched requests
+        
+        Like get_embeddings_batch, but the batches of a round are in flight
+        together on the event loop, within the rate limits, and the cache is
+        used from worker threads.
+        
+        Args:
+            texts (list): Texts to generate embeddings for
+            
+        Returns:
+            numpy.ndarray: float32 matrix of shape (len(texts), embedding dimension)
+        """
+        embeddings, pending = await asyncio.to_thread(self._cached_embeddings, texts)
+        fetched = list(pending)
+        failed = []
+        
+        async def send(batch):
+            """Embed one batch, returning (indices of a failed request, indices without a valid vector)"""
+            content, quota = self._batch_request(texts, batch)
+            try:
+                embedding_task = await self.limiter.call_async(lambda: self._embed_content_async(content), **quota)
+                vectors = embedding_task["embedding"]
+            except Exception as e:
+                logging.error(f"Error generating batch of {len(batch)} embeddings: {e}")
+                return batch, []
+            
+            return [], self._store_vectors(embeddings, batch, vectors)
+        
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            
+            if attempt > 0:
+                self._count_retry(attempt, pending)
+            
+            batches = [pending[i:i+self.batch_size] for i in range(0, len(pending), self.batch_size)]
+            outcomes = await asyncio.gather(*(send(batch) for batch in batches))
+            
+            failed.extend(j for request_failed, _ in outcomes for j in request_failed)
+            pending = [j for _, invalid in outcomes for j in invalid]
+        
+        await asyncio.to_thread(self._finish_batch, texts, embeddings, fetched, failed + pending)
+        return embeddings
+    
+    def get_highlight_embeddings_batch(self, highlights):
+        """
+        Generate embedding vectors for many highlights with batched requests
+        
+        Args:
+            highlights (list): List of (description, summary) tuples
+            
+        Returns:
+            numpy.ndarray: float32 matrix of shape (len(highlights), embedding dimension),
+                with NaN rows for highlights whose embedding failed
+        """
+        # Combine description and summary for better embedding, as in get_highlight_embedding
+        texts = [f"{summary} {description}" for description, summary in highlights]
+        return self.get_embeddings_batch(texts)
+
+    async def get_highlight_embeddings_batch_async(self, highlights):
+        """
+        Generate embedding vectors for many highlights with concurrent batched requests
+        
+        Same argument and result as get_highlight_embeddings_batch.
+        """
+        texts = [f"{summary} {description}" for description, summary in highlights]
+        return await self.get_embeddings_batch_async(texts)
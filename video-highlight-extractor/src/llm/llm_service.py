@@ -1,85 +1,205 @@
 import os
+import asyncio
 import logging
 import json
 import re
-import google.generativeai as genai
 import cv2
 import base64
 import numpy as np
-from ..config import LLM_CONFIG
+from ..config import LLM_CONFIG, CACHE_CONFIG
+from ..utils.cache import open_cache, make_cache_key
+from ..utils.image_hash import dhash
+from ..utils import metrics
+from .llm_backends import get_backend, create_generative_model
+from .rate_limiter import get_rate_limiter
+
+SYSTEM_PROMPT = """
+        You are a video analysis assistant that generates detailed descriptions of video highlights.
+        
+        Analyze the provided frames and transcript to create:
+        1. A detailed description of what's happening in the highlight segment
+        2. A concise summary highlighting the most important elements
+        
+        Focus on:
+        - Key objects, people, and actions visible in the frames
+        - Important speech content from the transcript
+        - The overall context and significance of this moment
+        
+        Return your analysis in JSON format with two fields:
+        - "description": A detailed paragraph (100-150 words) describing the highlight
+        - "summary": A concise summary (25-35 words) of the key moment
+        """
+
+BATCH_SYSTEM_PROMPT = """
+        You are a video analysis assistant that generates detailed descriptions of video highlights.
+        
+        You are given {count} separate highlight segments of the same video. Each segment
+        starts with a "SEGMENT <number>" header, its transcript and a list of frames,
+        followed by the images of those frames. Analyze every segment on its own.
+        
+        For each segment create:
+        1. A detailed description of what's happening in the highlight segment
+        2. A concise summary highlighting the most important elements
+        
+        Focus on:
+        - Key objects, people, and actions visible in the frames
+        - Important speech content from the transcript
+        - The overall context and significance of this moment
+        
+        Return a JSON array with exactly one object per segment, each with three fields:
+        - "segment": The segment number from its header
+        - "description": A detailed paragraph (100-150 words) describing the highlight
+        - "summary": A concise summary (25-35 words) of the key moment
+        """
+
+# Tokens counted per image part, as Gemini does for images up to 384 pixels per side
+IMAGE_TOKENS = 258
+
+GENERATION_CONFIG = {
+    "temperature": 0.4,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 1024,
+}
 
 class LLMService:
     def __init__(self):
-        """Initialize the LLM service with Google's Generative AI"""
-        if not LLM_CONFIG.get('api_key'):
-            raise ValueError("Google API key is not set. Please set the GOOGLE_API_KEY environment variable.")
-        
-        # Configure the generative AI service
-        genai.configure(api_key=LLM_CONFIG['api_key'])
+        """Initialize the LLM service with the configured backend (Google's Generative AI by default)"""
+        self.backend = get_backend()
         self.model_name = LLM_CONFIG['model']
+        self.prompt_version = LLM_CONFIG['prompt_version']
         
         try:
             # Initialize the generative model
-            self.model = genai.GenerativeModel(self.model_name)
+            self.model = create_generative_model(self.model_name)
             logging.info(f"LLM service initialized with model: {self.model_name}")
         except Exception as e:
             logging.error(f"Error initializing LLM service: {e}")
             raise
+        
+        # Requests of every LLMService in this process share one quota
+        self.limiter = get_rate_limiter('llm')
+        
+        # Persistent cache of descriptions keyed by keyframe hashes, transcript, model and prompt version
+        self.cache = None
+        if CACHE_CONFIG['enabled']:
+            try:
+                self.cache = open_cache(
+                    CACHE_CONFIG['description_cache_path'],
+                    CACHE_CONFIG['description_cache_max_entries'],
+                    name="Description cache"
+                )
+            except Exception as e:
+                logging.warning(f"Description cache disabled, could not open it: {e}")
     
-    def generate_highlight_description(self, frames, transcript, start_time, end_time):
+    def get_description_cache_key(self, frames, transcript):
         """
-        Generate a detailed description of a video highlight using the LLM
+        Build the description cache key of a highlight
+        
+        Frames are identified by perceptual hashes, so re-encoded or repeated
+        footage (intros, outros, title cards) maps to the same key.
         
         Args:
-            frames (list): List of frames from the highlight
+            frames (list): Frames sent to the model
             transcript (str): Transcribed speech from the highlight
-            start_time (float): Start time of the highlight
-            end_time (float): End time of the highlight
             
         Returns:
-            dict: Dictionary containing description and summary
+            str: Cache key
         """
-        # Format the prompt
-        system_prompt = """
-        You are a video analysis assistant that generates detailed descriptions of video highlights.
+        frame_hashes = ",".join(f"{dhash(frame):016x}" for frame in frames)
+        normalized_transcript = " ".join((transcript or "").lower().split())
         
-        Analyze the provided frames and transcript to create:
-        1. A detailed description of what's happening in the highlight segment
-        2. A concise summary highlighting the most important elements
+        # Answers of other backends must never be served for Gemini requests
+        model = self.model_name if self.backend == 'gemini' else f"{self.backend}:{self.model_name}"
         
-        Focus on:
-        - Key objects, people, and actions visible in the frames
-        - Important speech content from the transcript
-        - The overall context and significance of this moment
-        
-        Return your analysis in JSON format with two fields:
-        - "description": A detailed paragraph (100-150 words) describing the highlight
-        - "summary": A concise summary (25-35 words) of the key moment
+        return make_cache_key(model, self.prompt_version, frame_hashes, normalized_transcript)
+    
+    def _select_frames(self, frames):
+        """Select up to 3 representative frames to avoid exceeding context limits"""
+        return frames[:min(3, len(frames))]
+    
+    def _frame_descriptions(self, selected_frames, start_time, end_time):
+        """Describe the approximate time of each selected frame"""
+        return [
+            f"Frame {i+1} - At approximately {start_time + (i * ((end_time - start_time) / len(selected_frames))):.2f} seconds"
+            for i in range(len(selected_frames))
+        ]
+    
+    def _encode_frames(self, selected_frames):
         """
+        Encode frames as JPEG image parts for the model
         
-        # Convert frames to base64 for inclusion in the prompt
-        frame_descriptions = []
-        
-        # Select up to 3 representative frames to avoid exceeding context limits
-        selected_frames = frames[:min(3, len(frames))]
-        
-        for i, frame in enumerate(selected_frames):
-            # Convert frame to RGB format
+        Args:
+            selected_frames (list): BGR frames
+            
+        Returns:
+            list: Image parts with mime_type and data
+        """
+        image_parts = []
+        for frame in selected_frames:
+            # Convert frame to RGB
             frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             
-            # Resize frame to reduce size while maintaining aspect ratio
+            # Resize to reduce size
             height, width = frame_rgb.shape[:2]
             max_dimension = 512
-            
             if height > max_dimension or width > max_dimension:
                 scale = max_dimension / max(height, width)
                 new_height = int(height * scale)
                 new_width = int(width * scale)
                 frame_rgb = cv2.resize(frame_rgb, (new_width, new_height))
             
-            # Create frame description
-            frame_descriptions.append(f"Frame {i+1} - At approximately {start_time + (i * ((end_time - start_time) / len(selected_frames))):.2f} seconds")
+            # Encode frame as JPEG bytes
+            _, buffer = cv2.imencode('.jpg', frame_rgb)
+            image_bytes = buffer.tobytes()
+            
+            # Add to image parts
+            image_parts.append({
+                "mime_type": "image/jpeg",
+                "data": image_bytes
+            })
+        
+        return image_parts
+    
+    def _extract_json(self, content, opening='{', closing='}'):
+        """Strip markdown code fences or surrounding prose from a JSON answer"""
+        json_match = re.search(r'```(?:json)?\s*\n(.*?)\n\s*```', content, re.DOTALL)
+        if json_match:
+            return json_match.group(1)
         
+        # Also try without markdown code blocks
+        start = content.find(opening)
+        end = content.rfind(closing)
+        if start != -1 and end > start:
+            return content[start:end + 1]
+        
+        return content
+    
+    def _fallback_description(self, transcript, start_time, end_time):
+        """Default response used when the model could not be reached, marked so it is never cached, checkpointed or stored"""
+        return {
+            "fallback": True,
+            "description": f"Highlight from {start_time:.2f}s to {end_time:.2f}s. " + 
+                          (f"Transcript: {transcript[:100]}..." if transcript else "No transcript available."),
+            "summary": f"Video segment from {start_time:.2f}s to {end_time:.2f}s"
+        }
+    
+    def _cached_description(self, selected_frames, transcript):
+        """
+        Look up the description of a highlight in the cache
+        
+        Returns:
+            tuple: (cache key or None when caching is off, cached result or None)
+        """
+        if self.cache is None:
+            return None, None
+        
+        cache_key = self.get_description_cache_key(selected_frames, transcript)
+        cached = self.cache.get(cache_key)
+        return cache_key, json.loads(cached) if cached is not None else None
+        
+    def _description_parts(self, selected_frames, transcript, start_time, end_time):
+        """Text and image parts of the request describing one highlight"""
         # Create the user prompt
         user_prompt = f"""
         VIDEO HIGHLIGHT ANALYSIS (Time: {start_time:.2f}s to {end_time:.2f}s)
@@ -88,90 +208,343 @@ class LLMService:
         {transcript if transcript else '[No speech detected]'}
         
         FRAMES:
-        {chr(10).join(frame_descriptions)}
+        {chr(10).join(self._frame_descriptions(selected_frames, start_time, end_time))}
         
         Based on these frames and transcript, please provide a detailed description and summary of this video highlight.
         """
         
+        # Create the parts for the multi-modal message
+        parts = [
+            {"text": SYSTEM_PROMPT + "\n\n" + user_prompt}
+        ]
+        
+        # Add the image parts
+        parts.extend(self._encode_frames(selected_frames))
+        return parts
+    
+    def _parse_description(self, response, cache_key):
+        """Parse the answer describing one highlight and cache it if well-formed"""
+        content = self._extract_json(response.text.strip())
+        
         try:
-            # Prepare the images for the model
-            image_parts = []
-            for frame in selected_frames:
-                # Convert frame to RGB
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Resize to reduce size
-                height, width = frame_rgb.shape[:2]
-                max_dimension = 512
-                if height > max_dimension or width > max_dimension:
-                    scale = max_dimension / max(height, width)
-                    new_height = int(height * scale)
-                    new_width = int(width * scale)
-                    frame_rgb = cv2.resize(frame_rgb, (new_width, new_height))
-                
-                # Encode frame as JPEG bytes
-                _, buffer = cv2.imencode('.jpg', frame_rgb)
-                image_bytes = buffer.tobytes()
-                
-                # Add to image parts
-                image_parts.append({
-                    "mime_type": "image/jpeg",
-                    "data": image_bytes
-                })
-            
-            # Create generation config
-            generation_config = {
-                "temperature": 0.4,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 1024,
+            result = json.loads(content)
+            
+            # Only well-formed answers are cached, fallbacks are retried on the next run
+            if cache_key is not None and isinstance(result, dict):
+                self.cache.set(cache_key, json.dumps(result).encode('utf-8'))
+        except json.JSONDecodeError:
+            # Fallback: create a structured result
+            logging.warning("Failed to parse JSON response from LLM, creating structured response manually")
+            metrics.increment('llm_unparsed_responses')
+            result = {
+                "description": content[:500],  # Use first 500 chars as description
+                "summary": content[:100]       # Use first 100 chars as summary
             }
             
-            # Create the parts for the multi-modal message
-            parts = [
-                {"text": system_prompt + "\n\n" + user_prompt}
-            ]
+        return result
+    
+    def generate_highlight_description(self, frames, transcript, start_time, end_time):
+        """
+        Generate a detailed description of a video highlight using the LLM
+        
+        Args:
+            frames (list): List of frames from the highlight
+            transcript (str): Transcribed speech from the highlight
+            start_time (float): Start time of the highlight
+            end_time (float): End time of the highlight
             
-            # Add the image parts
-            for img in image_parts:
-                parts.append(img)
+        Returns:
+            dict: Dictionary containing description and summary
+        """
+        selected_frames = self._select_frames(frames)
+        cache_key, cached = self._cached_description(selected_frames, transcript)
+        if cached is not None:
+            return cached
+        
+        try:
+            parts = self._description_parts(selected_frames, transcript, start_time, end_time)
             
             # Generate response from LLM
-            response = self.model.generate_content(
-                parts,
-                generation_config=generation_config
-            )
-            
-            # Parse the response
-            content = response.text.strip()
-            
-            # Try to extract JSON from the response
-            json_match = re.search(r'```json\n(.*?)\n```', content, re.DOTALL)
-            if json_match:
-                content = json_match.group(1)
-            else:
-                # Also try without markdown code blocks
-                json_match = re.search(r'(\{.*\})', content, re.DOTALL)
-                if json_match:
-                    content = json_match.group(1)
-            
-            try:
-                result = json.loads(content)
-            except json.JSONDecodeError:
-                # Fallback: create a structured result
-                logging.warning("Failed to parse JSON response from LLM, creating structured response manually")
-                result = {
-                    "description": content[:500],  # Use first 500 chars as description
-                    "summary": content[:100]       # Use first 100 chars as summary
-                }
-            
-            return result
+            response = self._generate(parts, GENERATION_CONFIG)
+            return self._parse_description(response, cache_key)
             
         except Exception as e:
             logging.error(f"Error generating highlight description: {e}")
+            metrics.increment('llm_fallback_descriptions')
             # Return a default response in case of error
-            return {
-                "description": f"Highlight from {start_time:.2f}s to {end_time:.2f}s. " + 
-                              (f"Transcript: {transcript[:100]}..." if transcript else "No transcript available."),
-                "summary": f"Video segment from {start_time:.2f}s to {end_time:.2f}s"
-            }
\ No newline at end of file
+            return self._fallback_description(transcript, start_time, end_time)
+    
+    async def generate_highlight_description_async(self, frames, transcript, start_time, end_time):
+        """
+        Generate a detailed description of a video highlight without blocking the event loop
+        
+        Same arguments and result as generate_highlight_description. Cache
+        lookups and writes and the JPEG encoding of the frames run in worker
+        threads, so other requests go on meanwhile.
+        """
+        selected_frames = self._select_frames(frames)
+        cache_key, cached = await asyncio.to_thread(self._cached_description, selected_frames, transcript)
+        if cached is not None:
+            return cached
+        
+        try:
+            parts = await asyncio.to_thread(self._description_parts, selected_frames, transcript, start_time, end_time)
+            response = await self._generate_async(parts, GENERATION_CONFIG)
+            return await asyncio.to_thread(self._parse_description, response, cache_key)
+            
+        except Exception as e:
+            logging.error(f"Error generating highlight description: {e}")
+            metrics.increment('llm_fallback_descriptions')
+            return self._fallback_description(transcript, start_time, end_time)
+    
+    def _cached_batch(self, highlights):
+        """
+        Select the frames of a batch of highlights and look them up in the cache
+        
+        Returns:
+            tuple: (results with None for highlights not cached, selected frames, cache keys)
+        """
+        results = [None] * len(highlights)
+        selected = [self._select_frames(frames) for frames, _, _, _ in highlights]
+        cache_keys = [None] * len(highlights)
+        
+        if self.cache is not None:
+            for i, (_, transcript, _, _) in enumerate(highlights):
+                cache_keys[i] = self.get_description_cache_key(selected[i], transcript)
+            
+            cached = self.cache.get_many(cache_keys)
+            for i, key in enumerate(cache_keys):
+                if key in cached:
+                    results[i] = json.loads(cached[key])
+        
+        return results, selected, cache_keys
+        
+    def _batch_request(self, highlights, selected, pending):
+        """
+        Build the batched request describing the pending highlights
+        
+        Returns:
+            tuple: (parts, generation config)
+        """
+        parts = [{"text": BATCH_SYSTEM_PROMPT.format(count=len(pending))}]
+        
+        for number, i in enumerate(pending, start=1):
+            _, transcript, start_time, end_time = highlights[i]
+            segment_prompt = f"""
+            SEGMENT {number} (Time: {start_time:.2f}s to {end_time:.2f}s)
+            
+            TRANSCRIPT:
+            {transcript if transcript else '[No speech detected]'}
+            
+            FRAMES (the {len(selected[i])} images that follow):
+            {chr(10).join(self._frame_descriptions(selected[i], start_time, end_time))}
+            """
+            parts.append({"text": segment_prompt})
+            parts.extend(self._encode_frames(selected[i]))
+            
+        generation_config = dict(GENERATION_CONFIG)
+        generation_config["max_output_tokens"] = min(8192, GENERATION_CONFIG["max_output_tokens"] * len(pending))
+        return parts, generation_config
+    
+    def _apply_batch_answers(self, results, pending, answers, cache_keys):
+        """Fill in and cache the answers of a batched request, counting the segments it missed"""
+        to_cache = {}
+        for number, i in enumerate(pending, start=1):
+            if number in answers:
+                results[i] = answers[number]
+                if cache_keys[i] is not None:
+                    to_cache[cache_keys[i]] = json.dumps(answers[number]).encode('utf-8')
+        
+        if self.cache is not None:
+            self.cache.set_many(to_cache)
+            
+        missing = [i for i in pending if results[i] is None]
+        if missing:
+            logging.warning(f"Batched LLM answer covered {len(pending) - len(missing)}/{len(pending)} segments, "
+                            f"describing the rest one by one")
+            metrics.increment('llm_batch_retried_segments', len(missing))
+    
+    def generate_highlight_descriptions_batch(self, highlights):
+        """
+        Generate descriptions of several highlights with a single LLM request
+        
+        All highlights share one copy of the instructions; the model answers with
+        a JSON array keyed by segment number. Highlights that are cached skip the
+        request, and highlights missing from a malformed or incomplete answer
+        fall back to generate_highlight_description.
+        
+        Args:
+            highlights (list): List of (frames, transcript, start_time, end_time) tuples
+            
+        Returns:
+            list: Dictionaries containing description and summary, in the order of highlights
+        """
+        results, selected, cache_keys = self._cached_batch(highlights)
+        pending = [i for i in range(len(highlights)) if results[i] is None]
+        
+        if len(pending) > 1:
+            parts, generation_config = self._batch_request(highlights, selected, pending)
+            
+            try:
+                response = self._generate(parts, generation_config)
+                answers = self._parse_batch_response(response.text.strip(), len(pending))
+            except Exception as e:
+                logging.error(f"Error generating batched highlight descriptions: {e}")
+                answers = {}
+            
+            self._apply_batch_answers(results, pending, answers, cache_keys)
+        
+        # Single-highlight calls for anything the batch did not answer
+        for i in range(len(highlights)):
+            if results[i] is None:
+                results[i] = self.generate_highlight_description(*highlights[i])
+        
+        return results
+    
+    async def generate_highlight_descriptions_batch_async(self, highlights):
+        """
+        Generate descriptions of several highlights with a single LLM request without blocking the event loop
+        
+        Same arguments and result as generate_highlight_descriptions_batch. As
+        in generate_highlight_description_async, the cache and the frame
+        encoding are used from worker threads.
+        """
+        results, selected, cache_keys = await asyncio.to_thread(self._cached_batch, highlights)
+        pending = [i for i in range(len(highlights)) if results[i] is None]
+        
+        if len(pending) > 1:
+            parts, generation_config = await asyncio.to_thread(self._batch_request, highlights, selected, pending)
+            
+            try:
+                response = await self._generate_async(parts, generation_config)
+                answers = self._parse_batch_response(response.text.strip(), len(pending))
+            except Exception as e:
+                logging.error(f"Error generating batched highlight descriptions: {e}")
+                answers = {}
+            
+            await asyncio.to_thread(self._apply_batch_answers, results, pending, answers, cache_keys)
+        
+        # Highlights the batch did not answer are described concurrently
+        missing = [i for i in range(len(highlights)) if results[i] is None]
+        descriptions = await asyncio.gather(
+            *(self.generate_highlight_description_async(*highlights[i]) for i in missing)
+        )
+        for i, description in zip(missing, descriptions):
+            results[i] = description
+        
+        return results
+    
+    def _request_size(self, parts):
+        """
+        Size of a request in bytes and its rough token count for the token quota
+        
+        Returns:
+            tuple: (request bytes, estimated tokens)
+        """
+        request_bytes = sum(
+            len(part["text"].encode('utf-8')) if "text" in part else len(part.get("data", b""))
+            for part in parts
+        )
+        
+        # ~4 bytes of text per token, a fixed count per image
+        tokens = sum(
+            len(part["text"].encode('utf-8')) // 4 if "text" in part else IMAGE_TOKENS
+            for part in parts
+        )
+        return request_bytes, tokens
+    
+    def _generate(self, parts, generation_config):
+        """
+        Send one request to the model within the rate limits, recording its size, duration and outcome
+        
+        Args:
+            parts (list): Text and image parts of the request
+            generation_config (dict): Generation parameters
+            
+        Returns:
+            object: Model response with a text attribute
+        """
+        request_bytes, tokens = self._request_size(parts)
+        
+        def request():
+            """One attempt, retried by the rate limiter on quota and server errors"""
+            metrics.increment('llm_requests')
+            metrics.increment('llm_request_bytes', request_bytes)
+            with metrics.timed('llm'):
+                return self.model.generate_content(parts, generation_config=generation_config)
+        
+        try:
+            return self.limiter.call(request, tokens=tokens)
+        except Exception:
+            metrics.increment('llm_errors')
+            raise
+    
+    async def _generate_async(self, parts, generation_config):
+        """
+        Send one request to the model with the client's async API, like _generate
+        
+        Args:
+            parts (list): Text and image parts of the request
+            generation_config (dict): Generation parameters
+            
+        Returns:
+            object: Model response with a text attribute
+        """
+        request_bytes, tokens = self._request_size(parts)
+        
+        async def request():
+            """One attempt, retried by the rate limiter on quota and server errors"""
+            metrics.increment('llm_requests')
+            metrics.increment('llm_request_bytes', request_bytes)
+            with metrics.timed('llm'):
+                return await self.model.generate_content_async(parts, generation_config=generation_config)
+        
+        try:
+            return await self.limiter.call_async(request, tokens=tokens)
+        except Exception:
+            metrics.increment('llm_errors')
+            raise
+    
+    def _parse_batch_response(self, content, count):
+        """
+        Parse the JSON array answer of a batched request
+        
+        Args:
+            content (str): Raw model answer
+            count (int): Number of segments in the request
+            
+        Returns:
+            dict: Dictionaries with description and summary by segment number (1-based);
+                segments with a missing or malformed entry are left out
+        """
+        try:
+            data = json.loads(self._extract_json(content, '[', ']'))
+        except json.JSONDecodeError:
+            logging.warning("Failed to parse JSON array from batched LLM response")
+            return {}
+        
+        # Tolerate an object wrapping the array
+        if isinstance(data, dict):
+            data = next((value for value in data.values() if isinstance(value, list)), [])
+        
+        if not isinstance(data, list):
+            return {}
+        
+        answers = {}
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            
+            try:
+                number = int(item.get("segment"))
+            except (TypeError, ValueError):
+                continue
+            
+            description = item.get("description")
+            summary = item.get("summary")
+            
+            if 1 <= number <= count and isinstance(description, str) and isinstance(summary, str) \
+                    and description.strip() and summary.strip() and number not in answers:
+                answers[number] = {"description": description, "summary": summary}
+        
+        return answers
@@ -0,0 +1,434 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from collections import deque
+
+from ..config import LLM_CONFIG
+from ..utils import metrics
+
+# HTTP status codes of errors worth retrying, and those meaning the API is over its quota or capacity
+RETRYABLE_CODES = (429, 500, 503, 504)
+THROTTLING_CODES = (429, 503)
+
+# Rate limiters of this process by name, shared by every service instance
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+# Set while the waits of every limiter are interrupted, see interrupted_waits
+_interrupted = threading.Event()
+
+class WaitInterrupted(Exception):
+    """Raised by RateLimiter.call when its quota wait or retry backoff is interrupted"""
+
+def _error_code(error):
+    """HTTP status code of an API error (google.api_core exceptions and the fake backend carry it in .code), or None"""
+    code = getattr(error, 'code', None)
+    if callable(code):
+        # gRPC errors expose the status as a method returning an enum
+        return None
+    
+    try:
+        return int(code)
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(error):
+    """Whether a failed request is worth retrying"""
+    return _error_code(error) in RETRYABLE_CODES or isinstance(error, (ConnectionError, TimeoutError))
+
+def is_throttling(error):
+    """Whether a failed request was rejected because of quota or capacity"""
+    return _error_code(error) in THROTTLING_CODES
+
+def _pause(seconds):
+    """Sleep through a quota wait or retry backoff, unless the waits are interrupted"""
+    if _interrupted.wait(seconds):
+        raise WaitInterrupted("Rate limiter wait interrupted")
+
+@contextmanager
+def interrupted_waits():
+    """
+    Interrupt the quota waits and retry backoffs of every limiter while in the block
+    
+    Threads sleeping in RateLimiter.call, or entering it, raise WaitInterrupted
+    right away instead of sleeping up to max_delay, so they can be joined
+    promptly when the pipeline stops.
+    """
+    _interrupted.set()
+    try:
+        yield
+    finally:
+        _interrupted.clear()
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate"""
+    
+    def __init__(self, per_minute, burst_seconds=10.0):
+        """
+        Initialize a full bucket
+        
+        Args:
+            per_minute (float): Tokens added per minute
+            burst_seconds (float): The bucket holds this many seconds worth of tokens
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def reserve(self, amount):
+        """
+        Take tokens, going into debt if there are not enough
+        
+        Args:
+            amount (float): Tokens to take; more than the capacity counts as the capacity
+        
+        Returns:
+            float: Seconds to wait until the tokens are covered
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+def _wake(waiter):
+    """Resolve the future of a coroutine waiting for a slot, unless it was cancelled"""
+    if not waiter.done():
+        waiter.set_result(None)
+
+class AdaptiveConcurrency:
+    """
+    Limit on requests in flight with additive increase and multiplicative decrease
+    
+    Every successful request raises the limit by 1/limit, about one per round of
+    requests; a throttled request cuts it by decrease_factor. Only requests
+    sent after the last cut can cut it again, so a burst of throttling errors
+    from requests already in flight counts once.
+    """
+    
+    def __init__(self, max_limit, min_limit=1, decrease_factor=0.5):
+        """
+        Initialize the limit at its maximum
+        
+        Args:
+            max_limit (int): Upper bound of the limit
+            min_limit (int): Lower bound of the limit
+            decrease_factor (float): Factor the limit is multiplied with on throttling
+        """
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+        
+        # (event loop, future) of coroutines waiting for a slot, woken with the threads
+        self.async_waiters = []
+    
+    def acquire(self):
+        """
+        Wait for a free slot and take it
+        
+        Returns:
+            float: Time the slot was taken, to pass to release
+        """
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+            return time.monotonic()
+    
+    async def acquire_async(self):
+        """
+        Wait for a free slot without blocking the event loop and take it
+        
+        Returns:
+            float: Time the slot was taken, to pass to release
+        """
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            with self.condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return time.monotonic()
+                
+                waiter = loop.create_future()
+                self.async_waiters.append((loop, waiter))
+            
+            await waiter
+    
+    def release(self, acquired_at, throttled=False):
+        """
+        Give a slot back and adapt the limit to the outcome of its request
+        
+        Args:
+            acquired_at (float): Return value of acquire
+            throttled (bool): Whether the request was throttled
+        """
+        with self.condition:
+            self.in_flight -= 1
+            
+            if throttled:
+                if acquired_at >= self.last_decrease and self.limit > self.min_limit:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self.last_decrease = time.monotonic()
+                    logging.warning(f"Throttled, lowered concurrency limit to {int(self.limit)}")
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            
+            self.condition.notify_all()
+            waiters, self.async_waiters = self.async_waiters, []
+        
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+class RateLimiter:
+    """
+    Client-side quota for one API: requests and tokens per minute, adaptive
+    concurrency, and retries with jittered exponential backoff
+    
+    Counters (prefixed with the limiter name): <name>_throttled,
+    <name>_rate_limit_retries, <name>_rate_limit_failures and the
+    <name>_rate_limit_wait stage; throughput of the last minute against the
+    quota is served as gauges, see stats.
+    """
+    
+    def __init__(self, name, requests_per_minute=None, tokens_per_minute=None, max_concurrency=16,
+                 max_retries=5, base_delay=1.0, max_delay=60.0, decrease_factor=0.5):
+        """
+        Initialize the limiter
+        
+        Args:
+            name (str): Name of the limiter, used as counter prefix
+            requests_per_minute (float, optional): Request quota, None for no limit
+            tokens_per_minute (float, optional): Token quota, None for no limit
+            max_concurrency (int): Upper bound of the adaptive concurrency limit
+            max_retries (int): Retries of a request failing with a retryable error
+            base_delay (float): Backoff before the first retry in seconds, doubled on every retry
+            max_delay (float): Upper bound of the backoff in seconds
+            decrease_factor (float): Factor the concurrency limit is multiplied with on throttling
+        """
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency, decrease_factor=decrease_factor)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        
+        # (time, requests, tokens) of the successful calls of the last minute
+        self.recent = deque()
+        self.lock = threading.Lock()
+        
+        metrics.register_gauges(name, self.stats)
+    
+    def _reserve(self, requests, tokens):
+        """
+        Take requests and tokens from the buckets
+        
+        Returns:
+            float: Seconds to wait before sending the request
+        """
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = self.request_bucket.reserve(requests)
+        if self.token_bucket is not None:
+            wait = max(wait, self.token_bucket.reserve(tokens))
+        if wait > 0:
+            metrics.observe(f'{self.name}_rate_limit_wait', wait)
+        return wait
+    
+    def _failed(self, error, acquired_at, attempt):
+        """
+        Release the slot of a failed attempt and decide whether to retry
+        
+        Returns:
+            float: Backoff in seconds before the next attempt, or None to give up
+        """
+        throttled = is_throttling(error)
+        self.concurrency.release(acquired_at, throttled=throttled)
+        if throttled:
+            metrics.increment(f'{self.name}_throttled')
+        
+        if not is_retryable(error):
+            return None
+        if attempt == self.max_retries:
+            metrics.increment(f'{self.name}_rate_limit_failures')
+            return None
+        
+        # Equal jitter: at least half the exponential delay, so retries spread out but still back off
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        logging.warning(f"{self.name} request failed ({error}), retrying in {delay:.1f}s "
+                        f"(attempt {attempt + 1}/{self.max_retries})")
+        metrics.increment(f'{self.name}_rate_limit_retries')
+        return delay
+    
+    def _succeeded(self, acquired_at, requests, tokens):
+        """Release the slot of a successful attempt and record its throughput"""
+        self.concurrency.release(acquired_at)
+        with self.lock:
+            self.recent.append((time.monotonic(), requests, tokens))
+    
+    def call(self, request, requests=1, tokens=0):
+        """
+        Send a request within the quota, retrying retryable errors
+        
+        Args:
+            request (callable): Sends the request and returns its response
+            requests (int): Requests the call counts as against the quota, e.g. texts in a batch
+            tokens (int): Estimated tokens of the request
+        
+        Returns:
+            object: Response of the request
+        
+        Raises:
+            WaitInterrupted: If the waits were interrupted, see interrupted_waits
+            Exception: The error of the last attempt, or a non-retryable error
+        """
+        for attempt in range(self.max_retries + 1):
+            acquired_at = self.concurrency.acquire()
+            
+            try:
+                _pause(self._reserve(requests, tokens))
+                response = request()
+            except WaitInterrupted:
+                self.concurrency.release(acquired_at)
+                raise
+            except Exception as e:
+                delay = self._failed(e, acquired_at, attempt)
+                if delay is None:
+                    raise
+                _pause(delay)
+                continue
+            
+            self._succeeded(acquired_at, requests, tokens)
+            return response
+    
+    async def call_async(self, request, requests=1, tokens=0):
+        """
+        Send a request within the quota from a coroutine, retrying retryable errors
+        
+        Waits for the quota and backs off with asyncio.sleep, so a single event
+        loop can keep many requests in flight. Shares the quota and concurrency
+        limit with call.
+        
+        Args:
+            request (callable): Coroutine function sending the request and returning its response
+            requests (int): Requests the call counts as against the quota
+            tokens (int): Estimated tokens of the request
+        
+        Returns:
+            object: Response of the request
+        
+        Raises:
+            Exception: The error of the last attempt, or a non-retryable error
+        """
+        for attempt in range(self.max_retries + 1):
+            acquired_at = await self.concurrency.acquire_async()
+            
+            try:
+                wait = self._reserve(requests, tokens)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                
+                response = await request()
+            except asyncio.CancelledError:
+                self.concurrency.release(acquired_at)
+                raise
+            except Exception as e:
+                delay = self._failed(e, acquired_at, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            
+            self._succeeded(acquired_at, requests, tokens)
+            return response
+    
+    def stats(self):
+        """
+        Throughput of the last minute against the quota
+        
+        Returns:
+            dict: Requests and tokens sent in the last minute, their quotas, and the
+                current concurrency limit and requests in flight, keyed by gauge name
+        """
+        with self.lock:
+            cutoff = time.monotonic() - 60.0
+            while self.recent and self.recent[0][0] < cutoff:
+                self.recent.popleft()
+            
+            requests = sum(count for _, count, _ in self.recent)
+            tokens = sum(count for _, _, count in self.recent)
+        
+        stats = {
+            f'{self.name}_requests_last_minute': requests,
+            f'{self.name}_tokens_last_minute': tokens,
+            f'{self.name}_concurrency_limit': int(self.concurrency.limit),
+            f'{self.name}_in_flight': self.concurrency.in_flight
+        }
+        if self.requests_per_minute:
+            stats[f'{self.name}_requests_per_minute_quota'] = self.requests_per_minute
+        if self.tokens_per_minute:
+            stats[f'{self.name}_tokens_per_minute_quota'] = self.tokens_per_minute
+        return stats
+    
+    def log_stats(self):
+        """Log the throughput of the last minute against the quota"""
+        stats = self.stats()
+        
+        quota = ""
+        if self.requests_per_minute:
+            quota += f" of {self.requests_per_minute:g}"
+        logging.info(
+            f"{self.name} rate limiter: {stats[f'{self.name}_requests_last_minute']}{quota} requests and "
+            f"{stats[f'{self.name}_tokens_last_minute']} tokens in the last minute, "
+            f"concurrency limit {stats[f'{self.name}_concurrency_limit']}"
+        )
+
+def get_rate_limiter(name):
+    """
+    Get the rate limiter of an API, shared by every service of this process
+    
+    Args:
+        name (str): 'llm' or 'embedding'
+    
+    Returns:
+        RateLimiter: The limiter, configured from LLM_CONFIG on first use
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        
+        if limiter is None:
+            prefix = '' if name == 'llm' else f'{name}_'
+            limiter = RateLimiter(
+                name,
+                requests_per_minute=LLM_CONFIG[f'{prefix}requests_per_minute'],
+                tokens_per_minute=LLM_CONFIG[f'{prefix}tokens_per_minute'],
+                max_concurrency=LLM_CONFIG['max_concurrency'],
+                max_retries=LLM_CONFIG['max_retries'],
+                base_delay=LLM_CONFIG['retry_base_delay'],
+                max_delay=LLM_CONFIG['retry_max_delay']
+            )
+            _limiters[name] = limiter
+        
+        return limiter
+
+def log_rate_limiter_stats():
+    """Log the throughput of every rate limiter of this process"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    
+    for limiter in limiters:
+        limiter.log_stats()
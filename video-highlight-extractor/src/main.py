@@ -4,103 +4,193 @@ import sys
 import logging
 import time
 import argparse
+import multiprocessing
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .config import PROCESSING_CONFIG, VIDEO_CONFIG
 
 # Import processors and services only when needed to avoid circular imports
-from .utils.helpers import setup_logging, get_video_files, print_highlights_summary, ProgressBar
+from .utils.helpers import (
+    setup_logging, get_video_files, print_highlights_summary, PoolProgressBar
+)
+from .utils.cache import log_cache_stats
+from .llm.rate_limiter import log_rate_limiter_stats
+from .utils import metrics
 
-def process_video(video_path, db_manager, progress_bar=None):
+def process_video(video_path, db_manager, progress_bar=None, concurrency=None, cancel=None):
     """
     Process a video file to extract and store highlights
     
+    Runs the staged pipeline for a single video, see pipeline.ExtractionPipeline.
+    Highlights are transcribed and described by `concurrency` enrich workers,
+    each request covering up to LLM_CONFIG['description_batch_size'] highlights,
+    then embedded together with batched requests and stored in their original order.
+    
+    Stage durations and counters are collected in a JSON run report, see
+    utils.metrics.
+    
     Args:
         video_path (str): Path to the video file
         db_manager (DBManager): Database manager instance
         progress_bar (ProgressBar, optional): Progress bar for tracking processing stages
+        concurrency (int, optional): Number of highlights enriched concurrently
+        cancel (threading.Event, optional): Stops processing once set
         
     Returns:
         tuple: (video_id, list of highlights)
+    
+    Raises:
+        PipelineCancelled: If cancel was set before the video was done
     """
     # Import here to avoid circular imports
-    from .processors.video_processor import VideoProcessor
-    from .processors.audio_processor import AudioProcessor
-    from .llm.llm_service import LLMService
-    from .llm.llm_embeddings import EmbeddingService
-    
-    # Initialize processors and services
-    video_processor = VideoProcessor()
-    audio_processor = AudioProcessor()
-    llm_service = LLMService()
-    embedding_service = EmbeddingService()
-    
-    # Start processing
-    logging.info(f"Processing video: {video_path}")
-    
-    # Extract frames and get video duration
-    if progress_bar:
-        progress_bar.update_stage(video_path, "Extracting frames")
-    frames, duration = video_processor.extract_frames(video_path)
-    
-    # Detect scene changes
-    if progress_bar:
-        progress_bar.update_stage(video_path, "Detecting scene changes")
-    scene_changes = video_processor.detect_scene_changes(frames)
-    
-    # Identify potential highlights
-    potential_highlights = video_processor.identify_potential_highlights(scene_changes, duration)
-    
-    # Add video to database
-    video_filename = os.path.basename(video_path)
-    video = db_manager.add_video(video_filename, duration)
-    
-    highlights = []
-    
-    # Process each potential highlight
-    for i, (start_time, end_time) in enumerate(potential_highlights):
-        if progress_bar:
-            progress_bar.update_stage(
-                video_path, 
-                f"Processing highlight {i+1}/{len(potential_highlights)}"
-            )
-        
-        # Extract highlight frames
-        highlight_frames = video_processor.extract_highlight_frames(
-            video_path, start_time, end_time
-        )
-        
-        # Extract audio segment and transcribe
-        audio_segment_path = audio_processor.extract_audio_segment(
-            video_path, start_time, end_time
-        )
-        transcript = ""
-        if audio_segment_path:
-            transcript = audio_processor.transcribe_audio(audio_segment_path)
-            # Clean up temporary audio file
-            if os.path.exists(audio_segment_path):
-                os.remove(audio_segment_path)
+    from .pipeline import ExtractionPipeline
+    
+    pipeline = ExtractionPipeline(db_manager, concurrency=concurrency, progress_bar=progress_bar)
+    job, = pipeline.run([video_path], cancel=cancel)
+    
+    if job.status == 'failed':
+        raise job.error
+    
+    log_cache_stats()
+    log_rate_limiter_stats()
+    return job.video_id, job.highlights
+    
+def process_videos_in_pipeline(video_files, db_manager, concurrency, scan_workers=None):
+    """
+    Process videos in one staged pipeline, so decoding of a video overlaps enrichment of the previous ones
+    
+    Args:
+        video_files (list): Paths of the video files to process
+        db_manager (DBManager): Database manager instance
+        concurrency (int): Number of highlights enriched concurrently across all videos
+        scan_workers (int, optional): Number of videos decoded and segmented concurrently
         
-        # Generate highlight description using LLM
-        result = llm_service.generate_highlight_description(
-            highlight_frames, transcript, start_time, end_time
-        )
+    Returns:
+        list: Paths of the videos that failed
+    """
+    # Import here to avoid circular imports
+    from .pipeline import ExtractionPipeline
+    
+    progress = PoolProgressBar(len(video_files))
+    
+    def video_done(job):
+        """Report a video leaving the pipeline"""
+        if job.status == 'failed':
+            progress.video_done(job.video_path, 0, failed=True)
+            return
         
-        description = result.get("description", "")
-        summary = result.get("summary", "")
+        print_highlights_summary(job.video_path, job.highlights)
+        progress.video_done(job.video_path, len(job.highlights))
         
-        # Generate embedding for the highlight
-        embedding = embedding_service.get_highlight_embedding(description, summary)
+    pipeline = ExtractionPipeline(
+        db_manager, concurrency=concurrency,
+        workers={'scan': scan_workers} if scan_workers else None,
+        on_video_done=video_done
+    )
+    
+    try:
+        jobs = pipeline.run(video_files)
+    finally:
+        progress.close()
+    
+    return [job.video_path for job in jobs if job.status == 'failed']
+
+# Database manager of the current worker process, created by init_worker
+_worker_db_manager = None
+
+def init_worker(video_config_overrides=None):
+    """
+    Set up logging and a dedicated database connection in a worker process
+    
+    Args:
+        video_config_overrides (dict, optional): VIDEO_CONFIG values set on the command line,
+            which spawned workers don't inherit from the parent
+    """
+    global _worker_db_manager
+    
+    from .databases.db_manager import DBManager
+    
+    setup_logging(suffix=f"worker_{os.getpid()}")
+    
+    if video_config_overrides:
+        VIDEO_CONFIG.update(video_config_overrides)
+    
+    # SQLAlchemy engines and sessions cannot be shared across processes
+    _worker_db_manager = DBManager()
+
+def process_video_in_worker(video_path, concurrency):
+    """
+    Process a video in a worker process
+    
+    Args:
+        video_path (str): Path to the video file
+        concurrency (int): Number of highlights enriched concurrently
         
-        # Add highlight to database
-        highlight = db_manager.add_highlight(
-            video.id, start_time, description, summary, embedding.tolist()
-        )
+    Returns:
+        tuple: (video_path, video_id, list of highlight dictionaries, run report)
+    """
+    video_id, highlights = process_video(video_path, _worker_db_manager, concurrency=concurrency)
+    
+    # ORM instances are bound to the worker's session, send plain data to the parent
+    return video_path, video_id, [highlight.to_dict() for highlight in highlights], metrics.get_last_report()
+
+def process_videos_in_pool(video_files, workers, concurrency, video_config_overrides=None):
+    """
+    Process videos in a pool of worker processes
+    
+    Progress and highlight summaries are reported by the parent process as
+    videos complete, and the workers' run reports are added to its metrics.
+    
+    Args:
+        video_files (list): Paths of the video files to process
+        workers (int): Number of worker processes
+        concurrency (int): Number of highlights enriched concurrently per video
+        video_config_overrides (dict, optional): VIDEO_CONFIG values to apply in every worker
         
-        highlights.append(highlight)
+    Returns:
+        tuple: (number of videos processed, total number of highlights, list of failed video paths)
+    """
+    # Spawn rather than fork, so workers don't inherit the parent's connections and gRPC state
+    context = multiprocessing.get_context("spawn")
+    progress = PoolProgressBar(len(video_files), workers)
     
-    if progress_bar:
-        progress_bar.update_stage(video_path, "Completed")
+    processed = 0
+    total_highlights = 0
+    failed = []
+    
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=context,
+            initializer=init_worker, initargs=(video_config_overrides,)
+        ) as executor:
+            futures = {
+                executor.submit(process_video_in_worker, video_path, concurrency): video_path
+                for video_path in video_files
+            }
+            
+            for future in as_completed(futures):
+                video_path = futures[future]
+                
+                try:
+                    _, _, highlights, report = future.result()
+                except Exception as e:
+                    logging.error(f"Error processing video {video_path}: {e}")
+                    failed.append(video_path)
+                    progress.video_done(video_path, 0, failed=True)
+                    continue
+                
+                print_highlights_summary(video_path, [SimpleNamespace(**h) for h in highlights])
+                if report is not None:
+                    metrics.merge_report(report)
+                
+                processed += 1
+                total_highlights += len(highlights)
+                progress.video_done(video_path, len(highlights))
+    finally:
+        progress.close()
     
-    logging.info(f"Processed {len(highlights)} highlights for video: {video_path}")
-    return video.id, highlights
+    return processed, total_highlights, failed
 
 def run_demo():
     """Run the demo for video processing and highlight extraction"""
@@ -111,8 +201,34 @@ def run_demo():
     parser = argparse.ArgumentParser(description="Video Highlight Extractor")
     parser.add_argument("--video", help="Path to a specific video file to process")
     parser.add_argument("--list-videos", action="store_true", help="List available videos")
+    parser.add_argument("--concurrency", type=int, default=PROCESSING_CONFIG['enrichment_concurrency'],
+                        help="Number of highlights enriched concurrently (per worker process with --workers)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of worker processes; each processes one video at a time")
+    parser.add_argument("--scan-workers", type=int, default=PROCESSING_CONFIG['pipeline_workers']['scan'],
+                        help="Number of videos decoded and segmented concurrently (without --workers)")
+    parser.add_argument("--max-highlights-per-video", type=int,
+                        default=VIDEO_CONFIG['max_highlights_per_video'],
+                        help="Enrich only this many of the most salient segments per video")
+    parser.add_argument("--max-highlights-per-minute", type=float,
+                        default=VIDEO_CONFIG['max_highlights_per_minute'],
+                        help="Enrich only this many of the most salient segments per minute of video")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep running: queue new videos in the jobs table and process queued jobs")
+    parser.add_argument("--metrics-port", type=int, default=PROCESSING_CONFIG['metrics_port'],
+                        help="Serve Prometheus metrics of the run on this port")
     args = parser.parse_args()
     
+    if args.metrics_port:
+        metrics.start_metrics_server(args.metrics_port)
+    
+    # Budgets are part of VIDEO_CONFIG, so they also change the configuration hash
+    video_config_overrides = {
+        'max_highlights_per_video': args.max_highlights_per_video,
+        'max_highlights_per_minute': args.max_highlights_per_minute
+    }
+    VIDEO_CONFIG.update(video_config_overrides)
+    
     # Import here to avoid circular imports
     from .databases.db_manager import DBManager
     
@@ -120,6 +236,13 @@ def run_demo():
     db_manager = DBManager()
     
     try:
+        if args.daemon:
+            # Import here to avoid circular imports
+            from .daemon import ExtractorDaemon
+            
+            ExtractorDaemon(db_manager, concurrency=args.concurrency).run()
+            return
+        
         # Get video files
         if args.video:
             if not os.path.exists(args.video):
@@ -140,26 +263,35 @@ def run_demo():
             logging.error("No video files found. Please add videos to the 'videos' directory.")
             sys.exit(1)
         
-        # Initialize progress bar
-        progress_bar = ProgressBar(len(video_files))
-        
-        # Process each video
-        for video_path in video_files:
-            video_id, highlights = process_video(video_path, db_manager, progress_bar)
+        if args.workers > 1:
+            processed, total_highlights, failed = process_videos_in_pool(
+                video_files, args.workers, args.concurrency, video_config_overrides
+            )
             
-            # Print highlights summary
-            print_highlights_summary(video_path, highlights)
+            # Print overall summary
+            print(f"\nProcessed {processed} videos with a total of {total_highlights} highlights")
             
-            # Move to next video
-            progress_bar.next_video()
+            if failed:
+                logging.error(f"Failed to process {len(failed)} videos: {', '.join(os.path.basename(f) for f in failed)}")
+                sys.exit(1)
+            return
+        
+        failed = process_videos_in_pipeline(video_files, db_manager, args.concurrency, args.scan_workers)
         
-        # Close progress bar
-        progress_bar.close()
+        # Cache counters cover every video processed in this run
+        log_cache_stats()
+        log_rate_limiter_stats()
         
-        # Print overall summary
-        videos = db_manager.get_all_videos()
-        print(f"\nProcessed {len(videos)} videos with a total of {sum(len(db_manager.get_highlights_by_video_id(v.id)) for v in videos)} highlights")
+        # Print overall summary from the run's counters; per-video details are in the run reports
+        counters = metrics.get_totals()['counters']
+        print(f"\nProcessed {counters.get('videos_processed', 0)} videos "
+              f"({counters.get('videos_skipped', 0)} already up to date) "
+              f"with a total of {counters.get('highlights', 0)} new highlights")
         
+        if failed:
+            logging.error(f"Failed to process {len(failed)} videos: {', '.join(os.path.basename(f) for f in failed)}")
+            sys.exit(1)
+    
     except KeyboardInterrupt:
         logging.info("Processing interrupted by user")
         sys.exit(0)
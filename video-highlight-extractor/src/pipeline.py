@@ -0,0 +1,678 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+import concurrent.futures
+import numpy as np
+
+from .config import PROCESSING_CONFIG, LLM_CONFIG, VIDEO_CONFIG
+from .processors.video_processor import VideoProcessor
+from .processors.segment_deduplicator import SegmentDeduplicator
+from .processors.highlight_scorer import HighlightScorer
+from .processors.audio_processor import AudioProcessor
+from .llm.llm_service import LLMService
+from .llm.llm_embeddings import EmbeddingService
+from .llm.rate_limiter import WaitInterrupted, interrupted_waits
+from .utils.helpers import compute_file_hash, get_config_hash
+from .utils.event_loop import submit
+from .utils import metrics
+
+# Seconds between checks whether the pipeline is stopping while a stage waits on a queue
+_POLL_INTERVAL = 0.1
+
+class _Stopped(Exception):
+    """Raised in a stage worker when the pipeline stops while it waits on a queue or the event loop"""
+
+class PipelineCancelled(Exception):
+    """Raised by ExtractionPipeline.run when its cancel event is set before all videos are done"""
+
+def enrich_highlights(segments, audio_processor, llm_service):
+    """
+    Transcribe and describe a group of highlights
+    
+    Runs in an enrich stage worker and only touches thread-safe services;
+    persistence stays in the later stages. A group of more than one highlight
+    is described with a single batched LLM request.
+    
+    Args:
+        segments (list): List of (start_time, end_time, highlight_frames, audio_segment) tuples;
+            audio_segment is the highlight's audio samples, or None
+        audio_processor (AudioProcessor): Audio processor instance
+        llm_service (LLMService): LLM service instance
+    
+    Returns:
+        list: (description, summary, fallback) tuples, in the order of segments;
+            fallback is True for the default description used when the model failed
+    """
+    requests = []
+    for start_time, end_time, highlight_frames, audio_segment in segments:
+        transcript = ""
+        if audio_segment is not None and len(audio_segment) > 0:
+            with metrics.timed('asr'):
+                transcript = audio_processor.transcribe_audio(audio_segment)
+        requests.append((highlight_frames, transcript, start_time, end_time))
+    
+    # Generate highlight descriptions using LLM
+    if len(requests) == 1:
+        results = [llm_service.generate_highlight_description(*requests[0])]
+    else:
+        results = llm_service.generate_highlight_descriptions_batch(requests)
+    
+    return [(result.get("description", ""), result.get("summary", ""), result.get("fallback", False)) for result in results]
+
+async def enrich_highlights_async(segments, audio_processor, llm_service):
+    """
+    Transcribe and describe a group of highlights on the event loop
+    
+    Same arguments and result as enrich_highlights. Transcription has no async
+    client and runs in the loop's default thread pool.
+    """
+    requests = []
+    for start_time, end_time, highlight_frames, audio_segment in segments:
+        transcript = ""
+        if audio_segment is not None and len(audio_segment) > 0:
+            with metrics.timed('asr'):
+                transcript = await asyncio.to_thread(audio_processor.transcribe_audio, audio_segment)
+        requests.append((highlight_frames, transcript, start_time, end_time))
+    
+    if len(requests) == 1:
+        results = [await llm_service.generate_highlight_description_async(*requests[0])]
+    else:
+        results = await llm_service.generate_highlight_descriptions_batch_async(requests)
+    
+    return [(result.get("description", ""), result.get("summary", ""), result.get("fallback", False)) for result in results]
+
+class VideoJob:
+    """A video moving through the pipeline, with the state its stages share"""
+    
+    def __init__(self, video_path):
+        """
+        Initialize the job
+        
+        Args:
+            video_path (str): Path to the video file
+        """
+        self.video_path = video_path
+        self.metrics = metrics.Metrics()
+        self.started = time.perf_counter()
+        
+        # 'queued', 'processing', then 'completed', 'skipped' or 'failed'
+        self.status = 'queued'
+        self.error = None
+        self.video_id = None
+        self.highlights = []
+        
+        # Candidate segments as (start_time, end_time), their indices by priority,
+        # how many may be enriched, and descriptions of those enriched by an
+        # interrupted run by segment index
+        self.segments = []
+        self.ranking = []
+        self.budget = 0
+        self.resumed = {}
+        self.audio_processor = None
+        
+        # Described highlights by segment index: (start_time, description, summary)
+        self.described = {}
+        
+        # Newly enriched segments not yet checkpointed
+        self.pending_checkpoints = []
+        
+        # Results the collect stage waits for and segments that must be described
+        # (both known once frame grabbing is done), and results received
+        self.expected_results = None
+        self.selected = None
+        self.received_results = 0
+    
+    @property
+    def finished(self):
+        """Whether the video left the pipeline"""
+        return self.status in ('completed', 'skipped', 'failed')
+
+class ExtractionPipeline:
+    """
+    Extracts highlights from videos in stages connected by bounded queues
+    
+    - scan: skip check, scene detection, audio decoding, segment selection, video row
+    - frames: representative frames, deduplication and audio slices of the segments,
+      in groups of up to LLM_CONFIG['description_batch_size'] highlights
+    - enrich: transcription and LLM descriptions of a group
+    - collect: checkpoints enriched segments, hands a video on once all its groups are back
+    - embed: batched embeddings of all descriptions of a video
+    - store: stores the highlights and writes the run report
+    
+    Every stage has its own worker threads and a full queue blocks the stage
+    feeding it, so decoded audio and grabbed frames stay bounded. Stages work on
+    different videos at the same time: the next video is decoded while the
+    highlights of the previous one are with the LLM.
+    
+    With async enrichment a single enrich worker hands its groups to the
+    process's event loop as coroutines, so hundreds of requests can be in
+    flight without a thread each, and embeddings use the async client too.
+    """
+    
+    STAGES = ('scan', 'frames', 'enrich', 'collect', 'embed', 'store')
+    
+    def __init__(self, db_manager, concurrency=None, workers=None, progress_bar=None, on_video_done=None,
+                 async_enrichment=None):
+        """
+        Initialize the pipeline
+        
+        Args:
+            db_manager (DBManager): Database manager instance, used by one stage at a time
+            concurrency (int, optional): Number of enrich workers, or of groups in flight with
+                async enrichment, defaults to PROCESSING_CONFIG['enrichment_concurrency']
+            workers (dict, optional): Worker counts by stage, overriding PROCESSING_CONFIG['pipeline_workers']
+            progress_bar (ProgressBar, optional): Progress bar for tracking processing stages
+            on_video_done (callable, optional): Called with the VideoJob of every video leaving the pipeline
+            async_enrichment (bool, optional): Enrich on the event loop, defaults to
+                PROCESSING_CONFIG['async_enrichment']
+        """
+        if concurrency is None:
+            concurrency = PROCESSING_CONFIG['enrichment_concurrency']
+        if async_enrichment is None:
+            async_enrichment = PROCESSING_CONFIG['async_enrichment']
+        
+        self.db_manager = db_manager
+        self.progress_bar = progress_bar
+        self.on_video_done = on_video_done
+        self.concurrency = max(1, concurrency)
+        self.async_enrichment = async_enrichment
+        
+        self.workers = {**PROCESSING_CONFIG['pipeline_workers'], **(workers or {})}
+        # With async enrichment one worker dispatches all groups to the event loop
+        self.workers['enrich'] = 1 if async_enrichment else concurrency
+        # Per-video collection state is only touched by a single thread
+        self.workers['collect'] = 1
+        self.workers = {stage: max(1, self.workers[stage]) for stage in self.STAGES}
+        
+        self.batch_size = max(1, LLM_CONFIG['description_batch_size'])
+        
+        # Stateless processors and thread-safe services are shared by all videos
+        self.video_processor = VideoProcessor()
+        self.scorer = HighlightScorer()
+        self.llm_service = LLMService()
+        self.embedding_service = EmbeddingService()
+        
+        # The database session is not thread-safe
+        self.db_lock = threading.Lock()
+        self.done = threading.Condition()
+        self.queues = {}
+        self.stopping = threading.Event()
+        self.threads = []
+    
+    def run(self, video_paths, cancel=None):
+        """
+        Process videos and wait until each is completed, skipped or failed
+        
+        Args:
+            video_paths (list): Paths of the video files
+            cancel (threading.Event, optional): Stops the stages once set, e.g. when
+                another extractor took over the job
+        
+        Returns:
+            list: VideoJob of each video, in the order of video_paths
+        
+        Raises:
+            KeyboardInterrupt: Re-raised once the stages are stopped; videos in
+                flight keep their checkpoints and resume on the next run
+            PipelineCancelled: Once the stages are stopped after cancel was set
+        """
+        jobs = [VideoJob(video_path) for video_path in video_paths]
+        
+        self.start()
+        try:
+            for job in jobs:
+                self.queues['scan'].put_nowait((job, None))
+            
+            with self.done:
+                while not all(job.finished for job in jobs):
+                    if cancel is not None and cancel.is_set():
+                        raise PipelineCancelled(f"Cancelled with {sum(1 for job in jobs if not job.finished)} unfinished videos")
+                    self.done.wait(_POLL_INTERVAL)
+        except KeyboardInterrupt:
+            unfinished = sum(1 for job in jobs if not job.finished)
+            logging.info(f"Stopping pipeline with {unfinished} unfinished videos, "
+                         f"waiting for running stage work to finish")
+            raise
+        finally:
+            self.stop()
+        
+        return jobs
+    
+    def start(self):
+        """Create the queues and start the worker threads of every stage"""
+        queue_size = max(1, PROCESSING_CONFIG['pipeline_queue_size'])
+        self.queues = {stage: queue.Queue(maxsize=queue_size) for stage in self.STAGES}
+        
+        # Video paths are all known up front; decoded videos hold their audio track
+        self.queues['scan'] = queue.Queue()
+        self.queues['frames'] = queue.Queue(maxsize=max(1, PROCESSING_CONFIG['pipeline_videos_ahead']))
+        
+        self.stopping.clear()
+        handlers = {
+            'scan': self._scan,
+            'frames': self._grab_frames,
+            'enrich': self._enrich,
+            'collect': self._collect,
+            'embed': self._embed,
+            'store': self._store
+        }
+        
+        for stage in self.STAGES:
+            for n in range(self.workers[stage]):
+                if stage == 'enrich' and self.async_enrichment:
+                    target, args = self._dispatch_enrich, ()
+                else:
+                    target, args = self._work, (stage, handlers[stage])
+                
+                thread = threading.Thread(target=target, args=args, name=f"{stage}-{n}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        
+        logging.info("Started pipeline with workers: " +
+                     ", ".join(f"{stage}={count}" for stage, count in self.workers.items()) +
+                     (f" (async enrichment, {self.concurrency} groups in flight)" if self.async_enrichment else ""))
+    
+    def stop(self):
+        """Stop the worker threads once their current item is handled and drop queued items"""
+        self.stopping.set()
+        
+        # Requests backing off in the rate limiters give up instead of holding up the joins
+        with interrupted_waits():
+            for thread in self.threads:
+                thread.join()
+        self.threads = []
+    
+    def _work(self, stage, handler):
+        """Handle the items of a stage's queue until the pipeline stops"""
+        source = self.queues[stage]
+        
+        while not self.stopping.is_set():
+            try:
+                job, payload = source.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            
+            # Leftovers of a video that failed in another stage
+            if job.finished:
+                continue
+            
+            try:
+                with metrics.activate(job.metrics):
+                    handler(job, payload)
+            except (_Stopped, WaitInterrupted):
+                return
+            except Exception as e:
+                logging.error(f"Error in {stage} stage for video {job.video_path}: {e}", exc_info=True)
+                job.error = e
+                self._rollback()
+                self._finish(job, 'failed')
+    
+    def _dispatch_enrich(self):
+        """
+        Hand the groups of the enrich queue to the event loop until the pipeline stops
+        
+        At most self.concurrency groups are in flight; groups still in flight
+        when the pipeline stops are cancelled and resume from the checkpoints.
+        """
+        source = self.queues['enrich']
+        slots = threading.Semaphore(self.concurrency)
+        in_flight = set()
+        
+        try:
+            while not self.stopping.is_set():
+                if not slots.acquire(timeout=_POLL_INTERVAL):
+                    continue
+                
+                try:
+                    job, group = source.get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    slots.release()
+                    continue
+                
+                # Leftovers of a video that failed in another stage
+                if job.finished:
+                    slots.release()
+                    continue
+                
+                future = submit(self._enrich_async(job, group))
+                in_flight.add(future)
+                
+                def done(future):
+                    in_flight.discard(future)
+                    slots.release()
+                
+                future.add_done_callback(done)
+        finally:
+            for future in list(in_flight):
+                future.cancel()
+    
+    async def _enrich_async(self, job, group):
+        """Transcribe and describe a group of highlights on the event loop, like _enrich"""
+        segments = [(i, start_time, end_time) for i, start_time, end_time, _, _ in group]
+        
+        with metrics.activate(job.metrics):
+            try:
+                try:
+                    results = await enrich_highlights_async(
+                        [(start_time, end_time, frames, audio_segment) for _, start_time, end_time, frames, audio_segment in group],
+                        job.audio_processor, self.llm_service
+                    )
+                except Exception as e:
+                    # The group is left out, the rest of the video goes on
+                    first, last = segments[0][0] + 1, segments[-1][0] + 1
+                    logging.error(f"Error enriching highlights {first}-{last} at {segments[0][1]:.2f}s: {e}", exc_info=True)
+                    results = []
+                
+                # The collect queue may be full, so wait for it off the event loop
+                await asyncio.to_thread(self._put, 'collect', job, ('results', segments, results))
+            except _Stopped:
+                return
+            except Exception as e:
+                logging.error(f"Error in enrich stage for video {job.video_path}: {e}", exc_info=True)
+                job.error = e
+                self._rollback()
+                self._finish(job, 'failed')
+    
+    def _put(self, stage, job, payload=None):
+        """Queue an item for a stage, waiting while its queue is full"""
+        target = self.queues[stage]
+        
+        while True:
+            if self.stopping.is_set():
+                raise _Stopped()
+            try:
+                target.put((job, payload), timeout=_POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+    
+    def _result(self, future):
+        """Wait for a coroutine running on the event loop, cancelling it when the pipeline stops"""
+        while True:
+            if self.stopping.is_set():
+                future.cancel()
+                raise _Stopped()
+            try:
+                return future.result(timeout=_POLL_INTERVAL)
+            except concurrent.futures.TimeoutError:
+                continue
+    
+    def _rollback(self):
+        """Discard the writes a failed stage left in the shared session, so the other videos can go on"""
+        with self.db_lock:
+            try:
+                self.db_manager.rollback()
+            except Exception as e:
+                logging.error(f"Error rolling back the database session: {e}")
+    
+    def _finish(self, job, status):
+        """Take a video out of the pipeline and write its run report"""
+        with self.done:
+            if job.finished:
+                return
+            job.status = status
+            
+            if job.audio_processor is not None:
+                job.audio_processor.release_audio()
+            
+            details = {'video_id': job.video_id, 'status': status, 'highlights': len(job.highlights)}
+            if job.error is not None:
+                details['error'] = str(job.error)
+            metrics.finish_run(job.metrics, job.video_path, time.perf_counter() - job.started, **details)
+            
+            if self.on_video_done:
+                self.on_video_done(job)
+            self.done.notify_all()
+    
+    def _update_stage(self, job, stage):
+        """Report the stage of a video to the progress bar"""
+        if self.progress_bar:
+            self.progress_bar.update_stage(job.video_path, stage)
+    
+    def _scan(self, job, _):
+        """Skip up-to-date videos, detect scenes, decode the audio and select the segments to enrich"""
+        video_path = job.video_path
+        job.status = 'processing'
+        job.started = time.perf_counter()
+        logging.info(f"Processing video: {video_path}")
+        
+        # Identify the video by content, so renamed or re-run files are recognized
+        content_hash = compute_file_hash(video_path)
+        config_hash = get_config_hash()
+        
+        with self.db_lock:
+            existing = self.db_manager.get_video_by_content_hash(content_hash)
+            if existing is not None and existing.status == 'completed' and existing.config_hash == config_hash:
+                job.video_id = existing.id
+                job.highlights = self.db_manager.get_highlights_by_video_id(existing.id)
+        
+        if job.video_id is not None:
+            logging.info(f"Skipping video already processed with the current configuration: {video_path}")
+            self._update_stage(job, "Skipped (already processed)")
+            metrics.increment('videos_skipped')
+            self._finish(job, 'skipped')
+            return
+        
+        # Decode frames and detect scene changes in a single streaming pass
+        self._update_stage(job, "Detecting scene changes")
+        motion_profile = []
+        scene_changes, duration = self.video_processor.scan_scene_changes(video_path, motion_profile=motion_profile)
+        
+        # Decode the audio track once; highlight segments are sliced from it in memory
+        job.audio_processor = AudioProcessor()
+        with metrics.timed('audio_extraction'):
+            samples = job.audio_processor.load_audio(video_path)
+        
+        with metrics.timed('segmenting'):
+            # Identify potential highlights
+            segments = self.video_processor.identify_potential_highlights(scene_changes, duration)
+            metrics.increment('segments_detected', len(segments))
+            
+            # Under a highlight budget only the most salient segments are sent to the LLM;
+            # the budget is filled after deduplication, see _grab_frames
+            job.segments = segments
+            job.ranking, job.budget = self.scorer.rank(
+                segments, motion_profile, samples, job.audio_processor.sample_rate, duration
+            )
+        
+        # Get or create the video row; segments enriched by an interrupted run are reused
+        with self.db_lock, metrics.timed('db_write'):
+            video, checkpoints = self.db_manager.start_video(
+                os.path.basename(video_path), duration, content_hash, config_hash
+            )
+            job.video_id = video.id
+            
+            # Read while holding the lock, another stage may expire the session's objects.
+            # Checkpoints of segments that moved are enriched again and overwritten.
+            job.resumed = {
+                i: (checkpoint.description, checkpoint.summary)
+                for i, checkpoint in checkpoints.items()
+                if i < len(job.segments) and abs(checkpoint.start_time - job.segments[i][0]) < 1e-6
+            }
+        if job.resumed:
+            logging.info(f"Resuming video {video_path}: {len(job.resumed)}/{len(job.segments)} segments already enriched")
+            metrics.increment('segments_resumed', len(job.resumed))
+        
+        self._put('frames', job)
+    
+    def _grab_frames(self, job, _):
+        """
+        Read the segments' representative frames and audio and queue them for enrichment in groups
+        
+        Segments are taken from the top of the ranking until the budget is
+        filled. Every round reads the frames of as many segments as the budget
+        still lacks in one sequential pass; near-duplicates are dropped and the
+        next round replaces them with the next segments of the ranking.
+        Segments enriched by an earlier run are not enriched again, but their
+        frames are still read when deduplication is enabled, so a resumed run
+        suppresses the same segments as an uninterrupted one.
+        """
+        video_path = job.video_path
+        deduplicator = SegmentDeduplicator() if VIDEO_CONFIG['dedup_enabled'] else None
+        
+        # Highlights waiting to be queued together: (index, start_time, end_time, frames, audio_segment)
+        group = []
+        results = 0
+        selected = 0
+        position = 0
+        
+        while selected < job.budget and position < len(job.ranking):
+            batch = sorted(job.ranking[position:position + job.budget - selected])
+            position += len(batch)
+            
+            # Representative frames of the segments still to enrich, and of the resumed ones
+            # when deduplicating, are read in one sequential pass
+            highlight_frames_iter = self.video_processor.iter_highlight_frames(
+                video_path, [job.segments[i] for i in batch if deduplicator is not None or i not in job.resumed]
+            )
+            
+            for i in batch:
+                start_time, end_time = job.segments[i]
+                
+                if i in job.resumed:
+                    # Kept by the earlier run, so later segments are checked against it as they were then
+                    if deduplicator is not None:
+                        with metrics.timed('frame_grab'):
+                            deduplicator.keep(next(highlight_frames_iter))
+                    
+                    # Already enriched by an earlier run, goes straight to collection
+                    self._put('collect', job, ('results', [(i, start_time, end_time)], [(*job.resumed[i], False)]))
+                    results += 1
+                    selected += 1
+                    continue
+                
+                with metrics.timed('frame_grab'):
+                    highlight_frames = next(highlight_frames_iter)
+                
+                # Near-duplicates of an earlier segment are dropped before any network call
+                if deduplicator is not None and deduplicator.find_duplicate(highlight_frames) is not None:
+                    continue
+                selected += 1
+                
+                # Slice the audio segment from the decoded track
+                audio_segment = job.audio_processor.get_audio_segment(video_path, start_time, end_time)
+                
+                group.append((i, start_time, end_time, highlight_frames, audio_segment))
+                if len(group) >= self.batch_size:
+                    self._put('enrich', job, group)
+                    group = []
+                    results += 1
+        
+        if group:
+            self._put('enrich', job, group)
+            results += 1
+        
+        # Queued groups keep their audio slices, the full track is no longer needed
+        job.audio_processor.release_audio()
+        
+        if deduplicator is not None:
+            logging.info(f"Suppressed {deduplicator.suppressed} near-duplicate segments "
+                         f"of {len(job.segments)} in video: {video_path}")
+            metrics.increment('segments_deduplicated', deduplicator.suppressed)
+        
+        if selected < len(job.segments):
+            logging.info(f"Selected {selected} of {len(job.segments)} segments within the highlight budget")
+        metrics.increment('segments_selected', selected)
+        
+        self._put('collect', job, ('queued', results, selected))
+    
+    def _enrich(self, job, group):
+        """Transcribe and describe a group of highlights"""
+        segments = [(i, start_time, end_time) for i, start_time, end_time, _, _ in group]
+        
+        try:
+            results = enrich_highlights(
+                [(start_time, end_time, frames, audio_segment) for _, start_time, end_time, frames, audio_segment in group],
+                job.audio_processor, self.llm_service
+            )
+        except Exception as e:
+            # The group is left out, the rest of the video goes on
+            first, last = segments[0][0] + 1, segments[-1][0] + 1
+            logging.error(f"Error enriching highlights {first}-{last} at {segments[0][1]:.2f}s: {e}", exc_info=True)
+            results = []
+        
+        self._put('collect', job, ('results', segments, results))
+    
+    def _collect(self, job, message):
+        """
+        Gather the descriptions of a video, checkpoint them and pass the video on once complete
+        
+        Fallback descriptions and groups whose enrichment failed leave their
+        segments undescribed. A video with undescribed segments is not stored,
+        so the next run resumes from the checkpoints and describes only those.
+        """
+        if message[0] == 'queued':
+            _, job.expected_results, job.selected = message
+        else:
+            _, segments, results = message
+            job.received_results += 1
+            
+            for (i, start_time, end_time), (description, summary, fallback) in zip(segments, results):
+                if fallback:
+                    continue
+                
+                job.described[i] = (start_time, description, summary)
+                self._update_stage(job, f"Processing highlight {len(job.described)}/{job.budget}")
+                
+                if i not in job.resumed:
+                    job.pending_checkpoints.append((i, start_time, end_time, description, summary))
+            
+            if len(job.pending_checkpoints) >= PROCESSING_CONFIG['checkpoint_interval']:
+                self._write_checkpoints(job)
+        
+        if job.received_results == job.expected_results:
+            self._write_checkpoints(job)
+            
+            missing = job.selected - len(job.described)
+            if missing > 0:
+                raise RuntimeError(f"{missing} of {job.selected} highlights could not be described, "
+                                   f"the video is left unfinished for the next run to resume")
+            
+            self._put('embed', job)
+    
+    def _write_checkpoints(self, job):
+        """Commit the pending checkpoints of a video"""
+        with self.db_lock, metrics.timed('db_write'):
+            self.db_manager.add_checkpoints(job.video_id, job.pending_checkpoints)
+        job.pending_checkpoints = []
+    
+    def _embed(self, job, _):
+        """Generate the embeddings of all highlights of a video together"""
+        # Described highlights in their original order
+        described = [job.described[i] for i in sorted(job.described)]
+        
+        self._update_stage(job, "Generating embeddings")
+        highlights = [(description, summary) for _, description, summary in described]
+        with metrics.timed('embedding'):
+            if self.async_enrichment:
+                # Batches go out concurrently; the coroutine inherits this video's metrics
+                embeddings = self._result(submit(self.embedding_service.get_highlight_embeddings_batch_async(highlights)))
+            else:
+                embeddings = self.embedding_service.get_highlight_embeddings_batch(highlights)
+        
+        self._put('store', job, (described, embeddings))
+    
+    def _store(self, job, payload):
+        """Store all highlights and mark the video completed in one transaction"""
+        described, embeddings = payload
+        
+        self._update_stage(job, "Storing highlights")
+        with self.db_lock, metrics.timed('db_write'):
+            job.highlights = self.db_manager.complete_video(
+                job.video_id,
+                [
+                    # Highlights whose embedding failed are stored without one instead of with a zero vector
+                    (start_time, description, summary, embedding if np.isfinite(embedding).all() else None)
+                    for (start_time, description, summary), embedding in zip(described, embeddings)
+                ]
+            )
+        
+        self._update_stage(job, "Completed")
+        logging.info(f"Processed {len(job.highlights)} highlights for video: {job.video_path}")
+        
+        metrics.increment('videos_processed')
+        metrics.increment('highlights', len(job.highlights))
+        self._finish(job, 'completed')
@@ -1,14 +1,93 @@
 import os
 import logging
 import tempfile
-from pydub import AudioSegment
+import subprocess
+import numpy as np
 import speech_recognition as sr
 from moviepy.editor import VideoFileClip
 
+from ..config import AUDIO_CONFIG
+
 class AudioProcessor:
     def __init__(self):
         """Initialize the audio processor"""
         self.recognizer = sr.Recognizer()
+        self.sample_rate = AUDIO_CONFIG['sample_rate']
+        self.ffmpeg_binary = AUDIO_CONFIG['ffmpeg_binary']
+        
+        # Decoded audio track of the most recently loaded video: (video_path, samples)
+        self.audio_cache = None
+    
+    def load_audio(self, video_path):
+        """
+        Decode the audio track of a video once into memory
+        
+        The track is decoded by a single ffmpeg process to mono 16-bit PCM at the
+        speech recognition sample rate. The result is cached, so repeated calls
+        for the same video do not decode again.
+        
+        Args:
+            video_path (str): Path to the video file
+            
+        Returns:
+            numpy.ndarray: int16 samples, or None if the video has no audio track
+        """
+        if self.audio_cache is not None and self.audio_cache[0] == video_path:
+            return self.audio_cache[1]
+        
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video file not found: {video_path}")
+        
+        command = [
+            self.ffmpeg_binary, '-nostdin', '-v', 'error',
+            '-i', video_path,
+            '-vn', '-ac', '1', '-ar', str(self.sample_rate),
+            '-f', 's16le', '-acodec', 'pcm_s16le', '-'
+        ]
+        
+        samples = None
+        
+        try:
+            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+            samples = np.frombuffer(result.stdout, dtype=np.int16)
+            logging.info(f"Decoded audio from {video_path}: {len(samples) / self.sample_rate:.2f}s at {self.sample_rate}Hz")
+        except subprocess.CalledProcessError as e:
+            logging.warning(f"No audio decoded from {video_path}: {e.stderr.decode(errors='replace').strip()}")
+        except Exception as e:
+            logging.error(f"Error decoding audio: {e}")
+        
+        if samples is not None and len(samples) == 0:
+            samples = None
+        
+        self.audio_cache = (video_path, samples)
+        return samples
+    
+    def get_audio_segment(self, video_path, start_time, end_time):
+        """
+        Get the audio samples of a time range from the cached audio track
+        
+        Args:
+            video_path (str): Path to the video file
+            start_time (float): Start time in seconds
+            end_time (float): End time in seconds
+            
+        Returns:
+            numpy.ndarray: View into the cached int16 samples, or None if there is no audio
+        """
+        samples = self.load_audio(video_path)
+        
+        if samples is None:
+            return None
+        
+        # Ensure times are within audio bounds
+        start_sample = max(0, int(start_time * self.sample_rate))
+        end_sample = min(len(samples), int(end_time * self.sample_rate))
+        
+        return samples[start_sample:end_sample]
+    
+    def release_audio(self):
+        """Drop the cached audio track"""
+        self.audio_cache = None
     
     def extract_audio(self, video_path):
         """
@@ -25,7 +104,8 @@ class AudioProcessor:
         
         try:
             # Create temporary file for audio
-            temp_audio_path = tempfile.mktemp(suffix='.wav')
+            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
+                temp_audio_path = temp_file.name
             
             # Extract audio using moviepy
             video = VideoFileClip(video_path)
@@ -55,7 +135,8 @@ class AudioProcessor:
         
         try:
             # Create temporary file for audio segment
-            temp_audio_path = tempfile.mktemp(suffix='.wav')
+            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
+                temp_audio_path = temp_file.name
             
             # Extract audio segment using moviepy
             video = VideoFileClip(video_path)
@@ -74,58 +155,89 @@ class AudioProcessor:
             logging.error(f"Error extracting audio segment: {e}")
             return None
     
-    def transcribe_audio(self, audio_path):
+    def transcribe_audio(self, audio_path, sample_rate=None, sample_width=2):
         """
-        Transcribe speech in an audio file
+        Transcribe speech in an audio file or an already-decoded audio buffer
+        
+        Nothing is written to disk: files are read into memory and chunks are
+        passed to the recognizer as slices of the PCM buffer.
         
         Args:
-            audio_path (str): Path to the audio file
+            audio_path (str, numpy.ndarray or bytes-like): Path to the audio file,
+                int16 samples as returned by get_audio_segment, or raw mono PCM bytes
+            sample_rate (int, optional): Sample rate of raw PCM bytes, defaults to the configured rate
+            sample_width (int): Bytes per sample of raw PCM bytes
             
         Returns:
             str: Transcribed text
         """
+        if isinstance(audio_path, np.ndarray):
+            pcm = memoryview(np.ascontiguousarray(audio_path, dtype=np.int16)).cast('B')
+            return self.transcribe_pcm(pcm, self.sample_rate, 2)
+        
+        if isinstance(audio_path, (bytes, bytearray, memoryview)):
+            pcm = memoryview(audio_path).cast('B')
+            return self.transcribe_pcm(pcm, sample_rate or self.sample_rate, sample_width)
+        
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
         
         try:
-            # Load audio file
-            audio = AudioSegment.from_wav(audio_path)
+            # Read the whole file into memory as mono PCM
+            with sr.AudioFile(audio_path) as source:
+                audio_data = self.recognizer.record(source)
+        except Exception as e:
+            logging.error(f"Error reading audio file: {e}")
+            return ""
+        
+        transcript = self.transcribe_pcm(
+            memoryview(audio_data.frame_data), audio_data.sample_rate, audio_data.sample_width
+        )
+        
+        logging.info(f"Transcribed audio: {audio_path[:50]}{'...' if len(audio_path) > 50 else ''}")
+        return transcript
+    
+    def transcribe_pcm(self, pcm, sample_rate, sample_width):
+        """
+        Transcribe speech in a mono PCM buffer
+        
+        Args:
+            pcm (memoryview): Mono PCM bytes
+            sample_rate (int): Sample rate in Hz
+            sample_width (int): Bytes per sample
+            
+        Returns:
+            str: Transcribed text
+        """
+        try:
+            bytes_per_second = sample_rate * sample_width
             
             # Split audio into chunks if it's longer than 60 seconds
             # (SpeechRecognition works better with shorter audio)
             chunks = []
-            if len(audio) > 60000:  # 60000ms = 60s
-                chunk_size = 30000  # 30s chunks
-                for i in range(0, len(audio), chunk_size):
-                    chunks.append(audio[i:i+chunk_size])
+            if len(pcm) > 60 * bytes_per_second:
+                chunk_size = 30 * bytes_per_second  # 30s chunks
+                for i in range(0, len(pcm), chunk_size):
+                    chunks.append(pcm[i:i+chunk_size])
             else:
-                chunks = [audio]
+                chunks = [pcm]
             
             transcripts = []
             
             for i, chunk in enumerate(chunks):
-                # Save chunk to temporary file
-                chunk_path = tempfile.mktemp(suffix='.wav')
-                chunk.export(chunk_path, format="wav")
-                
-                # Transcribe chunk
-                with sr.AudioFile(chunk_path) as source:
-                    audio_data = self.recognizer.record(source)
-                    try:
-                        text = self.recognizer.recognize_google(audio_data)
-                        transcripts.append(text)
-                    except sr.UnknownValueError:
-                        logging.warning(f"Speech Recognition could not understand audio chunk {i+1}")
-                    except sr.RequestError as e:
-                        logging.error(f"Could not request results from Speech Recognition service: {e}")
-                
-                # Clean up temporary chunk file
-                os.remove(chunk_path)
+                audio_data = sr.AudioData(chunk, sample_rate, sample_width)
+                try:
+                    text = self.recognizer.recognize_google(audio_data)
+                    transcripts.append(text)
+                except sr.UnknownValueError:
+                    logging.warning(f"Speech Recognition could not understand audio chunk {i+1}")
+                except sr.RequestError as e:
+                    logging.error(f"Could not request results from Speech Recognition service: {e}")
             
             # Combine transcripts
             full_transcript = " ".join(transcripts)
             
-            logging.info(f"Transcribed audio: {audio_path[:50]}{'...' if len(audio_path) > 50 else ''}")
+            logging.info(f"Transcribed {len(pcm) / bytes_per_second:.2f}s of audio")
             return full_transcript
             
         except Exception as e:
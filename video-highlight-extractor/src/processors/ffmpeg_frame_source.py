@@ -0,0 +1,162 @@
+import re
+import queue
+import logging
+import threading
+import subprocess
+import numpy as np
+
+from ..config import AUDIO_CONFIG
+
+# Presentation time of every frame leaving the filter graph, as logged by the showinfo filter
+_PTS_TIME_PATTERN = re.compile(r"\bn:\s*\d+\s.*?\bpts_time:\s*(-?[\d.]+(?:e-?\d+)?)")
+
+# Size of the frame in the same showinfo line
+_SIZE_PATTERN = re.compile(r"\bs:(\d+)x(\d+)\b")
+
+class FFmpegFrameSource:
+    """Decodes raw frames from an ffmpeg subprocess pipe into preallocated buffers"""
+    
+    def __init__(self, pix_fmt='gray', size=None, fps=None, stride=1, keyframes_only=False,
+                 ffmpeg_binary=None, buffers=2):
+        """
+        Initialize the frame source
+        
+        Args:
+            pix_fmt (str): 'gray' or 'bgr24'
+            size (tuple, optional): (width, height) ffmpeg scales the frames to
+            fps (float, optional): Output frame rate of an fps filter
+            stride (int): Only output every Nth decoded frame
+            keyframes_only (bool): Decode keyframes only (-skip_frame nokey)
+            ffmpeg_binary (str, optional): ffmpeg executable, defaults to AUDIO_CONFIG['ffmpeg_binary']
+            buffers (int): Number of frame buffers cycled through
+        """
+        if pix_fmt not in ('gray', 'bgr24'):
+            raise ValueError(f"Unsupported pixel format: {pix_fmt}")
+        
+        self.pix_fmt = pix_fmt
+        self.size = tuple(size) if size else None
+        self.fps = fps
+        self.stride = max(1, int(stride))
+        self.keyframes_only = keyframes_only
+        self.ffmpeg_binary = ffmpeg_binary or AUDIO_CONFIG['ffmpeg_binary']
+        self.buffers = max(2, int(buffers))
+    
+    def build_command(self, video_path):
+        """
+        Build the ffmpeg command line
+        
+        Args:
+            video_path (str): Path to the video file
+        
+        Returns:
+            list: ffmpeg arguments
+        """
+        filters = []
+        if self.stride > 1:
+            filters.append(f"select='not(mod(n\\,{self.stride}))'")
+        if self.fps:
+            filters.append(f"fps={self.fps}")
+        if self.size:
+            filters.append(f"scale={self.size[0]}:{self.size[1]}:flags=bilinear")
+        filters.append("showinfo=checksum=0")
+        
+        command = [self.ffmpeg_binary, '-nostdin', '-hide_banner', '-v', 'info']
+        if self.keyframes_only:
+            command += ['-skip_frame', 'nokey']
+        command += [
+            '-i', video_path,
+            '-map', '0:v:0', '-an', '-sn',
+            '-vf', ','.join(filters),
+            # Emit exactly the frames leaving the filter graph, so they pair up with showinfo
+            '-fps_mode', 'passthrough',
+            '-pix_fmt', self.pix_fmt,
+            '-f', 'rawvideo', '-'
+        ]
+        return command
+    
+    def iter_frames(self, video_path):
+        """
+        Decode a video file one frame at a time
+        
+        Frames are read straight into a small ring of preallocated arrays; a
+        yielded frame stays valid until `buffers - 1` further frames have been
+        yielded, so copy it if it has to be kept longer. The arrays are sized
+        from the frame size ffmpeg logs, which is the displayed size after
+        autorotation unless `size` scales the frames.
+        
+        Args:
+            video_path (str): Path to the video file
+        
+        Yields:
+            tuple: (timestamp, frame) for every output frame
+        """
+        # Unbuffered, so frames are read straight into the ring
+        process = subprocess.Popen(
+            self.build_command(video_path), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            bufsize=0
+        )
+        
+        frame_infos = queue.Queue()
+        errors = []
+        
+        def read_log():
+            """Collect frame timestamps and sizes and errors from ffmpeg's log"""
+            for line in iter(process.stderr.readline, b''):
+                line = line.decode('utf-8', errors='replace')
+                match = _PTS_TIME_PATTERN.search(line) if 'Parsed_showinfo' in line else None
+                size = _SIZE_PATTERN.search(line) if match else None
+                if size:
+                    frame_infos.put((float(match.group(1)), int(size.group(1)), int(size.group(2))))
+                elif 'error' in line.lower():
+                    errors.append(line.strip())
+            frame_infos.put(None)
+        
+        log_reader = threading.Thread(target=read_log, name="ffmpeg-log", daemon=True)
+        log_reader.start()
+        
+        ring = []
+        frame_count = 0
+        returncode = None
+        
+        try:
+            while True:
+                # showinfo logs a frame before it is written to the pipe
+                frame_info = frame_infos.get()
+                if frame_info is None:
+                    break
+                
+                timestamp, width, height = frame_info
+                shape = (height, width) if self.pix_fmt == 'gray' else (height, width, 3)
+                if not ring or ring[0].shape != shape:
+                    ring = [np.empty(shape, dtype=np.uint8) for _ in range(self.buffers)]
+                
+                frame = ring[frame_count % self.buffers]
+                view = memoryview(frame).cast('B')
+                filled = 0
+                
+                while filled < len(view):
+                    read = process.stdout.readinto(view[filled:])
+                    if not read:
+                        break
+                    filled += read
+                
+                if filled < len(view):
+                    break
+                
+                yield timestamp, frame
+                frame_count += 1
+            
+            returncode = process.wait()
+        finally:
+            # Stop ffmpeg early if the consumer didn't read every frame
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            process.wait()
+            log_reader.join()
+            process.stderr.close()
+            
+            logging.info(f"Decoded {frame_count} frames from video with ffmpeg")
+        
+        if returncode:
+            raise RuntimeError(f"ffmpeg failed to decode {video_path}: {' '.join(errors[-3:])}")
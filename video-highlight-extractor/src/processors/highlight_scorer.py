@@ -0,0 +1,178 @@
+import math
+import logging
+import numpy as np
+
+from ..config import VIDEO_CONFIG
+
+class HighlightScorer:
+    """Ranks candidate segments by cheap saliency signals to fit an LLM budget"""
+    
+    def __init__(self):
+        """Initialize the scorer"""
+        self.weights = VIDEO_CONFIG['saliency_weights']
+        self.speech_rms_threshold_db = VIDEO_CONFIG['speech_rms_threshold_db']
+        self.max_highlights_per_video = VIDEO_CONFIG['max_highlights_per_video']
+        self.max_highlights_per_minute = VIDEO_CONFIG['max_highlights_per_minute']
+    
+    def get_budget(self, video_duration):
+        """
+        Get the number of segments that may be enriched
+        
+        Args:
+            video_duration (float): Total duration of the video
+            
+        Returns:
+            int: Maximum number of segments, or None if there is no budget
+        """
+        limits = []
+        
+        if self.max_highlights_per_video:
+            limits.append(int(self.max_highlights_per_video))
+        
+        if self.max_highlights_per_minute:
+            limits.append(max(1, math.ceil(self.max_highlights_per_minute * video_duration / 60)))
+        
+        return min(limits) if limits else None
+    
+    def motion_scores(self, segments, motion_profile):
+        """
+        Mean changed pixel percentage between consecutive frames of each segment
+        
+        Args:
+            segments (list): List of (start_time, end_time) tuples
+            motion_profile (list): (timestamp, changed pixel percentage) of every compared frame
+            
+        Returns:
+            numpy.ndarray: Motion magnitude per segment
+        """
+        if not motion_profile:
+            return np.zeros(len(segments))
+        
+        profile = np.asarray(motion_profile, dtype=np.float64)
+        timestamps, values = profile[:, 0], profile[:, 1]
+        cumulative = np.concatenate([[0.0], np.cumsum(values)])
+        
+        bounds = np.asarray(segments, dtype=np.float64).reshape(-1, 2)
+        # The frame at the start is compared with the previous scene, its cut would dominate short segments
+        first = np.searchsorted(timestamps, bounds[:, 0], side='right')
+        last = np.searchsorted(timestamps, bounds[:, 1], side='left')
+        counts = last - first
+        
+        return np.where(counts > 0, (cumulative[last] - cumulative[first]) / np.maximum(counts, 1), 0.0)
+    
+    def audio_scores(self, segments, samples, sample_rate):
+        """
+        RMS loudness and voice activity of each segment
+        
+        Voice activity is the fraction of 30ms windows whose RMS level is above
+        speech_rms_threshold_db, a cheap energy-based stand-in for speech detection.
+        
+        Args:
+            segments (list): List of (start_time, end_time) tuples
+            samples (numpy.ndarray): int16 audio samples of the video, or None
+            sample_rate (int): Sample rate of the samples
+            
+        Returns:
+            tuple: (loudness in dBFS per segment, voice activity fraction per segment)
+        """
+        loudness = np.full(len(segments), -120.0)
+        speech = np.zeros(len(segments))
+        
+        if samples is None or len(samples) == 0:
+            return loudness, speech
+        
+        window = max(1, int(0.03 * sample_rate))
+        
+        for i, (start_time, end_time) in enumerate(segments):
+            segment = samples[max(0, int(start_time * sample_rate)):int(end_time * sample_rate)]
+            if len(segment) == 0:
+                continue
+            
+            audio = segment.astype(np.float32) / 32768.0
+            loudness[i] = 20 * np.log10(np.sqrt(np.mean(audio ** 2)) + 1e-6)
+            
+            num_windows = len(audio) // window
+            if num_windows:
+                window_rms = np.sqrt(np.mean(audio[:num_windows * window].reshape(num_windows, window) ** 2, axis=1))
+                window_db = 20 * np.log10(window_rms + 1e-6)
+                speech[i] = np.mean(window_db > self.speech_rms_threshold_db)
+        
+        return loudness, speech
+    
+    def score(self, segments, motion_profile, samples, sample_rate):
+        """
+        Combine the saliency signals into one score per segment
+        
+        Each signal is rank-normalized to [0, 1] across the video's segments, so
+        signals with different units can be weighted against each other.
+        
+        Args:
+            segments (list): List of (start_time, end_time) tuples
+            motion_profile (list): (timestamp, changed pixel percentage) of every compared frame
+            samples (numpy.ndarray): int16 audio samples of the video, or None
+            sample_rate (int): Sample rate of the samples
+            
+        Returns:
+            numpy.ndarray: Score per segment
+        """
+        loudness, speech = self.audio_scores(segments, samples, sample_rate)
+        signals = {
+            'motion': self.motion_scores(segments, motion_profile),
+            'loudness': loudness,
+            'speech': speech
+        }
+        
+        scores = np.zeros(len(segments))
+        for name, values in signals.items():
+            scores += self.weights.get(name, 0.0) * self._rank_normalize(values)
+        
+        return scores
+    
+    def _rank_normalize(self, values):
+        """Map values to their rank in [0, 1], ties sharing the mean rank"""
+        if len(values) < 2:
+            return np.ones(len(values))
+        
+        order = np.argsort(values, kind='stable')
+        ranks = np.empty(len(values))
+        ranks[order] = np.arange(len(values))
+        
+        # Average the ranks of tied values so equal signals score equally
+        unique, inverse = np.unique(values, return_inverse=True)
+        mean_ranks = np.bincount(inverse, weights=ranks) / np.bincount(inverse)
+        
+        return mean_ranks[inverse] / (len(values) - 1)
+    
+    def rank(self, segments, motion_profile, samples, sample_rate, video_duration):
+        """
+        Order segments by priority for the budget
+        
+        Callers that drop some segments later (e.g. near-duplicates) fill the
+        budget by walking further down the ranking.
+        
+        Args:
+            segments (list): List of (start_time, end_time) tuples
+            motion_profile (list): (timestamp, changed pixel percentage) of every compared frame
+            samples (numpy.ndarray): int16 audio samples of the video, or None
+            sample_rate (int): Sample rate of the samples
+            video_duration (float): Total duration of the video
+            
+        Returns:
+            tuple: (segment indices, highest score first, or chronological when all fit the budget;
+                number of segments that may be enriched)
+        """
+        budget = self.get_budget(video_duration)
+        
+        if budget is None or len(segments) <= budget:
+            return list(range(len(segments))), len(segments)
+        
+        scores = self.score(segments, motion_profile, samples, sample_rate)
+        
+        # Highest scores first, earlier segments win ties
+        ranking = np.argsort(-scores, kind='stable')
+        
+        top = ranking[:budget]
+        logging.info(f"Ranked {len(segments)} segments for a budget of {budget} "
+                     f"(top scores {scores[top].min():.2f}-{scores[top].max():.2f})")
+        return [int(i) for i in ranking], budget
+        
\ No newline at end of file
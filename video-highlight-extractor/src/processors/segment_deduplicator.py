@@ -0,0 +1,98 @@
+import numpy as np
+
+from ..config import VIDEO_CONFIG
+from ..utils.image_hash import dhash
+
+# Number of set bits of every byte value, for popcounts on packed hashes
+_BIT_COUNTS = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+class SegmentDeduplicator:
+    """Detects segments whose keyframes nearly match a segment seen earlier in the video"""
+    
+    def __init__(self, max_distance=None):
+        """
+        Initialize the deduplicator
+        
+        Args:
+            max_distance (float, optional): Maximum mean number of differing dHash bits
+                (out of 64) for two segments to count as near-duplicates
+        """
+        if max_distance is None:
+            max_distance = VIDEO_CONFIG['dedup_max_distance']
+        
+        self.max_distance = max_distance
+        
+        # Keyframe hashes of all kept segments, and where each segment's hashes start
+        self.kept_hashes = np.empty(0, dtype=np.uint64)
+        self.kept_starts = []
+        self.suppressed = 0
+    
+    def fingerprint(self, frames):
+        """
+        Compute the fingerprint of a segment
+        
+        Args:
+            frames (list): Keyframes of the segment
+            
+        Returns:
+            numpy.ndarray: uint64 dHash of every keyframe
+        """
+        return np.array([dhash(frame) for frame in frames], dtype=np.uint64)
+    
+    def find_duplicate(self, frames):
+        """
+        Check a segment against the kept segments, keeping it if it is new
+        
+        The distance between two segments is the larger of the two directed
+        mean distances from each keyframe to its closest keyframe in the other
+        segment, so every keyframe has to be matched both ways.
+        
+        Args:
+            frames (list): Keyframes of the segment
+            
+        Returns:
+            int: Index (in order of keeping) of the matching kept segment, or None if the segment was kept
+        """
+        fingerprint = self.fingerprint(frames)
+        
+        if len(fingerprint) == 0:
+            return None
+        
+        if self.kept_starts:
+            # Hamming distances between every new keyframe and every kept keyframe
+            xor = fingerprint[:, None] ^ self.kept_hashes[None, :]
+            distances = _BIT_COUNTS[xor.view(np.uint8)].reshape(xor.shape + (8,)).sum(axis=2)
+            
+            starts = np.array(self.kept_starts)
+            counts = np.diff(np.append(starts, len(self.kept_hashes)))
+            
+            # New keyframes to their closest keyframe of each kept segment: (new frames, segments)
+            forward = np.minimum.reduceat(distances, starts, axis=1).mean(axis=0)
+            # Kept keyframes to their closest new keyframe, averaged per kept segment
+            backward = np.add.reduceat(distances.min(axis=0), starts) / counts
+            
+            segment_distances = np.maximum(forward, backward)
+            closest = int(np.argmin(segment_distances))
+            
+            if segment_distances[closest] <= self.max_distance:
+                self.suppressed += 1
+                return closest
+        
+        self._keep(fingerprint)
+        return None
+    
+    def keep(self, frames):
+        """
+        Keep a segment without checking it, such as one enriched by an earlier run
+        
+        Args:
+            frames (list): Keyframes of the segment
+        """
+        fingerprint = self.fingerprint(frames)
+        if len(fingerprint) > 0:
+            self._keep(fingerprint)
+    
+    def _keep(self, fingerprint):
+        """Add the keyframe hashes of a kept segment"""
+        self.kept_starts.append(len(self.kept_hashes))
+        self.kept_hashes = np.concatenate([self.kept_hashes, fingerprint])
@@ -1,28 +1,56 @@
 import os
+import time
+import heapq
 import cv2
 import numpy as np
 import logging
 from tqdm import tqdm
 from datetime import datetime
 import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 from ..config import VIDEO_CONFIG
+from ..utils import metrics
+from .ffmpeg_frame_source import FFmpegFrameSource
 
 class VideoProcessor:
     def __init__(self):
         """Initialize the video processor"""
         self.highlight_min_duration = VIDEO_CONFIG['highlight_min_duration']
         self.highlight_max_duration = VIDEO_CONFIG['highlight_max_duration']
+        self.scene_change_threshold = VIDEO_CONFIG['scene_change_threshold']
+        self.scene_detection_mode = VIDEO_CONFIG['scene_detection_mode']
+        self.scene_thumbnail_size = VIDEO_CONFIG['scene_thumbnail_size']
+        self.scene_frame_stride = VIDEO_CONFIG['scene_frame_stride']
+        self.scene_sample_fps = VIDEO_CONFIG['scene_sample_fps']
+        self.scene_scan_shards = VIDEO_CONFIG['scene_scan_shards']
+        self.scene_scan_min_shard_duration = VIDEO_CONFIG['scene_scan_min_shard_duration']
+        self.decoder_backend = VIDEO_CONFIG['decoder_backend']
+        self.scene_keyframes_only = VIDEO_CONFIG['scene_keyframes_only']
+        self.segmentation_mode = VIDEO_CONFIG['segmentation_mode']
+        self.chapter_target_duration = VIDEO_CONFIG['chapter_target_duration']
+        self.chapter_max_duration = VIDEO_CONFIG['chapter_max_duration']
+        self.max_segments_per_video = VIDEO_CONFIG['max_segments_per_video']
+        
+        if self.scene_detection_mode not in ('full', 'thumbnail'):
+            raise ValueError(f"Unknown scene detection mode: {self.scene_detection_mode}")
+        
+        if self.decoder_backend not in ('opencv', 'ffmpeg'):
+            raise ValueError(f"Unknown decoder backend: {self.decoder_backend}")
+        
+        if self.segmentation_mode not in ('scenes', 'chapters'):
+            raise ValueError(f"Unknown segmentation mode: {self.segmentation_mode}")
     
-    def extract_frames(self, video_path):
+    def open_video(self, video_path):
         """
-        Extract every frame from a video file
+        Open a video file for sequential decoding
         
         Args:
             video_path (str): Path to the video file
             
         Returns:
-            list: List of tuples containing (timestamp, frame)
+            tuple: (cv2.VideoCapture, fps, total_frames, duration)
         """
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"Video file not found: {video_path}")
@@ -36,56 +64,382 @@ class VideoProcessor:
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         duration = total_frames / fps if fps > 0 else 0
         
+        return cap, fps, total_frames, duration
+    
+    def get_video_duration(self, video_path):
+        """
+        Get the duration of a video file without decoding any frames
+        
+        Args:
+            video_path (str): Path to the video file
+            
+        Returns:
+            float: Duration of the video in seconds
+        """
+        cap, _, _, duration = self.open_video(video_path)
+        cap.release()
+        return duration
+    
+    def iter_frames(self, video_path, stride=1, start_frame=0, end_frame=None):
+        """
+        Decode a video file one frame at a time
+        
+        Only the current frame is held in memory, so peak memory stays flat
+        regardless of the video length.
+        
+        Args:
+            video_path (str): Path to the video file
+            stride (int): Only yield every Nth frame; skipped frames are grabbed but not retrieved
+            start_frame (int): Index of the first frame to decode
+            end_frame (int, optional): Index of the frame to stop before, defaults to the end of the stream
+            
+        Yields:
+            tuple: (timestamp, frame) for every decoded frame
+        """
+        cap, fps, total_frames, duration = self.open_video(video_path)
+        
         logging.info(f"Processing video: {video_path}")
         logging.info(f"FPS: {fps}, Total frames: {total_frames}, Duration: {duration:.2f}s")
         
-        frames = []
-        frame_count = 0
+        frame_count = start_frame
+        if start_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
         
-        with tqdm(total=total_frames, desc="Extracting frames") as pbar:
-            while True:
-                ret, frame = cap.read()
-                
-                if not ret:
-                    break
-                
-                # Process every frame
-                timestamp = frame_count / fps
-                frames.append((timestamp, frame))
-                
-                frame_count += 1
-                pbar.update(1)
+        try:
+            with tqdm(total=max(0, (end_frame or total_frames) - start_frame), desc="Extracting frames") as pbar:
+                while end_frame is None or frame_count < end_frame:
+                    if frame_count % stride:
+                        if not cap.grab():
+                            break
+                        
+                        frame_count += 1
+                        pbar.update(1)
+                        continue
+                    
+                    ret, frame = cap.read()
+                    
+                    if not ret:
+                        break
+                    
+                    yield frame_count / fps, frame
+                    
+                    frame_count += 1
+                    pbar.update(1)
+        finally:
+            cap.release()
+            logging.info(f"Decoded {frame_count - start_frame} frames from video")
+    
+    def extract_frames(self, video_path):
+        """
+        Extract every frame from a video file
         
-        cap.release()
+        Holds every decoded frame in memory; prefer scan_scene_changes or
+        iter_frames for anything but short clips.
+        
+        Args:
+            video_path (str): Path to the video file
+            
+        Returns:
+            list: List of tuples containing (timestamp, frame)
+        """
+        duration = self.get_video_duration(video_path)
+        frames = list(self.iter_frames(video_path))
         logging.info(f"Extracted {len(frames)} frames from video")
         
         return frames, duration
     
-    def detect_scene_changes(self, frames, threshold=30):
+    def get_frame_stride(self, fps):
+        """
+        Get the frame stride used by the configured scene detection mode
+        
+        Args:
+            fps (float): Frame rate of the video
+            
+        Returns:
+            int: Number of decoded frames per compared frame
+        """
+        if self.scene_detection_mode != 'thumbnail':
+            return 1
+        
+        if self.scene_sample_fps and fps > 0:
+            return max(1, int(round(fps / self.scene_sample_fps)))
+        
+        return max(1, int(self.scene_frame_stride))
+    
+    def scan_scene_changes(self, video_path, threshold=None, motion_profile=None):
+        """
+        Decode a video and detect scene changes in a single streaming pass
+        
+        Uses the scene detection mode configured in VIDEO_CONFIG: 'full' compares
+        every consecutive pair of full-resolution frames, 'thumbnail' compares
+        small grayscale thumbnails of every Nth frame. With
+        the 'ffmpeg' decoder backend, ffmpeg converts, scales and samples the
+        frames itself (see iter_scan_frames_ffmpeg).
+        
+        Args:
+            video_path (str): Path to the video file
+            threshold (int, optional): Threshold for scene change detection
+            motion_profile (list, optional): Receives (timestamp, changed pixel percentage)
+                of every compared frame
+        
+        Returns:
+            tuple: (list of scene change timestamps, video duration)
+        """
+        if threshold is None:
+            threshold = self.scene_change_threshold
+        
+        cap, fps, total_frames, duration = self.open_video(video_path)
+        cap.release()
+        
+        start = time.perf_counter()
+        
+        shards = self.get_scan_shards(duration)
+        if shards > 1:
+            scene_changes = self.scan_scene_changes_sharded(
+                video_path, threshold, fps, total_frames, shards, motion_profile
+            )
+            # Decoding happens inside the shard processes and is included here
+            metrics.observe('scene_detection', time.perf_counter() - start)
+            return scene_changes, duration
+        
+        if self.decoder_backend == 'ffmpeg':
+            frames = self.iter_scan_frames_ffmpeg(video_path, fps, self.get_scan_thumbnail_size())
+        else:
+            frames = self.iter_frames(video_path, stride=self.get_frame_stride(fps))
+        
+        decode_stats = {'seconds': 0.0, 'frames': 0}
+        scene_changes = self.detect_scan_scene_changes(
+            self._time_decode(frames, decode_stats), threshold, motion_profile
+        )
+        
+        metrics.observe('decode', decode_stats['seconds'])
+        metrics.observe('scene_detection', time.perf_counter() - start - decode_stats['seconds'])
+        metrics.increment('frames_decoded', decode_stats['frames'])
+        
+        return scene_changes, duration
+    
+    def _time_decode(self, frames, stats):
+        """Pass frames through, adding the time spent producing them to stats"""
+        frames = iter(frames)
+        
+        while True:
+            start = time.perf_counter()
+            item = next(frames, None)
+            stats['seconds'] += time.perf_counter() - start
+            
+            if item is None:
+                return
+            
+            stats['frames'] += 1
+            yield item
+    
+    def get_scan_thumbnail_size(self):
+        """Get the thumbnail size frames are compared at, or None for full resolution"""
+        return self.scene_thumbnail_size if self.scene_detection_mode == 'thumbnail' else None
+    
+    def detect_scan_scene_changes(self, frames, threshold, motion_profile=None):
+        """
+        Detect scene changes with the comparison configured for the scene detection mode
+        
+        Args:
+            frames (iterable): Iterator of tuples containing (timestamp, frame)
+            threshold (int): Threshold for scene change detection
+            motion_profile (list, optional): Receives (timestamp, changed pixel percentage)
+                of every compared frame
+        
+        Returns:
+            list: List of timestamps where scene changes occur
+        """
+        return self.detect_scene_changes(
+            frames, threshold, thumbnail_size=self.get_scan_thumbnail_size(), motion_profile=motion_profile
+        )
+    
+    def get_scan_shards(self, duration):
+        """
+        Get the number of processes a scan of the video is split across
+        
+        Args:
+            duration (float): Duration of the video in seconds
+            
+        Returns:
+            int: Number of time shards, 1 for a sequential scan
+        """
+        if self.scene_scan_shards <= 1:
+            return 1
+        
+        if self.decoder_backend != 'opencv':
+            logging.info("Sharded scene scans need the 'opencv' decoder backend, scanning sequentially")
+            return 1
+        
+        if self.scene_scan_min_shard_duration > 0:
+            return max(1, min(self.scene_scan_shards, int(duration // self.scene_scan_min_shard_duration)))
+        
+        return self.scene_scan_shards
+    
+    def get_scan_settings(self):
+        """Get the attributes a shard worker needs to scan exactly like this processor"""
+        return {
+            'scene_detection_mode': self.scene_detection_mode,
+            'scene_thumbnail_size': self.scene_thumbnail_size,
+            'scene_frame_stride': self.scene_frame_stride,
+            'scene_sample_fps': self.scene_sample_fps
+        }
+    
+    def scan_scene_changes_sharded(self, video_path, threshold, fps, total_frames, shards, motion_profile=None):
+        """
+        Detect scene changes by scanning time ranges of the video in parallel processes
+        
+        Shards start on compared frames, so every shard compares exactly the
+        frame pairs a sequential scan would. The pair spanning each shard edge,
+        the last frame of one shard against the first of the next, is compared
+        when stitching, so the result matches scan_scene_changes without shards.
+        
+        Args:
+            video_path (str): Path to the video file
+            threshold (int): Threshold for scene change detection
+            fps (float): Frame rate of the video
+            total_frames (int): Number of frames reported by the container
+            shards (int): Number of shards and worker processes
+            motion_profile (list, optional): Receives (timestamp, changed pixel percentage)
+                of every compared frame
+        
+        Returns:
+            list: List of timestamps where scene changes occur
+        """
+        stride = self.get_frame_stride(fps)
+        
+        # Align shard starts to the stride so each shard samples the same frames as a sequential pass
+        starts = sorted({int(total_frames * k / shards) // stride * stride for k in range(shards)})
+        ranges = [(start, end) for start, end in zip(starts, starts[1:] + [None])]
+        
+        logging.info(f"Scanning {video_path} for scene changes in {len(ranges)} shards")
+        
+        # Spawn rather than fork, so workers don't inherit the parent's connections and gRPC state
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(ranges), mp_context=context) as executor:
+            results = list(executor.map(
+                _scan_shard,
+                [video_path] * len(ranges),
+                [start for start, _ in ranges],
+                [end for _, end in ranges],
+                [threshold] * len(ranges),
+                [self.get_scan_settings()] * len(ranges)
+            ))
+        
+        scene_changes = []
+        previous = None
+        
+        for result in results:
+            if result is None:
+                continue
+            
+            shard_changes, shard_profile, (first_timestamp, first_gray), last = result
+            
+            if previous is not None:
+                # Compare the frames on either side of the shard edge
+                diff_percentage = self.frame_difference(previous[1], first_gray)
+                
+                if motion_profile is not None:
+                    motion_profile.append((first_timestamp, diff_percentage))
+                
+                if diff_percentage > threshold:
+                    scene_changes.append(first_timestamp)
+            
+            scene_changes.extend(shard_changes)
+            if motion_profile is not None:
+                motion_profile.extend(shard_profile)
+            
+            previous = last
+        
+        logging.info(f"Detected {len(scene_changes)} scene changes across {len(ranges)} shards")
+        return scene_changes
+    
+    def iter_scan_frames_ffmpeg(self, video_path, fps, thumbnail_size=None):
+        """
+        Decode the frames compared by scene detection through an ffmpeg pipe
+        
+        Frames arrive as grayscale, already scaled to thumbnail_size. In 'thumbnail'
+        mode scene_sample_fps becomes an fps filter and scene_frame_stride a select
+        filter; scene_keyframes_only decodes keyframes only.
+        
+        Args:
+            video_path (str): Path to the video file
+            fps (float): Frame rate of the video
+            thumbnail_size (tuple, optional): (width, height) ffmpeg scales the frames to
+            
+        Yields:
+            tuple: (timestamp, grayscale frame), valid until the next frame is yielded
+        """
+        sample_fps = None
+        stride = 1
+        if self.scene_detection_mode == 'thumbnail':
+            if self.scene_sample_fps and fps > 0:
+                sample_fps = self.scene_sample_fps
+            else:
+                stride = self.get_frame_stride(fps)
+        
+        source = FFmpegFrameSource(
+            pix_fmt='gray', size=thumbnail_size, fps=sample_fps, stride=stride,
+            keyframes_only=self.scene_keyframes_only
+        )
+        
+        logging.info(f"Processing video with ffmpeg: {video_path}")
+        yield from source.iter_frames(video_path)
+    
+    def to_gray(self, frame, thumbnail_size=None):
+        """
+        Convert a BGR frame to grayscale, optionally downscaling it
+        
+        Frames that are already grayscale, e.g. from the ffmpeg backend, are only
+        resized if needed, and copied so the result doesn't alias a decode buffer.
+        
+        Args:
+            frame (numpy.ndarray): BGR or grayscale frame
+            thumbnail_size (tuple, optional): (width, height) to downscale to
+            
+        Returns:
+            numpy.ndarray: Grayscale frame
+        """
+        if thumbnail_size is not None and frame.shape[1::-1] != tuple(thumbnail_size):
+            # Downscale before the color conversion so it touches fewer pixels;
+            # bilinear is much cheaper than INTER_AREA and accurate enough for cut detection
+            frame = cv2.resize(frame, tuple(thumbnail_size), interpolation=cv2.INTER_LINEAR)
+        
+        if frame.ndim == 2:
+            return frame.copy()
+        
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    
+    def detect_scene_changes(self, frames, threshold=30, thumbnail_size=None, motion_profile=None):
         """
         Detect scene changes in the extracted frames
         
         Args:
-            frames (list): List of tuples containing (timestamp, frame)
+            frames (iterable): List or iterator of tuples containing (timestamp, frame)
             threshold (int): Threshold for scene change detection
+            thumbnail_size (tuple, optional): (width, height) to downscale frames to before comparing
+            motion_profile (list, optional): Receives (timestamp, changed pixel percentage)
+                of every compared frame
             
         Returns:
             list: List of timestamps where scene changes occur
         """
-        if not frames or len(frames) < 2:
+        frames = iter(frames)
+        first = next(frames, None)
+        
+        if first is None:
             return []
         
         scene_changes = []
-        prev_frame = cv2.cvtColor(frames[0][1], cv2.COLOR_BGR2GRAY)
+        prev_frame = self.to_gray(first[1], thumbnail_size)
         
-        for i in range(1, len(frames)):
-            timestamp, frame = frames[i]
-            curr_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        for timestamp, frame in frames:
+            curr_frame = self.to_gray(frame, thumbnail_size)
             
-            # Calculate frame difference
-            diff = cv2.absdiff(prev_frame, curr_frame)
-            _, diff = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
-            diff_percentage = (cv2.countNonZero(diff) / (diff.shape[0] * diff.shape[1])) * 100
+            diff_percentage = self.frame_difference(prev_frame, curr_frame)
+            
+            if motion_profile is not None:
+                motion_profile.append((timestamp, diff_percentage))
             
             # If difference is above threshold, mark as scene change
             if diff_percentage > threshold:
@@ -96,10 +450,30 @@ class VideoProcessor:
         logging.info(f"Detected {len(scene_changes)} scene changes")
         return scene_changes
     
+    def frame_difference(self, prev_frame, curr_frame):
+        """
+        Get the percentage of pixels that changed between two grayscale frames
+        
+        Args:
+            prev_frame (numpy.ndarray): Earlier grayscale frame
+            curr_frame (numpy.ndarray): Later grayscale frame
+            
+        Returns:
+            float: Percentage of pixels whose intensity changed by more than 30
+        """
+        diff = cv2.absdiff(prev_frame, curr_frame)
+        _, diff = cv2.threshold(diff, 30, 255, cv2.THRESH_BINARY)
+        return (cv2.countNonZero(diff) / (diff.shape[0] * diff.shape[1])) * 100
+    
     def identify_potential_highlights(self, scene_changes, video_duration):
         """
         Identify potential highlights based on scene changes
         
+        In 'scenes' mode every scene of at least highlight_min_duration becomes a
+        segment, capped at highlight_max_duration. In 'chapters' mode the video is
+        covered by chapters of merged scenes instead (see identify_chapters). Either
+        way, at most max_segments_per_video segments are returned.
+        
         Args:
             scene_changes (list): List of timestamps where scene changes occur
             video_duration (float): Total duration of the video
@@ -107,6 +481,12 @@ class VideoProcessor:
         Returns:
             list: List of tuples containing (start_time, end_time) for potential highlights
         """
+        if self.segmentation_mode == 'chapters':
+            potential_highlights = self.identify_chapters(scene_changes, video_duration)
+            potential_highlights = self.cap_segments(potential_highlights)
+            logging.info(f"Identified {len(potential_highlights)} chapters from {len(scene_changes)} scene changes")
+            return potential_highlights
+        
         if not scene_changes:
             # If no scene changes detected, consider the whole video as one segment
             return [(0, min(video_duration, self.highlight_max_duration))]
@@ -136,39 +516,216 @@ class VideoProcessor:
         if video_duration - last_start >= self.highlight_min_duration:
             potential_highlights.append((last_start, min(video_duration, last_start + self.highlight_max_duration)))
         
+        potential_highlights = self.cap_segments(potential_highlights)
+        
         logging.info(f"Identified {len(potential_highlights)} potential highlights")
         return potential_highlights
     
-    def extract_highlight_frames(self, video_path, start_time, end_time):
+    def identify_chapters(self, scene_changes, video_duration):
         """
-        Extract representative frames from a highlight segment
+        Cover the whole video with chapters built from its scenes
+        
+        Scenes longer than chapter_max_duration are first split evenly into parts
+        of at least chapter_target_duration (more only where a part would
+        otherwise exceed chapter_max_duration), so the merge below never joins
+        them again. Adjacent scenes are then merged until a chapter reaches
+        chapter_target_duration, without letting it grow past
+        chapter_max_duration. A final chapter shorter than highlight_min_duration is
+        merged into the previous one.
         
         Args:
-            video_path (str): Path to the video file
-            start_time (float): Start time of the highlight segment
-            end_time (float): End time of the highlight segment
+            scene_changes (list): List of timestamps where scene changes occur
+            video_duration (float): Total duration of the video
             
         Returns:
-            list: List of frames from the highlight segment
+            list: List of tuples containing (start_time, end_time) for each chapter
         """
-        cap = cv2.VideoCapture(video_path)
+        boundaries = [0] + [t for t in scene_changes if 0 < t < video_duration] + [video_duration]
         
-        if not cap.isOpened():
-            raise ValueError(f"Could not open video file: {video_path}")
+        # Split long static stretches evenly
+        scenes = []
+        for start_time, end_time in zip(boundaries, boundaries[1:]):
+            scene_duration = end_time - start_time
+            if scene_duration > self.chapter_max_duration:
+                parts = max(int(scene_duration // self.chapter_target_duration),
+                            int(np.ceil(scene_duration / self.chapter_max_duration)))
+                edges = np.linspace(start_time, end_time, parts + 1).tolist()
+                scenes.extend(zip(edges, edges[1:]))
+            elif scene_duration > 0:
+                scenes.append((start_time, end_time))
         
-        fps = cap.get(cv2.CAP_PROP_FPS)
+        # Merge adjacent short scenes
+        chapters = []
+        for start_time, end_time in scenes:
+            if chapters:
+                chapter_start, chapter_end = chapters[-1]
+                if (chapter_end - chapter_start < self.chapter_target_duration
+                        and end_time - chapter_start <= self.chapter_max_duration):
+                    chapters[-1] = (chapter_start, end_time)
+                    continue
+            chapters.append((start_time, end_time))
+        
+        if (len(chapters) > 1 and chapters[-1][1] - chapters[-1][0] < self.highlight_min_duration
+                and chapters[-1][1] - chapters[-2][0] <= self.chapter_max_duration):
+            chapters[-2:] = [(chapters[-2][0], chapters[-1][1])]
+        
+        return chapters
+    
+    def cap_segments(self, segments):
+        """
+        Enforce max_segments_per_video by merging neighbouring segments
+        
+        Only segments that touch are merged, the pair with the shortest combined
+        duration first, so the cap wins over the configured maximum durations
+        when both can't be met. Segments separated by a gap (a dropped short
+        scene or the cut-off tail of a long one) are never merged across it; if
+        the cap still isn't met, the shortest segments are dropped.
+        
+        Args:
+            segments (list): List of (start_time, end_time) tuples in chronological order
+            
+        Returns:
+            list: At most max_segments_per_video (start_time, end_time) tuples
+        """
+        if not self.max_segments_per_video or len(segments) <= self.max_segments_per_video:
+            return segments
+        
+        count = len(segments)
+        starts = [start_time for start_time, _ in segments]
+        ends = [end_time for _, end_time in segments]
+        
+        # Doubly linked list of the remaining segments
+        previous = list(range(-1, count - 1))
+        following = list(range(1, count + 1))
+        merged = [False] * count
+        
+        def pair(i, j):
+            """Heap entry of two touching segments, None when a gap separates them"""
+            if starts[j] - ends[i] > 1e-6:
+                return None
+            return (ends[i] - starts[i] + ends[j] - starts[j], i, j)
         
+        heap = [entry for entry in (pair(i, i + 1) for i in range(count - 1)) if entry is not None]
+        heapq.heapify(heap)
+        remaining = count
+        
+        while remaining > self.max_segments_per_video and heap:
+            cost, i, j = heapq.heappop(heap)
+            
+            # Entries of segments that have grown or were merged away are stale
+            if merged[i] or merged[j] or cost != ends[i] - starts[i] + ends[j] - starts[j]:
+                continue
+            
+            ends[i] = ends[j]
+            merged[j] = True
+            following[i] = following[j]
+            if following[j] < count:
+                previous[following[j]] = i
+            remaining -= 1
+            
+            for entry in (pair(previous[i], i) if previous[i] >= 0 else None,
+                          pair(i, following[i]) if following[i] < count else None):
+                if entry is not None:
+                    heapq.heappush(heap, entry)
+        
+        capped = [(starts[i], ends[i]) for i in range(count) if not merged[i]]
+        
+        if len(capped) > self.max_segments_per_video:
+            longest = sorted(range(len(capped)), key=lambda k: capped[k][1] - capped[k][0], reverse=True)
+            kept = sorted(longest[:self.max_segments_per_video])
+            logging.info(f"Dropped the {len(capped) - len(kept)} shortest segments that have no touching neighbour")
+            capped = [capped[k] for k in kept]
+        
+        logging.info(f"Merged {len(segments)} segments down to the cap of {self.max_segments_per_video}")
+        return capped
+    
+    def get_highlight_frame_indices(self, start_time, end_time, fps, max_frames=5):
+        """
+        Get the indices of the representative frames of a highlight segment
+        
+        Args:
+            start_time (float): Start time of the highlight segment
+            end_time (float): End time of the highlight segment
+            fps (float): Frame rate of the video
+            max_frames (int): Maximum number of frames to select
+            
+        Returns:
+            numpy.ndarray: Evenly distributed frame indices
+        """
         # Calculate frame positions
         start_frame = int(start_time * fps)
         end_frame = int(end_time * fps)
         
-        # Extract a maximum of 5 evenly distributed frames
-        num_frames = min(5, end_frame - start_frame)
-        frame_indices = np.linspace(start_frame, end_frame - 1, num_frames, dtype=int)
+        # Select a maximum of max_frames evenly distributed frames
+        num_frames = max(0, min(max_frames, end_frame - start_frame))
+        return np.linspace(start_frame, end_frame - 1, num_frames, dtype=int)
+    
+    def iter_highlight_frames(self, video_path, highlights, max_frames=5):
+        """
+        Extract representative frames for every highlight in one forward pass
+        
+        The video is opened once and read sequentially; frames that are not
+        needed are only grabbed, so there is no per-highlight reopen or seek.
+        Frames are yielded per highlight, so only one highlight's frames are
+        held in memory at a time.
+        
+        Args:
+            video_path (str): Path to the video file
+            highlights (list): List of (start_time, end_time) tuples, sorted by start time
+            max_frames (int): Maximum number of frames per highlight
+            
+        Yields:
+            list: List of frames for each highlight, in the order of highlights
+        """
+        cap, fps, _, _ = self.open_video(video_path)
+        
+        frame_pos = 0
+        last_frame = None
+        
+        try:
+            for start_time, end_time in highlights:
+                highlight_frames = []
+                
+                for idx in self.get_highlight_frame_indices(start_time, end_time, fps, max_frames):
+                    if idx < frame_pos:
+                        # Only the most recently read frame can be reused without seeking
+                        if idx == frame_pos - 1 and last_frame is not None:
+                            highlight_frames.append(last_frame)
+                        continue
+                    
+                    while frame_pos < idx and cap.grab():
+                        frame_pos += 1
+                    
+                    ret, frame = cap.read()
+                    
+                    if not ret:
+                        break
+                    
+                    frame_pos += 1
+                    last_frame = frame
+                    highlight_frames.append(frame)
+                
+                yield highlight_frames
+        finally:
+            cap.release()
+    
+    def extract_highlight_frames(self, video_path, start_time, end_time):
+        """
+        Extract representative frames from a highlight segment
+        
+        Args:
+            video_path (str): Path to the video file
+            start_time (float): Start time of the highlight segment
+            end_time (float): End time of the highlight segment
+            
+        Returns:
+            list: List of frames from the highlight segment
+        """
+        cap, fps, _, _ = self.open_video(video_path)
         
         highlight_frames = []
         
-        for idx in frame_indices:
+        for idx in self.get_highlight_frame_indices(start_time, end_time, fps):
             cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
             ret, frame = cap.read()
             
@@ -220,3 +777,52 @@ class VideoProcessor:
         except Exception as e:
             logging.error(f"Error saving highlight clip: {e}")
             return None
+
+def _scan_shard(video_path, start_frame, end_frame, threshold, settings):
+    """
+    Scan one time shard of a video for scene changes in a worker process
+    
+    Args:
+        video_path (str): Path to the video file
+        start_frame (int): Index of the first frame of the shard
+        end_frame (int): Index of the frame the shard stops before, None for the end of the video
+        threshold (int): Threshold for scene change detection
+        settings (dict): Scan attributes of the parent's VideoProcessor
+        
+    Returns:
+        tuple: (scene changes, motion profile, (timestamp, grayscale frame) of the first
+            compared frame, same for the last), or None if the shard has no frames
+    """
+    video_processor = VideoProcessor()
+    for name, value in settings.items():
+        setattr(video_processor, name, value)
+    
+    cap, fps, _, _ = video_processor.open_video(video_path)
+    cap.release()
+    
+    frames = video_processor.iter_frames(
+        video_path, stride=video_processor.get_frame_stride(fps), start_frame=start_frame, end_frame=end_frame
+    )
+    
+    # Raw first and last compared frames of the shard, kept for stitching
+    edges = {}
+    
+    def track_edges(frames):
+        for timestamp, frame in frames:
+            edges.setdefault('first', (timestamp, frame))
+            edges['last'] = (timestamp, frame)
+            yield timestamp, frame
+    
+    motion_profile = []
+    scene_changes = video_processor.detect_scan_scene_changes(track_edges(frames), threshold, motion_profile)
+    
+    if not edges:
+        return None
+    
+    thumbnail_size = video_processor.get_scan_thumbnail_size()
+    edge_frames = [
+        (timestamp, video_processor.to_gray(frame, thumbnail_size))
+        for timestamp, frame in (edges['first'], edges['last'])
+    ]
+    
+    return scene_changes, motion_profile, edge_frames[0], edge_frames[1]
@@ -0,0 +1,192 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from . import metrics
+
+# Caches opened in this process by path, shared so counters cover the whole run
+_open_caches = {}
+_open_caches_lock = threading.Lock()
+
+def make_cache_key(*parts):
+    """
+    Build a content-addressed cache key from its parts
+    
+    Args:
+        *parts (str): Values the cached result depends on, e.g. model name and input text
+        
+    Returns:
+        str: SHA-256 hex digest of the parts
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class DiskCache:
+    """Persistent key/value cache in a SQLite file with size-bounded LRU eviction"""
+    
+    def __init__(self, path, max_entries, name="cache"):
+        """
+        Open or create the cache file
+        
+        Args:
+            path (str): Path to the SQLite file
+            max_entries (int): Maximum number of entries kept; least recently used entries are evicted
+            name (str): Name used in log messages
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.name = name
+        self.metric_name = "_".join(name.lower().split())
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        # One connection shared by the threads of a process, serialized by the lock;
+        # WAL lets several extractor processes use the same file
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_last_access_idx ON entries (last_access)")
+        self.connection.commit()
+    
+    def get(self, key):
+        """
+        Get a cached value
+        
+        Args:
+            key (str): Cache key
+            
+        Returns:
+            bytes: Cached value, or None on a miss
+        """
+        return self.get_many([key]).get(key)
+    
+    def get_many(self, keys):
+        """
+        Get cached values for several keys
+        
+        Args:
+            keys (list): Cache keys
+            
+        Returns:
+            dict: Cached values of the keys that were hits
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        
+        with self.lock:
+            try:
+                # Stay well below SQLite's limit on bound parameters
+                for i in range(0, len(keys), 500):
+                    batch = keys[i:i+500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self.connection.execute(
+                        f"SELECT key, value FROM entries WHERE key IN ({placeholders})", batch
+                    ).fetchall()
+                    found.update(rows)
+                
+                if found:
+                    now = time.time()
+                    self.connection.executemany(
+                        "UPDATE entries SET last_access = ? WHERE key = ?",
+                        [(now, key) for key in found]
+                    )
+                    self.connection.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Error reading {self.name}: {e}")
+            
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        
+        metrics.increment(f"{self.metric_name}_hits", len(found))
+        metrics.increment(f"{self.metric_name}_misses", len(keys) - len(found))
+        
+        return found
+    
+    def set(self, key, value):
+        """
+        Store a value
+        
+        Args:
+            key (str): Cache key
+            value (bytes): Value to store
+        """
+        self.set_many({key: value})
+    
+    def set_many(self, items):
+        """
+        Store several values and evict the least recently used entries over the limit
+        
+        Args:
+            items (dict): Values to store by cache key
+        """
+        if not items:
+            return
+        
+        now = time.time()
+        
+        with self.lock:
+            try:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO entries (key, value, last_access) VALUES (?, ?, ?)",
+                    [(key, sqlite3.Binary(value), now) for key, value in items.items()]
+                )
+                
+                count = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                if count > self.max_entries:
+                    self.connection.execute(
+                        "DELETE FROM entries WHERE key IN "
+                        "(SELECT key FROM entries ORDER BY last_access LIMIT ?)",
+                        (count - self.max_entries,)
+                    )
+                
+                self.connection.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Error writing {self.name}: {e}")
+    
+    def log_stats(self):
+        """Log the hit/miss counters of the cache"""
+        lookups = self.hits + self.misses
+        hit_rate = (self.hits / lookups * 100) if lookups else 0.0
+        logging.info(f"{self.name}: {self.hits} hits, {self.misses} misses ({hit_rate:.1f}% hit rate)")
+    
+    def close(self):
+        """Close the cache file"""
+        with self.lock:
+            self.connection.close()
+
+def open_cache(path, max_entries, name="cache"):
+    """
+    Get the process-wide DiskCache for a file, opening it on first use
+    
+    Args:
+        path (str): Path to the SQLite file
+        max_entries (int): Maximum number of entries kept
+        name (str): Name used in log messages
+        
+    Returns:
+        DiskCache: Shared cache instance
+    """
+    with _open_caches_lock:
+        if path not in _open_caches:
+            _open_caches[path] = DiskCache(path, max_entries, name)
+        return _open_caches[path]
+
+def log_cache_stats():
+    """Log the hit/miss counters of every cache opened in this process"""
+    with _open_caches_lock:
+        caches = list(_open_caches.values())
+    
+    for cache in caches:
+        cache.log_stats()
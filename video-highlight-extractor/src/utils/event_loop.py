@@ -0,0 +1,42 @@
+import asyncio
+import logging
+import threading
+
+# Event loop of this process running the async LLM and embedding requests
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_event_loop():
+    """
+    Get the event loop shared by all async requests of this process
+    
+    The loop runs forever in a daemon thread. Async API clients bind their
+    connections to the loop they were first used on, so every pipeline of the
+    process submits its coroutines to this one loop instead of starting its own.
+    
+    Returns:
+        asyncio.AbstractEventLoop: The running loop
+    """
+    global _loop
+    
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="event-loop", daemon=True)
+            thread.start()
+            _loop = loop
+            logging.info("Started event loop for async requests")
+        
+        return _loop
+
+def submit(coroutine):
+    """
+    Run a coroutine on the shared event loop
+    
+    Args:
+        coroutine (coroutine): Coroutine to run
+    
+    Returns:
+        concurrent.futures.Future: Future of the coroutine's result; cancelling it cancels the coroutine
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, get_event_loop())
@@ -1,21 +1,29 @@
 import os
+import json
 import logging
+import hashlib
 import datetime
 from tqdm import tqdm
 
-from ..config import PATHS, VIDEO_CONFIG
+from ..config import PATHS, VIDEO_CONFIG, LLM_CONFIG, AUDIO_CONFIG
 
-def setup_logging():
-    """Set up logging configuration"""
+def setup_logging(suffix=None):
+    """
+    Set up logging configuration
+    
+    Args:
+        suffix (str, optional): Suffix for the log file name, e.g. to separate worker processes
+    """
     log_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs')
     os.makedirs(log_dir, exist_ok=True)
     
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = os.path.join(log_dir, f"video_processing_{timestamp}.log")
+    log_name = f"video_processing_{timestamp}_{suffix}" if suffix else f"video_processing_{timestamp}"
+    log_file = os.path.join(log_dir, f"{log_name}.log")
     
     logging.basicConfig(
         level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s',
         handlers=[
             logging.FileHandler(log_file),
             logging.StreamHandler()
@@ -44,6 +52,52 @@ def get_video_files():
     logging.info(f"Found {len(video_files)} video files in {videos_dir}")
     return video_files
 
+def compute_file_hash(file_path, chunk_size=1024 * 1024):
+    """
+    Compute the SHA-256 content hash of a file
+    
+    Args:
+        file_path (str): Path to the file
+        chunk_size (int): Bytes read at a time
+        
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    
+    return digest.hexdigest()
+
+# VIDEO_CONFIG keys that change which segments are found and enriched. Settings
+# that only change throughput (batch sizes, scan shards) are left out, so tuning
+# them doesn't invalidate completed videos.
+_OUTPUT_VIDEO_CONFIG_KEYS = (
+    'highlight_min_duration', 'highlight_max_duration',
+    'scene_change_threshold', 'scene_detection_mode', 'scene_thumbnail_size', 'scene_frame_stride',
+    'scene_sample_fps', 'decoder_backend', 'scene_keyframes_only',
+    'dedup_enabled', 'dedup_max_distance',
+    'max_highlights_per_video', 'max_highlights_per_minute', 'saliency_weights', 'speech_rms_threshold_db',
+    'segmentation_mode', 'chapter_target_duration', 'chapter_max_duration', 'max_segments_per_video'
+)
+
+def get_config_hash():
+    """
+    Hash the configuration that determines the extracted highlights
+    
+    Returns:
+        str: Hex digest that changes whenever segmentation, models or prompts change
+    """
+    config = {
+        'video': {key: VIDEO_CONFIG[key] for key in _OUTPUT_VIDEO_CONFIG_KEYS},
+        'llm': {key: LLM_CONFIG[key] for key in ('backend', 'model', 'prompt_version', 'embedding_model', 'embedding_dimension')},
+        'audio': {'sample_rate': AUDIO_CONFIG['sample_rate']}
+    }
+    
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
 def format_time(seconds):
     """Format time in seconds to MM:SS format"""
     minutes, seconds = divmod(int(seconds), 60)
@@ -89,3 +143,28 @@ class ProgressBar:
         """Close the progress bar"""
         if self.pbar is not None:
             self.pbar.close()
+
+class PoolProgressBar:
+    """Progress bar over finished videos, for videos processed concurrently by worker processes or pipeline stages"""
+    
+    def __init__(self, total_videos, workers=None):
+        """Initialize progress tracking"""
+        self.total_highlights = 0
+        self.failed = 0
+        desc = f"Processing {total_videos} videos" + (f" with {workers} workers" if workers else "")
+        self.pbar = tqdm(total=total_videos, desc=desc)
+    
+    def video_done(self, video_name, num_highlights, failed=False):
+        """Record a finished video"""
+        if failed:
+            self.failed += 1
+        else:
+            self.total_highlights += num_highlights
+        
+        self.pbar.set_description(f"Finished {os.path.basename(video_name)}")
+        self.pbar.set_postfix(highlights=self.total_highlights, failed=self.failed)
+        self.pbar.update(1)
+    
+    def close(self):
+        """Close the progress bar"""
+        self.pbar.close()
@@ -0,0 +1,25 @@
+import cv2
+import numpy as np
+
+def dhash(frame, hash_size=8):
+    """
+    Compute the difference hash (dHash) of a frame
+    
+    The frame is reduced to a (hash_size + 1) x hash_size grayscale thumbnail and
+    every bit records whether a pixel is brighter than its right neighbour, so
+    re-encoding, rescaling and small color shifts leave the hash (nearly) unchanged.
+    
+    Args:
+        frame (numpy.ndarray): BGR or grayscale frame
+        hash_size (int): Width and height of the bit grid
+        
+    Returns:
+        int: Perceptual hash with hash_size * hash_size bits
+    """
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    
+    thumbnail = cv2.resize(frame, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).ravel()
+    
+    return int(np.packbits(bits).tobytes().hex(), 16)
@@ -0,0 +1,284 @@
+import os
+import re
+import json
+import time
+import logging
+import datetime
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ..config import PATHS
+
+# Upper bounds in seconds of the stage duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+class Metrics:
+    """Thread-safe stage duration histograms and counters"""
+    
+    def __init__(self):
+        """Initialize empty metrics"""
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+    
+    def observe(self, stage, seconds):
+        """
+        Record one duration of a stage
+        
+        Args:
+            stage (str): Stage name
+            seconds (float): Duration in seconds
+        """
+        with self.lock:
+            histogram = self.histograms.setdefault(stage, {
+                'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * len(DURATION_BUCKETS)
+            })
+            histogram['count'] += 1
+            histogram['sum'] += seconds
+            histogram['max'] = max(histogram['max'], seconds)
+            
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    histogram['buckets'][i] += 1
+    
+    def increment(self, counter, amount=1):
+        """
+        Add to a counter
+        
+        Args:
+            counter (str): Counter name
+            amount (int): Amount to add
+        """
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+    
+    def merge(self, other):
+        """
+        Add the histograms and counters of a report to these metrics
+        
+        Args:
+            other (dict): Output of to_dict, e.g. a run report from a worker process
+        """
+        with self.lock:
+            for stage, histogram in other.get('stages', {}).items():
+                own = self.histograms.setdefault(stage, {
+                    'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * len(DURATION_BUCKETS)
+                })
+                own['count'] += histogram['count']
+                own['sum'] += histogram['sum']
+                own['max'] = max(own['max'], histogram['max'])
+                own['buckets'] = [a + b for a, b in zip(own['buckets'], histogram['buckets'])]
+            
+            for counter, value in other.get('counters', {}).items():
+                self.counters[counter] = self.counters.get(counter, 0) + value
+    
+    def to_dict(self):
+        """
+        Get a JSON-serializable snapshot
+        
+        Returns:
+            dict: Histograms by stage (cumulative bucket counts) and counters
+        """
+        with self.lock:
+            return {
+                'stages': {
+                    stage: dict(histogram, buckets=list(histogram['buckets']))
+                    for stage, histogram in self.histograms.items()
+                },
+                'counters': dict(self.counters)
+            }
+
+# Metrics of the video each thread or asyncio task is working on, the report
+# of the last finished video, and totals of the whole run
+_active = contextvars.ContextVar('metrics_run', default=None)
+_last_report = None
+_totals = Metrics()
+
+# Callables returning current values by gauge name, e.g. rate limiter throughput
+_gauge_sources = {}
+
+@contextmanager
+def activate(run):
+    """
+    Record the observations of the enclosed block in the metrics of one video
+    
+    Pipeline stages interleave work on several videos, so every unit of work is
+    attributed to its video explicitly. Asyncio tasks created inside the block
+    inherit the video; threads started inside it don't and only record into
+    the run totals.
+    
+    Args:
+        run (Metrics): Metrics of the video
+    """
+    token = _active.set(run)
+    try:
+        yield run
+    finally:
+        _active.reset(token)
+
+def _targets():
+    """Metrics an observation is recorded in"""
+    run = _active.get()
+    return (_totals,) if run is None else (_totals, run)
+
+def observe(stage, seconds):
+    """Record one duration of a stage for the current video and the run totals"""
+    for target in _targets():
+        target.observe(stage, seconds)
+
+def increment(counter, amount=1):
+    """Add to a counter of the current video and of the run totals"""
+    for target in _targets():
+        target.increment(counter, amount)
+
+@contextmanager
+def timed(stage):
+    """Record the duration of the enclosed block as one observation of a stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+def finish_run(run, video_path, wall_seconds, **details):
+    """
+    Write the JSON run report of a video
+    
+    Args:
+        run (Metrics): Metrics collected for the video
+        video_path (str): Path to the video file
+        wall_seconds (float): Wall time spent on the video
+        **details: Additional report fields, e.g. video_id and highlights
+    
+    Returns:
+        dict: The run report
+    """
+    global _last_report
+    
+    report = {
+        'video': os.path.basename(video_path),
+        'video_path': video_path,
+        'finished_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'wall_seconds': wall_seconds,
+        'duration_buckets': list(DURATION_BUCKETS),
+        **details,
+        **run.to_dict()
+    }
+    
+    reports_dir = PATHS['reports_dir']
+    if reports_dir:
+        try:
+            os.makedirs(reports_dir, exist_ok=True)
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            name = os.path.splitext(os.path.basename(video_path))[0]
+            report_path = os.path.join(reports_dir, f"{name}_{timestamp}_{os.getpid()}.json")
+            
+            with open(report_path, 'w') as f:
+                json.dump(report, f, indent=2)
+            
+            report['report_path'] = report_path
+            logging.info(f"Wrote run report to {report_path}")
+        except OSError as e:
+            logging.error(f"Error writing run report: {e}")
+    
+    _last_report = report
+    return report
+
+def get_last_report():
+    """Get the run report of the last video finished in this process, or None"""
+    return _last_report
+
+def merge_report(report):
+    """Add a run report from a worker process to the run totals of this process"""
+    _totals.merge(report)
+
+def get_totals():
+    """Get a snapshot of the run totals"""
+    return _totals.to_dict()
+
+def register_gauges(name, source):
+    """
+    Serve the values returned by a callable as gauges
+    
+    Args:
+        name (str): Name of the source, registering the same name again replaces it
+        source (callable): Returns a dict of current values by gauge name
+    """
+    _gauge_sources[name] = source
+
+def get_gauges():
+    """Get the current values of all registered gauges"""
+    gauges = {}
+    for source in list(_gauge_sources.values()):
+        gauges.update(source())
+    return gauges
+
+def render_prometheus():
+    """
+    Render the run totals in the Prometheus text exposition format
+    
+    Returns:
+        str: Metrics text
+    """
+    totals = _totals.to_dict()
+    lines = [
+        "# HELP video_highlights_stage_duration_seconds Time spent per pipeline stage",
+        "# TYPE video_highlights_stage_duration_seconds histogram"
+    ]
+    
+    for stage, histogram in sorted(totals['stages'].items()):
+        for bound, count in zip(DURATION_BUCKETS, histogram['buckets']):
+            lines.append(f'video_highlights_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+        lines.append(f'video_highlights_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+        lines.append(f'video_highlights_stage_duration_seconds_sum{{stage="{stage}"}} {histogram["sum"]}')
+        lines.append(f'video_highlights_stage_duration_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+    
+    for counter, value in sorted(totals['counters'].items()):
+        name = "video_highlights_" + re.sub(r'[^a-zA-Z0-9_]', '_', counter) + "_total"
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {value}")
+    
+    for gauge, value in sorted(get_gauges().items()):
+        name = "video_highlights_" + re.sub(r'[^a-zA-Z0-9_]', '_', gauge)
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves render_prometheus on /metrics"""
+    
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        """Keep scrapes out of the log"""
+
+def start_metrics_server(port, host='0.0.0.0'):
+    """
+    Serve the run totals for Prometheus on http://host:port/metrics in a background thread
+    
+    Args:
+        port (int): Port to listen on
+        host (str): Address to bind to
+    
+    Returns:
+        ThreadingHTTPServer: The running server, call shutdown() to stop it
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    
+    logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,44 @@
+import time
+import threading
+
+import pytest
+
+from src.llm.rate_limiter import RateLimiter, WaitInterrupted, interrupted_waits
+
+class ServiceUnavailable(Exception):
+    code = 503
+
+def unavailable():
+    raise ServiceUnavailable("busy")
+
+def test_interrupted_waits_end_retry_backoff():
+    limiter = RateLimiter('test_backoff', max_retries=5, base_delay=60.0, max_delay=60.0)
+    errors = []
+    
+    def call():
+        try:
+            limiter.call(unavailable)
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    
+    started = time.monotonic()
+    with interrupted_waits():
+        for thread in threads:
+            thread.join(timeout=5.0)
+    
+    assert time.monotonic() - started < 1.0
+    assert len(errors) == 3 and all(isinstance(error, WaitInterrupted) for error in errors)
+    assert limiter.concurrency.in_flight == 0
+
+def test_calls_go_through_after_interrupted_waits():
+    limiter = RateLimiter('test_resume')
+    with interrupted_waits():
+        with pytest.raises(WaitInterrupted):
+            limiter.call(lambda: "ok")
+    
+    assert limiter.call(lambda: "ok") == "ok"
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from src.processors.video_processor import VideoProcessor
+
+@pytest.fixture
+def video_processor():
+    video_processor = VideoProcessor()
+    video_processor.chapter_target_duration = 30.0
+    video_processor.chapter_max_duration = 60.0
+    video_processor.highlight_min_duration = 1.0
+    return video_processor
+
+def durations(chapters):
+    return [end_time - start_time for start_time, end_time in chapters]
+
+@pytest.mark.parametrize("video_duration", [61.0, 90.0, 119.0, 200.0, 3600.0])
+def test_static_video_is_split_into_target_length_chapters(video_processor, video_duration):
+    chapters = video_processor.identify_chapters([], video_duration)
+    
+    assert chapters[0][0] == 0 and chapters[-1][1] == pytest.approx(video_duration)
+    for duration in durations(chapters):
+        assert 30.0 <= duration < 45.0
+
+def test_long_scene_between_cuts_keeps_target_length(video_processor):
+    chapters = video_processor.identify_chapters([10.0, 210.0], 220.0)
+    
+    # The first short scene joins the first part of the 200s scene, the last one stays on its own
+    for duration in durations(chapters)[:-1]:
+        assert 30.0 <= duration <= 60.0
+    assert chapters[-1] == pytest.approx((210.0, 220.0))
+
+def test_parts_never_exceed_max_duration(video_processor):
+    video_processor.chapter_max_duration = 40.0
+    
+    for video_duration in (41.0, 81.0, 100.0):
+        assert max(durations(video_processor.identify_chapters([], video_duration))) <= 40.0
+
+def frames_with_cuts(num_frames, cut_every=7, size=(90, 160), seed=0):
+    """BGR frames with a hard cut every cut_every frames and noise in between, at 24 fps"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(num_frames):
+        if i % cut_every == 0:
+            base = rng.integers(0, 256, size + (3,), dtype=np.uint8)
+        noise = rng.integers(-10, 11, size + (3,))
+        frames.append((i / 24.0, np.clip(base.astype(np.int16) + noise, 0, 255).astype(np.uint8)))
+    return frames
+
+@pytest.mark.parametrize("thumbnail_size", [None, (40, 24)])
+def test_scene_changes_are_the_hard_cuts(video_processor, thumbnail_size):
+    frames = frames_with_cuts(50)
+    motion_profile = []
+    
+    scene_changes = video_processor.detect_scene_changes(frames, thumbnail_size=thumbnail_size, motion_profile=motion_profile)
+    
+    assert scene_changes == [i / 24.0 for i in range(7, 50, 7)]
+    assert [timestamp for timestamp, _ in motion_profile] == [timestamp for timestamp, _ in frames[1:]]
+
+def test_scene_changes_of_grayscale_frames_match_bgr(video_processor):
+    frames = frames_with_cuts(30)
+    gray_frames = [(timestamp, video_processor.to_gray(frame)) for timestamp, frame in frames]
+    
+    assert video_processor.detect_scene_changes(gray_frames) == video_processor.detect_scene_changes(frames)
+
+def test_no_scene_changes_without_frames(video_processor):
+    assert video_processor.detect_scene_changes([]) == []
+    assert video_processor.detect_scene_changes(frames_with_cuts(1)) == []